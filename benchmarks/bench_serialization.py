@@ -0,0 +1,224 @@
+#!/usr/bin/env python3
+
+"""
+Benchmarks the message serialization hot path without ROS: ros2dict, every compress_*
+function and the JSON encoding of the result, on synthetic messages (see
+rosboard/backends/sim_msgs.py) of realistic sizes, including an Image in every encoding
+rosboard.cv_bridge supports. legacy/compressed_image/* times the CompressedImage re-encode
+path from before scaled JPEG decoding, for comparison with compress/compressed_image/*.
+
+Run from the repository root:
+    python3 benchmarks/bench_serialization.py                 run and print all benchmarks
+    python3 benchmarks/bench_serialization.py -k image/rgb8   only benchmarks matching a regex
+    python3 benchmarks/bench_serialization.py --save          store the results as the baseline
+    python3 benchmarks/bench_serialization.py --compare       compare with the baseline; exits with
+                                                              status 1 if any benchmark got slower
+                                                              than --threshold (default 25%)
+
+Timings depend on the machine and on the JPEG backend, so no baseline is committed: baselines
+are local to each host, in benchmarks/baselines/<hostname>.json (ignored by git). To check a change
+for regressions, run --save on a checkout without it, then --compare with it. Timings are only
+comparable on an otherwise idle machine; where runs vary by more than --threshold between
+themselves, raise --min-time or --threshold.
+"""
+
+import argparse
+import json
+import os
+import platform
+import re
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.realpath(__file__)), ".."))
+
+import numpy as np
+
+from rosboard import compression
+from rosboard.backends import sim_msgs
+from rosboard.serialization import ros2dict
+
+BASELINE_DIR = os.path.join(os.path.dirname(os.path.realpath(__file__)), "baselines")
+
+def encode(msg_dict):
+    # as ROSBoardSocketHandler.broadcast encodes messages
+    return json.dumps(["m", msg_dict], separators=(',', ':'))
+
+def legacy_compress_compressed_image(msg, output):
+    """
+    The previous CompressedImage re-encode path: full resolution decode, stride-based
+    downscale, encode.
+    """
+    img = compression.decode_jpeg(bytearray(msg.data))
+    if img.shape[0] > 800 or img.shape[1] > 800:
+        stride = int(np.ceil(max(img.shape[0] / 800.0, img.shape[1] / 800.0)))
+        img = img[::stride,::stride]
+    output["_data_jpeg"] = compression.encode_jpeg(img)
+
+def benchmarks():
+    """
+    Returns [(name, function)] of all the benchmarks. Messages are built lazily, on the first
+    call, so that filtering doesn't pay for building all of them.
+    """
+    cases = [("image/%s" % encoding, lambda encoding = encoding: sim_msgs.image(encoding))
+        for encoding in sim_msgs.image_encodings()]
+    cases += [
+        ("image/rgb8_1080p", lambda: sim_msgs.image("rgb8", 1080, 1920)),
+        ("image/rgb8_4k", lambda: sim_msgs.image("rgb8", 2160, 3840)),
+        ("compressed_image/480p", lambda: sim_msgs.compressed_image(480, 640)),
+        ("compressed_image/4k", lambda: sim_msgs.compressed_image(2160, 3840)),
+        ("compressed_image/12mp", lambda: sim_msgs.compressed_image(3000, 4000)),
+        ("compressed_image/24mp", lambda: sim_msgs.compressed_image(4000, 6000)),
+        ("point_cloud2/16k", lambda: sim_msgs.point_cloud2(16384)),
+        ("point_cloud2/128k", lambda: sim_msgs.point_cloud2(131072)),
+        ("laser_scan/1081", lambda: sim_msgs.laser_scan(1081)),
+        ("laser_scan/3600", lambda: sim_msgs.laser_scan(3600)),
+        ("occupancy_grid/1000", lambda: sim_msgs.occupancy_grid(1000, 1000)),
+        ("occupancy_grid/2000", lambda: sim_msgs.occupancy_grid(2000, 2000)),
+        ("tf_message/50", lambda: sim_msgs.tf_message(50)),
+        ("marker_array/200", lambda: sim_msgs.marker_array(200, 20)),
+    ]
+
+    compress_functions = {
+        "image": compression.compress_image,
+        "compressed_image": compression.compress_compressed_image,
+        "point_cloud2": compression.compress_point_cloud2,
+        "laser_scan": compression.compress_laser_scan,
+        "occupancy_grid": compression.compress_occupancy_grid,
+    }
+
+    result = []
+    for case, make_msg in cases:
+        cache = {}
+        def msg(make_msg = make_msg, cache = cache):
+            if "msg" not in cache:
+                cache["msg"] = make_msg()
+            return cache["msg"]
+        def msg_dict(msg = msg, cache = cache):
+            if "dict" not in cache:
+                cache["dict"] = ros2dict(msg())
+            return cache["dict"]
+
+        kind = case.split("/")[0]
+        if kind in compress_functions:
+            result.append(("compress/" + case, lambda fn = compress_functions[kind], msg = msg: fn(msg(), {})))
+        if kind == "compressed_image" and case != "compressed_image/480p":
+            # the re-encode path before scaled decoding, to compare with compress/compressed_image
+            result.append(("legacy/" + case, lambda msg = msg: legacy_compress_compressed_image(msg(), {})))
+        result.append(("ros2dict/" + case, lambda msg = msg: ros2dict(msg())))
+        result.append(("json/" + case, lambda msg_dict = msg_dict: encode(msg_dict())))
+    return result
+
+def measure(fn, min_time = 0.2, rounds = 5):
+    """
+    Calls fn in rounds 5 times, each of at least min_time / rounds seconds, and returns the
+    median and the minimum time per call (seconds), and the number of calls.
+    """
+    fn() # warm up, and build the message
+    t = time.perf_counter()
+    fn()
+    once = max(time.perf_counter() - t, 1e-7)
+    calls = max(1, int(min_time / rounds / once))
+
+    times = []
+    for _ in range(rounds):
+        t = time.perf_counter()
+        for _ in range(calls):
+            fn()
+        times.append((time.perf_counter() - t) / calls)
+    return {"median": statistics.median(times), "min": min(times), "calls": calls * rounds}
+
+def environment():
+    if compression.simplejpeg is not None:
+        jpeg = "simplejpeg"
+    elif compression.cv2 is not None:
+        jpeg = "cv2"
+    elif compression.PIL is not None:
+        jpeg = "PIL"
+    else:
+        jpeg = None
+    return {
+        "host": platform.node(),
+        "machine": platform.machine(),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "jpeg": jpeg,
+    }
+
+def format_time(seconds):
+    if seconds >= 1e-3:
+        return "%8.2f ms" % (seconds * 1e3)
+    return "%8.1f us" % (seconds * 1e6)
+
+def main():
+    parser = argparse.ArgumentParser(description = "Benchmarks rosboard's serialization hot path without ROS.")
+    parser.add_argument("-k", "--filter", help = "only run benchmarks whose name matches this regex")
+    parser.add_argument("--min-time", type = float, default = 0.2, help = "seconds to spend on each benchmark")
+    parser.add_argument("--baseline", default = os.path.join(BASELINE_DIR, "%s.json" % platform.node()),
+        help = "baseline file (default: benchmarks/baselines/<hostname>.json)")
+    parser.add_argument("--save", action = "store_true", help = "store the results as the baseline")
+    parser.add_argument("--compare", action = "store_true", help = "compare with the baseline")
+    parser.add_argument("--threshold", type = float, default = 0.25,
+        help = "slowdown (fraction of the baseline median) counted as a regression")
+    parser.add_argument("--list", action = "store_true", help = "list the benchmarks and exit")
+    args = parser.parse_args()
+
+    selected = benchmarks()
+    if args.filter:
+        selected = [(name, fn) for name, fn in selected if re.search(args.filter, name)]
+    if args.list:
+        print("\n".join(name for name, fn in selected))
+        return 0
+
+    baseline = None
+    if args.compare:
+        try:
+            with open(args.baseline, "r") as f:
+                baseline = json.load(f)
+        except (OSError, ValueError) as e:
+            print("Can't read baseline %s: %s" % (args.baseline, str(e)))
+            if not os.path.exists(args.baseline):
+                print("Baselines are local to each host; create one with --save on a checkout to compare against.")
+            return 2
+        if baseline.get("environment") != environment():
+            print("warning: baseline environment %s differs from %s" % (baseline.get("environment"), environment()))
+
+    np.random.seed(0) # compress_point_cloud2 subsamples randomly
+    results = {}
+    regressions = []
+    errors = []
+    for name, fn in selected:
+        try:
+            results[name] = measure(fn, min_time = args.min_time)
+        except Exception as e:
+            print("%-40s ERROR %s: %s" % (name, type(e).__name__, str(e)))
+            errors.append(name)
+            continue
+        line = "%-40s %s  (min %s, %d calls)" % (name, format_time(results[name]["median"]),
+            format_time(results[name]["min"]).strip(), results[name]["calls"])
+        previous = baseline["results"].get(name) if baseline else None
+        if previous:
+            change = results[name]["median"] / previous["median"] - 1.0
+            line += "  %+6.1f%%" % (change * 100)
+            if change > args.threshold:
+                line += "  REGRESSION"
+                regressions.append(name)
+        print(line)
+        sys.stdout.flush()
+
+    if args.save:
+        os.makedirs(os.path.dirname(os.path.abspath(args.baseline)), exist_ok = True)
+        with open(args.baseline, "w") as f:
+            json.dump({"environment": environment(), "results": results}, f, indent = 1, sort_keys = True)
+        print("Saved baseline to %s" % args.baseline)
+
+    if errors:
+        print("%d benchmark(s) failed: %s" % (len(errors), ", ".join(errors)))
+    if regressions:
+        print("%d benchmark(s) slower than the baseline by more than %d%%: %s" % (
+            len(regressions), args.threshold * 100, ", ".join(regressions)))
+    return 1 if errors or regressions else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,226 @@
+#!/usr/bin/env python3
+
+"""
+WebSocket fan-out load test: runs rosboard on synthetic topics (the sim backend, see
+rosboard/backends/sim.py) in a child process, then connects more and more headless clients to it. Each client
+subscribes to all the topics at one of the --max-update-rates. For every client count the
+test reports:
+- the delivered message rate, as a fraction of the expected min(publish rate, maxUpdateRate)
+- percentiles of the end-to-end latency, from header.stamp (set when the message is
+  published) to the client receiving it
+- the CPU and memory use of the server
+
+Everything runs on localhost. Clients are spread over --client-processes processes, so
+they don't saturate before the server does; the CPU they use is reported too.
+
+Run from the repository root:
+    python3 benchmarks/loadtest.py
+    python3 benchmarks/loadtest.py --clients 1,10,50 --duration 10 \\
+        --topic /camera:image:30:1080x1920 --topic /scan:laser_scan:40
+"""
+
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import re
+import socket
+import subprocess
+import sys
+import time
+
+ROOT = os.path.join(os.path.dirname(os.path.realpath(__file__)), "..")
+sys.path.insert(0, ROOT)
+
+DEFAULT_TOPICS = [
+    "/camera/image_raw:image:30:720x1280",
+    "/camera/compressed:compressed_image:30:480x640",
+    "/scan:laser_scan:40:1081",
+    "/points:point_cloud2:10:65536",
+    "/tf:tf_message:100:20",
+    "/markers:marker_array:5:100",
+]
+
+# header stamp near the start of a message, topic name near its end
+_stamp_re = re.compile(r'"stamp":\{"secs":(\d+),"nsecs":(\d+)\}')
+_topic_re = re.compile(r'"_topic_name":"([^"]*)"')
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+def wait_for_port(port, timeout = 30.0):
+    end_time = time.monotonic() + timeout
+    while time.monotonic() < end_time:
+        try:
+            with socket.create_connection(("127.0.0.1", port), timeout = 1.0):
+                return True
+        except OSError:
+            time.sleep(0.2)
+    return False
+
+def process_times(pid):
+    """
+    Returns (CPU seconds used, resident memory in bytes) of process pid, from /proc.
+    """
+    with open("/proc/%d/stat" % pid, "r") as f:
+        fields = f.read().rpartition(")")[2].split()
+    with open("/proc/%d/statm" % pid, "r") as f:
+        rss = int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    # fields[0] is field 3 (state) of proc(5): utime is 14, stime 15
+    return (int(fields[11]) + int(fields[12])) / os.sysconf("SC_CLK_TCK"), rss
+
+async def run_client(port, topics, max_update_rate, start_time, end_time, stats):
+    """
+    One dashboard: subscribes to topics at max_update_rate, and records the messages and
+    latencies received between start_time and end_time (time.time()) in stats.
+    """
+    from tornado.websocket import websocket_connect
+
+    connection = await websocket_connect("ws://127.0.0.1:%d/rosboard/v1" % port, max_message_size = 1 << 30)
+    for topic_name in topics:
+        connection.write_message(json.dumps(["s", {"topicName": topic_name, "maxUpdateRate": max_update_rate}]))
+
+    counts = {topic_name: 0 for topic_name in topics}
+    while True:
+        remaining = end_time - time.time()
+        if remaining <= 0:
+            break
+        try:
+            message = await asyncio.wait_for(connection.read_message(), remaining)
+        except asyncio.TimeoutError:
+            break
+        if message is None:
+            stats["errors"] += 1
+            return
+        t = time.time()
+        if message.startswith('["p"'):
+            # answer pings, like the browser does
+            connection.write_message(json.dumps(["q", {"s": json.loads(message)[1].get("s", 0), "t": t * 1000}]))
+            continue
+        if not message.startswith('["m"') or t < start_time:
+            continue
+        # parse only what's needed, so that clients keep up with the server
+        topic_match = _topic_re.search(message, max(0, len(message) - 1024))
+        if topic_match is None or topic_match.group(1) not in counts:
+            continue
+        counts[topic_match.group(1)] += 1
+        stamp_match = _stamp_re.search(message, 0, 4096)
+        if stamp_match is not None:
+            stats["latencies"].append(t - int(stamp_match.group(1)) - int(stamp_match.group(2)) * 1e-9)
+    connection.close()
+    stats["counts"].append((max_update_rate, counts))
+
+def run_clients(args):
+    """
+    Runs a share of the clients in one process. Returns their stats and the CPU time used.
+    """
+    port, topics, rates, first_client, clients, start_time, end_time = args
+    stats = {"counts": [], "latencies": [], "errors": 0}
+
+    async def main():
+        await asyncio.gather(*[run_client(port, topics, rates[i % len(rates)], start_time, end_time, stats)
+            for i in range(first_client, first_client + clients)], return_exceptions = False)
+
+    cpu_start = time.process_time()
+    try:
+        asyncio.run(main())
+    except Exception as e:
+        stats["errors"] += 1
+        stats["exception"] = "%s: %s" % (type(e).__name__, str(e))
+    stats["cpu"] = time.process_time() - cpu_start
+    return stats
+
+def percentile(values, p):
+    if not values:
+        return float("nan")
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(p / 100.0 * (len(values) - 1))))]
+
+def main():
+    parser = argparse.ArgumentParser(description = "Load-tests rosboard's WebSocket fan-out on synthetic topics.")
+    parser.add_argument("--clients", default = "1,2,5,10,20,50,100,200", help = "comma-separated client counts")
+    parser.add_argument("--topic", action = "append", dest = "topics",
+        help = "synthetic topic as name:kind:rate[:size] (repeatable); kinds: image, compressed_image, "
+               "point_cloud2, laser_scan, occupancy_grid, tf_message, marker_array, log")
+    parser.add_argument("--max-update-rates", default = "5,10,24,60",
+        help = "comma-separated maxUpdateRate values, assigned to the clients in turn")
+    parser.add_argument("--duration", type = float, default = 5.0, help = "seconds measured per client count")
+    parser.add_argument("--warmup", type = float, default = 2.0, help = "seconds before measuring")
+    parser.add_argument("--client-processes", type = int, default = max(1, min(4, (os.cpu_count() or 2) // 2)))
+    parser.add_argument("--port", type = int, default = 0, help = "server port (default: any free port)")
+    args = parser.parse_args()
+
+    topic_specs = args.topics or DEFAULT_TOPICS
+    port = args.port or free_port()
+    from rosboard.backends.sim import SimTopic
+    topics = [SimTopic.parse(spec) for spec in topic_specs]
+    rates = [float(rate) for rate in args.max_update_rates.split(",")]
+
+    command = [sys.executable, os.path.join(ROOT, "run"), "_port:=%d" % port, "_sim_topics:=%s" % ",".join(topic_specs)]
+    server = subprocess.Popen(command, env = dict(os.environ, ROSBOARD_BACKEND = "sim"),
+        stdout = subprocess.DEVNULL, stderr = subprocess.DEVNULL)
+    try:
+        if not wait_for_port(port):
+            print("rosboard didn't start listening on port %d" % port)
+            return 1
+
+        print("topics: %s" % ", ".join("%s (%s, %g Hz)" % (topic.name, topic.type, topic.rate) for topic in topics))
+        print("maxUpdateRate of the clients: %s" % ", ".join("%g" % rate for rate in rates))
+        print()
+        print("%7s  %9s  %9s  %9s  %9s  %10s  %9s  %10s  %6s" % ("clients", "delivered", "lat p50",
+            "lat p90", "lat p99", "server cpu", "server rss", "client cpu", "errors"))
+
+        pool = multiprocessing.Pool(args.client_processes)
+        for clients in [int(n) for n in args.clients.split(",")]:
+            start_time = time.time() + 1.0 + args.warmup
+            end_time = start_time + args.duration
+            processes = min(args.client_processes, clients)
+            shares = [clients // processes + (1 if i < clients % processes else 0) for i in range(processes)]
+            result = pool.map_async(run_clients, [(port, [topic.name for topic in topics], rates,
+                sum(shares[:i]), shares[i], start_time, end_time) for i in range(processes)])
+
+            time.sleep(max(0.0, start_time - time.time()))
+            cpu_start = process_times(server.pid)[0]
+            time.sleep(max(0.0, end_time - time.time()))
+            cpu_end, rss_end = process_times(server.pid)
+            results = result.get()
+
+            # delivered messages as a fraction of what each client should have received
+            delivered = expected = 0.0
+            latencies = []
+            errors = 0
+            client_cpu = 0.0
+            for stats in results:
+                latencies += stats["latencies"]
+                errors += stats["errors"]
+                client_cpu += stats["cpu"]
+                if "exception" in stats:
+                    print("client error: %s" % stats["exception"])
+                for max_update_rate, counts in stats["counts"]:
+                    for topic in topics:
+                        delivered += counts[topic.name]
+                        expected += min(topic.rate, max_update_rate) * args.duration
+
+            print("%7d  %8.1f%%  %7.1f ms  %6.1f ms  %6.1f ms  %9.0f%%  %7.0f MB  %9.0f%%  %6d" % (
+                clients,
+                100.0 * delivered / expected if expected else 0.0,
+                percentile(latencies, 50) * 1000,
+                percentile(latencies, 90) * 1000,
+                percentile(latencies, 99) * 1000,
+                100.0 * (cpu_end - cpu_start) / args.duration,
+                rss_end / 1e6,
+                100.0 * client_cpu / (end_time - start_time + 1.0 + args.warmup),
+                errors,
+            ))
+            sys.stdout.flush()
+        pool.close()
+    finally:
+        server.terminate()
+        server.wait()
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,268 @@
+#!/usr/bin/env python3
+
+"""
+Manifest of the static web assets under html/, built at startup.
+
+Every asset is fingerprinted with a hash of its content and kept in memory together with
+gzip (and, if the brotli module is installed, brotli) variants prebuilt in the background.
+References to assets are rewritten to versioned URLs (path?v=<hash>), which StaticAssetHandler serves with
+immutable caching: in index.html (src/href attributes, plus a table of versions that
+import-helper.js uses for viewers loaded at runtime) and in stylesheets (url(...)).
+"""
+
+import gzip
+import hashlib
+import json
+import mimetypes
+import os
+import re
+import threading
+import time
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# extensions of files worth precompressing; images and woff fonts are already compressed
+COMPRESSIBLE_EXTENSIONS = {".html", ".js", ".css", ".map", ".json", ".svg", ".ttf", ".eot", ".txt", ".md"}
+
+# the page itself; always revalidated, and the only asset whose URL can't be versioned
+INDEX_FILENAME = "index.html"
+
+# directory of the viewer classes, relative to the root
+VIEWERS_DIR = "js/viewers"
+
+_class_re = re.compile(r"^class\s+(\w+)(?:\s+extends\s+(\w+))?", re.M)
+_string_re = re.compile(r"\"([^\"]*)\"|'([^']*)'")
+
+_html_ref_re = re.compile(r'''(\s(?:src|href)=")([^"?#:]+)(")''')
+_css_url_re = re.compile(r'''url\((['"]?)([^'")?#:]+)([^'")]*)\1\)''')
+
+class Asset(object):
+    def __init__(self, path, stat_result, content):
+        self.path = path
+        self.mtime = stat_result.st_mtime
+        self.size = stat_result.st_size
+        self.content_type = mimetypes.guess_type(path)[0] or "application/octet-stream"
+        self.set_content(content)
+
+    def set_content(self, content):
+        """
+        Sets the (possibly rewritten) content to serve, and rebuilds its version and
+        compressed variants.
+        """
+        self.content = content
+        self.version = hashlib.sha256(content).hexdigest()[:16]
+        self.variants = {}
+        self.compressed = os.path.splitext(self.path)[1].lower() not in COMPRESSIBLE_EXTENSIONS or len(content) <= 1024
+
+    def compress(self):
+        """
+        Builds the compressed variants of the content; until then it is served uncompressed.
+        """
+        content = self.content
+        variants = {}
+        compressed = gzip.compress(content, compresslevel = 9, mtime = 0)
+        if len(compressed) < 0.9 * len(content):
+            variants["gzip"] = compressed
+        if brotli is not None:
+            compressed = brotli.compress(content, quality = 9)
+            if len(compressed) < 0.9 * len(content):
+                variants["br"] = compressed
+        if content is self.content:
+            self.variants = variants
+            self.compressed = True
+
+    def negotiate(self, accept_encoding):
+        """
+        Returns (encoding, body) for a request with the given Accept-Encoding header;
+        encoding is None for the identity encoding.
+        """
+        accepted = [token.split(";")[0].strip() for token in (accept_encoding or "").split(",")]
+        for encoding in ("br", "gzip"):
+            if encoding in accepted and encoding in self.variants:
+                return encoding, self.variants[encoding]
+        return None, self.content
+
+class AssetManifest(object):
+    """
+    The root is scanned once at startup. With a rescan_interval (seconds), for working on the
+    frontend, maybe_refresh() rescans it at most that often to pick up edited assets.
+    """
+
+    def __init__(self, root, rescan_interval = None):
+        self.root = os.path.realpath(root)
+        self.assets = {} # path relative to root, with forward slashes -> Asset
+        self.lock = threading.Lock()
+        self.rescan_interval = rescan_interval
+        self.last_scan_time = 0.0
+        self._viewers_key, self._viewers = None, []
+        self._compressing = False
+        self._compress_again = False
+        self.refresh()
+
+    def version(self, path):
+        asset = self.assets.get(path)
+        return asset.version if asset else None
+
+    def url(self, path):
+        """
+        Returns the versioned URL of the asset at path (relative to the root).
+        """
+        version = self.version(path)
+        return path + ("?v=" + version if version else "")
+
+    def get(self, path):
+        return self.assets.get(path)
+
+    def viewers(self):
+        """
+        Returns the manifest of the viewer classes under VIEWERS_DIR, parsed from their source:
+        a list of {"name", "path", "extends", "friendlyName", "supportedTypes"} sorted by path.
+        Viewers that don't declare supportedTypes or friendlyName inherit them from their base
+        class, as they would in JavaScript. The result is cached until one of the files changes.
+        """
+        with self.lock:
+            sources = sorted((path, asset) for path, asset in self.assets.items()
+                if path.startswith(VIEWERS_DIR + "/") and path.endswith(".js"))
+            key = tuple((path, asset.version) for path, asset in sources)
+            if self._viewers_key == key:
+                return self._viewers
+
+            viewers = []
+            for path, asset in sources:
+                source = asset.content.decode("utf-8", errors = "replace")
+                match = _class_re.search(source)
+                if match is None:
+                    continue
+                name, base = match.groups()
+                viewers.append({
+                    "name": name,
+                    "path": path,
+                    "extends": base,
+                    "friendlyName": _parse_static(source, name, "friendlyName", single = True),
+                    "supportedTypes": _parse_static(source, name, "supportedTypes"),
+                })
+
+            by_name = {viewer["name"]: viewer for viewer in viewers}
+            def inherit(viewer, prop, default, depth = 0):
+                if viewer[prop] is None:
+                    base = by_name.get(viewer["extends"])
+                    viewer[prop] = inherit(base, prop, default, depth + 1) if base and depth < 10 else default
+                return viewer[prop]
+            for viewer in viewers:
+                inherit(viewer, "supportedTypes", [])
+                inherit(viewer, "friendlyName", viewer["name"])
+
+            self._viewers_key, self._viewers = key, viewers
+            return viewers
+
+    def maybe_refresh(self):
+        """
+        Rescans the root if rescanning is enabled and the last scan is older than rescan_interval.
+        """
+        if self.rescan_interval is not None and time.monotonic() - self.last_scan_time >= self.rescan_interval:
+            self.refresh()
+
+    def refresh(self):
+        """
+        Rescans the root, reloading files whose mtime or size changed and rewriting the
+        stylesheets and index.html if anything did. Costs one stat per file when nothing changed.
+        """
+        with self.lock:
+            self.last_scan_time = time.monotonic()
+            changed = False
+            found = set()
+            for dirpath, dirnames, filenames in os.walk(self.root):
+                dirnames[:] = [d for d in dirnames if not d.startswith(".")]
+                for filename in filenames:
+                    if filename.startswith("."):
+                        continue
+                    abspath = os.path.join(dirpath, filename)
+                    path = os.path.relpath(abspath, self.root).replace(os.sep, "/")
+                    found.add(path)
+                    try:
+                        stat_result = os.stat(abspath)
+                    except OSError:
+                        continue
+                    asset = self.assets.get(path)
+                    if asset is not None and asset.mtime == stat_result.st_mtime and asset.size == stat_result.st_size:
+                        continue
+                    with open(abspath, "rb") as f:
+                        self.assets[path] = Asset(path, stat_result, f.read())
+                    changed = True
+
+            for path in set(self.assets) - found:
+                del self.assets[path]
+                changed = True
+
+            if changed:
+                # stylesheets reference fonts and images, and index.html references everything
+                for path, asset in self.assets.items():
+                    if path.endswith(".css"):
+                        self._rewrite_css(asset)
+                if INDEX_FILENAME in self.assets:
+                    self._rewrite_index(self.assets[INDEX_FILENAME])
+
+                # one compressor thread at a time; if it's running, it takes another pass
+                if self._compressing:
+                    self._compress_again = True
+                else:
+                    self._compressing = True
+                    threading.Thread(target = self._compress_all, name = "rosboard-assets", daemon = True).start()
+
+    def _compress_all(self):
+        # runs in the background so that startup isn't delayed by a few seconds of compression
+        while True:
+            for asset in list(self.assets.values()):
+                if not asset.compressed:
+                    asset.compress()
+            with self.lock:
+                if not self._compress_again:
+                    self._compressing = False
+                    return
+                self._compress_again = False
+
+    def _read(self, path):
+        with open(os.path.join(self.root, path), "rb") as f:
+            return f.read()
+
+    def _rewrite_css(self, asset):
+        base = os.path.dirname(asset.path)
+
+        def replace(match):
+            quote, ref, suffix = match.groups()
+            version = self.version(os.path.normpath(os.path.join(base, ref)).replace(os.sep, "/"))
+            if version is None:
+                return match.group(0)
+            suffix = ("&" + suffix[1:]) if suffix.startswith("?") else suffix
+            return "url(%s%s?v=%s%s%s)" % (quote, ref, version, suffix, quote)
+
+        asset.set_content(_css_url_re.sub(replace, self._read(asset.path).decode("utf-8")).encode("utf-8"))
+
+    def _rewrite_index(self, asset):
+        def replace(match):
+            before, ref, after = match.groups()
+            return before + self.url(ref) + after
+
+        html = _html_ref_re.sub(replace, self._read(asset.path).decode("utf-8"))
+
+        # versions of the scripts and stylesheets loaded at runtime by importJsOnce/importCssOnce
+        versions = {path: a.version for path, a in self.assets.items() if path.endswith((".js", ".css"))}
+        script = "<script>window.ROSBOARD_ASSET_VERSIONS = %s;</script>" % json.dumps(versions, sort_keys = True)
+        html = html.replace("<head>", "<head>\n        " + script, 1)
+        asset.set_content(html.encode("utf-8"))
+
+def _parse_static(source, class_name, prop, single = False):
+    """
+    Parses the string literal(s) assigned to a static property of a class in JavaScript source,
+    e.g. Foo.supportedTypes = ["a", "b"]; returns None if the property isn't assigned.
+    """
+    match = re.search(r"^%s\.%s\s*=\s*(.*?);" % (re.escape(class_name), re.escape(prop)), source, re.M | re.S)
+    if match is None:
+        return None
+    values = [double or single for double, single in _string_re.findall(match.group(1))]
+    if single:
+        return values[0] if values else None
+    return values
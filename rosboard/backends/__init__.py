@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+
+"""
+Middleware backends: everything ROSBoardNode needs from ROS (node setup, parameters,
+logging, topic discovery, subscribing and publishing) behind one interface, implemented for
+ROS1 (rospy), ROS2 (rosboard.rospy2 over rclpy) and "sim", which publishes synthetic or
+recorded messages without any ROS install.
+
+The backend is chosen by the ROSBOARD_BACKEND environment variable (ros1, ros2 or sim), or
+else by ROS_VERSION as set by sourcing a ROS environment.
+"""
+
+import importlib
+import os
+import struct
+import time
+
+BACKENDS = {
+    "ros1": ("rosboard.backends.ros1", "ROS1Backend"),
+    "ros2": ("rosboard.backends.ros2", "ROS2Backend"),
+    "sim": ("rosboard.backends.sim", "SimBackend"),
+}
+
+class SerializedMessage(object):
+    """
+    A message as received by a raw subscriber, not deserialized yet: size is its size in bytes,
+    stamp its header.stamp (seconds) if the type starts with a header, else None, and
+    deserialize() returns the message object.
+    """
+    __slots__ = ("data", "size", "stamp", "deserializer")
+
+    def __init__(self, data, deserializer, stamp = None):
+        self.data = data
+        self.size = len(data)
+        self.stamp = stamp
+        self.deserializer = deserializer
+
+    def deserialize(self):
+        return self.deserializer(self.data)
+
+def header_stamp(data, offset, little_endian = True):
+    """
+    Returns the stamp (seconds) of a serialized header at offset in data: a 32-bit seconds then
+    a 32-bit nanoseconds field, as in both ROS1 and CDR (ROS2) serialization.
+    """
+    if len(data) < offset + 8:
+        return None
+    secs, nsecs = struct.unpack_from("<II" if little_endian else ">II", data, offset)
+    return secs + nsecs * 1e-9
+
+class Backend(object):
+    """
+    Interface of the backends. Type names are strings like "sensor_msgs/Image" (ROS1) or
+    "sensor_msgs/msg/Image" (ROS2); subscriber callbacks are called as
+    callback(msg, callback_args) from the backend's threads.
+    """
+
+    name = None
+
+    def init_node(self, node_name):
+        raise NotImplementedError
+
+    def get_param(self, param_name, default = None):
+        raise NotImplementedError
+
+    def spin(self):
+        """
+        Blocks until shutdown.
+        """
+        raise NotImplementedError
+
+    def loginfo(self, text):
+        print("[INFO] [%f] %s" % (time.time(), text))
+
+    def logwarn(self, text):
+        print("[WARN] [%f] %s" % (time.time(), text))
+
+    def logerr(self, text):
+        print("[ERROR] [%f] %s" % (time.time(), text))
+
+    def get_published_topics(self):
+        """
+        Returns [(topic_name, type name)] of all the topics being published.
+        """
+        raise NotImplementedError
+
+    def get_msg_class(self, msg_type):
+        """
+        Returns the message class of a type name, or None if it can't be loaded.
+        """
+        try:
+            msg_module, dummy, msg_class_name = msg_type.replace("/", ".").rpartition(".")
+        except ValueError:
+            self.logerr("invalid type %s" % msg_type)
+            return None
+
+        try:
+            if not msg_module.endswith(".msg"):
+                msg_module = msg_module + ".msg"
+            return getattr(importlib.import_module(msg_module), msg_class_name)
+        except Exception as e:
+            self.logerr(str(e))
+            return None
+
+    def subscribe(self, topic_name, msg_class, callback, callback_args = None, raw = False, latest_only = False):
+        """
+        Subscribes to topic_name. Returns the subscriber, which has an unregister() method and
+        an ingestion attribute: a dict describing how its messages are queued.
+        With raw = True, backends that receive serialized messages pass them to the callback
+        as SerializedMessages, so that only the messages that are used get deserialized.
+        With latest_only = True, messages are queued as little as the middleware allows, so
+        that a slow callback skips to the newest message instead of working through a backlog.
+        """
+        raise NotImplementedError
+
+    def advertise(self, topic_name, msg_class):
+        """
+        Returns a publisher (with a publish(msg) method) for messages sent by clients to
+        topic_name. Messages aren't latched or stored.
+        """
+        raise NotImplementedError
+
+    def set_stamp(self, header):
+        """
+        Sets header.stamp to the current time.
+        """
+        now = time.time()
+        sec = int(now)
+        nsec = int((now - sec) * 1e9)
+        if hasattr(header.stamp, 'sec'):
+            header.stamp.sec = sec
+        if hasattr(header.stamp, 'nanosec'):
+            header.stamp.nanosec = nsec
+        if hasattr(header.stamp, 'secs'):
+            header.stamp.secs = sec
+        if hasattr(header.stamp, 'nsecs'):
+            header.stamp.nsecs = nsec
+
+def backend_name():
+    """
+    Returns the name of the backend to use, or None if there's none (no ROS environment).
+    """
+    name = os.environ.get("ROSBOARD_BACKEND")
+    if name:
+        return name.lower()
+    return {"1": "ros1", "2": "ros2"}.get(os.environ.get("ROS_VERSION"))
+
+def load_backend(name = None):
+    """
+    Imports and returns an instance of the backend called name (by default, see
+    backend_name()). Raises ValueError for unknown backends, and ImportError if the backend's
+    middleware isn't installed.
+    """
+    name = name or backend_name()
+    if name not in BACKENDS:
+        raise ValueError("unknown backend %s (one of %s)" % (name, ", ".join(BACKENDS)))
+    module_name, class_name = BACKENDS[name]
+    return getattr(importlib.import_module(module_name), class_name)()
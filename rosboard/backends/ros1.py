@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+
+import rospy
+
+from rosboard.backends import Backend, SerializedMessage, header_stamp
+
+# receive buffer (bytes) of latest-only subscribers. rospy only skips to the newest message if
+# whole messages fit in it (e.g. a 25 MB raw 4K image); otherwise they back up in the socket
+LATEST_ONLY_BUFF_SIZE = 1 << 25
+
+class ROS1Backend(Backend):
+    name = "ros1"
+
+    def init_node(self, node_name):
+        rospy.init_node(node_name)
+
+    def get_param(self, param_name, default = None):
+        return rospy.get_param(param_name, default)
+
+    def spin(self):
+        rospy.spin()
+
+    def loginfo(self, text):
+        rospy.loginfo(text)
+
+    def logwarn(self, text):
+        rospy.logwarn(text)
+
+    def logerr(self, text):
+        rospy.logerr(text)
+
+    def get_published_topics(self):
+        return rospy.get_published_topics()
+
+    def subscribe(self, topic_name, msg_class, callback, callback_args = None, raw = False, latest_only = False):
+        if latest_only:
+            options = {"queue_size": 1, "buff_size": LATEST_ONLY_BUFF_SIZE}
+        else:
+            options = {} # unbounded queue, default buffer
+
+        if not raw:
+            subscriber = rospy.Subscriber(topic_name, msg_class, callback, callback_args = callback_args, **options)
+        else:
+            # the header, if any, is the first field: uint32 seq, then the stamp
+            has_header = getattr(msg_class, "_has_header", False)
+
+            def deserialize(data):
+                msg = msg_class()
+                msg.deserialize(data)
+                return msg
+
+            def on_raw_msg(msg, callback_args = None):
+                # rospy.AnyMsg keeps the serialized message in _buff
+                data = msg._buff
+                callback(SerializedMessage(data, deserialize, header_stamp(data, 4) if has_header else None), callback_args)
+
+            subscriber = rospy.Subscriber(topic_name, rospy.AnyMsg, on_raw_msg, callback_args = callback_args, **options)
+
+        subscriber.ingestion = {"latest_only": latest_only, "queue_size": options.get("queue_size"),
+            "buff_size": options.get("buff_size"), "raw": raw}
+        return subscriber
+
+    def advertise(self, topic_name, msg_class):
+        # latch=False so that the message is not stored
+        return rospy.Publisher(topic_name, msg_class, queue_size = 1, latch = False)
+
+    def set_stamp(self, header):
+        header.stamp = rospy.Time.now()
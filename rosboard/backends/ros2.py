@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+
+import os
+
+import rosboard.rospy2 as rospy
+from rclpy.qos import HistoryPolicy, QoSProfile, QoSReliabilityPolicy, QoSDurabilityPolicy
+
+from rosboard.backends import Backend, SerializedMessage, header_stamp
+
+class ROS2Backend(Backend):
+    name = "ros2"
+
+    def init_node(self, node_name):
+        # callbacks of different topics run in parallel on a pool of this many threads (default:
+        # one per CPU). it's set in the environment because the pool is created along with the
+        # node, before its parameters can be read
+        num_threads = int(os.environ.get("ROSBOARD_EXECUTOR_THREADS", "0")) or None
+        rospy.init_node(node_name, num_threads = num_threads)
+
+        # ros2 hack: need to subscribe to at least 1 topic
+        # before dynamic subscribing will work later.
+        # ros2 docs don't explain why but we need this magic.
+        from rosgraph_msgs.msg import Log
+        self.sub_rosout = rospy.Subscriber("/rosout", Log, lambda x:x)
+
+    def get_param(self, param_name, default = None):
+        return rospy.get_param(param_name, default)
+
+    def spin(self):
+        rospy.spin()
+
+    def loginfo(self, text):
+        rospy.loginfo(text)
+
+    def logwarn(self, text):
+        rospy.logwarn(text)
+
+    def logerr(self, text):
+        rospy.logerr(text)
+
+    def get_published_topics(self):
+        return rospy.get_published_topics()
+
+    def get_topic_qos(self, topic_name: str) -> QoSProfile:
+        """!
+        Given a topic name, get the QoS profile with which it is being published
+        @param topic_name (str) the topic name
+        @return QosProfile the qos profile with which the topic is published. If no publishers exist
+        for the given topic, it returns the sensor data QoS.
+        """
+        topic_info = rospy._node.get_publishers_info_by_topic(topic_name=topic_name)
+        if len(topic_info):
+            if topic_info[0].qos_profile.history == HistoryPolicy.UNKNOWN:
+                topic_info[0].qos_profile.history = HistoryPolicy.KEEP_LAST
+            return topic_info[0].qos_profile
+        else:
+            rospy.logwarn(f"No publishers available for topic {topic_name}. Returning sensor data QoS")
+            return QoSProfile(
+                    depth=10,
+                    reliability=QoSReliabilityPolicy.BEST_EFFORT,
+                    # reliability=QoSReliabilityPolicy.RELIABLE,
+                    durability=QoSDurabilityPolicy.VOLATILE,
+                    # durability=QoSDurabilityPolicy.TRANSIENT_LOCAL,
+                )
+
+    def latest_only_qos(self, qos_profile: QoSProfile) -> QoSProfile:
+        """!
+        Makes a subscriber QoS profile keep only the newest message, while staying compatible with
+        the publisher's profile it was copied from
+        @param qos_profile (QoSProfile) the publisher's profile, modified in place
+        @return QoSProfile the same profile, KEEP_LAST with depth 1 and BEST_EFFORT, unless the
+        topic is TRANSIENT_LOCAL (latched, e.g. maps): those are left as they are, since best effort
+        could lose the stored messages and depth 1 would keep only one publisher's.
+        """
+        if qos_profile.durability == QoSDurabilityPolicy.TRANSIENT_LOCAL:
+            return qos_profile
+        qos_profile.history = HistoryPolicy.KEEP_LAST
+        qos_profile.depth = 1
+        # a best effort subscriber is compatible with both reliable and best effort publishers
+        qos_profile.reliability = QoSReliabilityPolicy.BEST_EFFORT
+        return qos_profile
+
+    def subscribe(self, topic_name, msg_class, callback, callback_args = None, raw = False, latest_only = False):
+        # To avoid incompatibilities we subscribe using the same Qos
+        # of the topic's publishers
+        qos = self.get_topic_qos(topic_name)
+        if latest_only:
+            qos = self.latest_only_qos(qos)
+
+        if not raw:
+            subscriber = rospy.Subscriber(topic_name, msg_class, callback, callback_args = callback_args, qos = qos)
+        else:
+            # after the 4-byte CDR encapsulation header (whose 2nd byte is 1 for little endian),
+            # the header, if any, starts with the stamp
+            fields = msg_class.get_fields_and_field_types()
+            has_header = next(iter(fields.items()), None) == ("header", "std_msgs/Header")
+
+            def deserialize(data):
+                return rospy.deserialize_message(data, msg_class)
+
+            def on_raw_msg(data, callback_args = None):
+                stamp = header_stamp(data, 4, data[1:2] == b"\x01") if has_header else None
+                callback(SerializedMessage(data, deserialize, stamp), callback_args)
+
+            subscriber = rospy.Subscriber(topic_name, msg_class, on_raw_msg, callback_args = callback_args, qos = qos, raw = True)
+
+        subscriber.ingestion = {
+            "latest_only": latest_only,
+            "history": qos.history.name.lower(),
+            "depth": qos.depth,
+            "reliability": qos.reliability.name.lower(),
+            "durability": qos.durability.name.lower(),
+            "raw": raw,
+        }
+        return subscriber
+
+    def advertise(self, topic_name, msg_class):
+        # prefer VOLATILE durability to avoid transient storage on the topic
+        qos_profile = self.get_topic_qos(topic_name)
+        try:
+            if qos_profile is not None and hasattr(qos_profile, 'durability'):
+                qos_profile.durability = QoSDurabilityPolicy.VOLATILE
+        except Exception:
+            pass
+        return rospy.Publisher(topic_name, msg_class, qos = qos_profile)
@@ -0,0 +1,303 @@
+#!/usr/bin/env python3
+
+"""
+Simulated middleware: publishes synthetic topics (messages from sim_msgs) at set rates,
+and/or replays a recording, so that rosboard's web and encoding pipeline can be run,
+profiled and tuned without a ROS install:
+
+    ROSBOARD_BACKEND=sim ./run _port:=8888 _sim_topics:=/camera:image:30:1080x1920,/scan:laser_scan:40
+    ROSBOARD_BACKEND=sim ./run _sim_recording:=run.bag _sim_speed:=2.0
+
+Parameters are given as ROS1-style _name:=value arguments:
+    ~sim_topics      comma-separated synthetic topics, each "name:kind:rate[:size]" (see KINDS)
+    ~sim_recording   ROS1 bag or ROS2 bag directory (sqlite3 or mcap) to replay, read with the
+                     rosbags package (pip3 install rosbags)
+    ~sim_speed       replay speed of the recording (default 1.0)
+    ~sim_loop        replay the recording in a loop (default true)
+
+Topics only publish while they have subscribers. Callbacks run in the topic's (or the
+recording's) thread, like rospy subscriber threads, so a slow callback lowers the delivered
+rate instead of queueing messages. header.stamp of synthetic messages is the publish time.
+"""
+
+import os
+import sys
+import threading
+import time
+import traceback
+
+from rosboard.backends import Backend
+from rosboard.backends import sim_msgs
+
+# kind -> (type name, factory taking the size string or None)
+KINDS = {
+    "image": ("sensor_msgs/Image",
+        lambda size: sim_msgs.image("rgb8", *[int(x) for x in (size or "720x1280").split("x")])),
+    "compressed_image": ("sensor_msgs/CompressedImage",
+        lambda size: sim_msgs.compressed_image(*[int(x) for x in (size or "480x640").split("x")])),
+    "point_cloud2": ("sensor_msgs/PointCloud2", lambda size: sim_msgs.point_cloud2(int(size or 16384))),
+    "laser_scan": ("sensor_msgs/LaserScan", lambda size: sim_msgs.laser_scan(int(size or 1081))),
+    "occupancy_grid": ("nav_msgs/OccupancyGrid",
+        lambda size: sim_msgs.occupancy_grid(int(size or 1000), int(size or 1000))),
+    "tf_message": ("tf2_msgs/TFMessage", lambda size: sim_msgs.tf_message(int(size or 50))),
+    "marker_array": ("visualization_msgs/MarkerArray", lambda size: sim_msgs.marker_array(int(size or 200))),
+    "log": ("rosgraph_msgs/Log", lambda size: sim_msgs.log(text = "x" * int(size or 80))),
+}
+
+DEFAULT_TOPICS = "/camera/image_raw:image:30,/scan:laser_scan:40,/points:point_cloud2:10,/tf:tf_message:50,/map:occupancy_grid:1"
+
+def parse_args(argv):
+    """
+    Returns the parameters given as _name:=value arguments, as {"~name": value}.
+    """
+    params = {}
+    for arg in argv:
+        if not arg.startswith("_") or ":=" not in arg:
+            continue
+        name, value = arg[1:].split(":=", 1)
+        if value.lower() in ("true", "false"):
+            params["~" + name] = value.lower() == "true"
+            continue
+        for convert in (int, float):
+            try:
+                params["~" + name] = convert(value)
+                break
+            except ValueError:
+                pass
+        else:
+            params["~" + name] = value
+    return params
+
+def stamp(msg, t):
+    """
+    Sets the header stamps of a message to t (seconds).
+    """
+    if hasattr(msg, "header"):
+        headers = [msg.header]
+    elif hasattr(msg, "transforms"):
+        headers = [transform.header for transform in msg.transforms]
+    elif hasattr(msg, "markers"):
+        headers = [marker.header for marker in msg.markers]
+    else:
+        headers = []
+    for header in headers:
+        header.stamp = sim_msgs.Time(secs = int(t), nsecs = int((t % 1) * 1e9))
+
+class SimTopic(object):
+    """
+    A topic and its subscribers. Synthetic topics (with a make_msg factory) publish from
+    their own thread while they have subscribers; other topics are published to by a
+    recording or by publishers.
+    """
+
+    def __init__(self, name, msg_type, rate = None, make_msg = None, on_subscribers_changed = None):
+        self.name = name
+        self.type = msg_type
+        self.rate = rate
+        self.make_msg = make_msg
+        self.on_subscribers_changed = on_subscribers_changed
+        self.subscribers = []
+        self.published = 0
+        self.lock = threading.Lock()
+        self.thread = None
+
+    @classmethod
+    def parse(cls, spec):
+        """
+        Makes a synthetic topic from a "name:kind:rate[:size]" spec.
+        """
+        parts = spec.strip().split(":")
+        if len(parts) not in (3, 4) or parts[1] not in KINDS:
+            raise ValueError("bad topic %s, expected name:kind:rate[:size] with kind one of %s" % (spec, ", ".join(KINDS)))
+        msg_type, factory = KINDS[parts[1]]
+        size = parts[3] if len(parts) == 4 else None
+        return cls(parts[0], msg_type, rate = float(parts[2]), make_msg = lambda: factory(size))
+
+    def add_subscriber(self, subscriber):
+        with self.lock:
+            self.subscribers.append(subscriber)
+            if self.make_msg is not None and self.thread is None:
+                self.thread = threading.Thread(target = self.run, name = "sim-%s" % self.name, daemon = True)
+                self.thread.start()
+        if self.on_subscribers_changed:
+            self.on_subscribers_changed()
+
+    def remove_subscriber(self, subscriber):
+        with self.lock:
+            if subscriber in self.subscribers:
+                self.subscribers.remove(subscriber)
+
+    def publish(self, msg):
+        with self.lock:
+            subscribers = list(self.subscribers)
+        for subscriber in subscribers:
+            try:
+                subscriber.callback(msg, subscriber.callback_args)
+            except Exception:
+                traceback.print_exc()
+        self.published += 1
+
+    def run(self):
+        msg = self.make_msg()
+        period = 1.0 / self.rate
+        next_time = time.monotonic()
+        while True:
+            with self.lock:
+                if not self.subscribers:
+                    self.thread = None
+                    return
+
+            stamp(msg, time.time())
+            self.publish(msg)
+
+            # keep the rate, but don't burst to catch up after slow callbacks
+            next_time = max(next_time + period, time.monotonic() - period)
+            time.sleep(max(0.0, next_time - time.monotonic()))
+
+class Recording(object):
+    """
+    Replays a ROS1 or ROS2 bag, read with rosbags, into SimTopics at the recorded timing
+    (scaled by speed) while any of them has subscribers. Recorded messages are converted to
+    sim_msgs-style messages, with uint8 arrays as bytes like rospy deserializes them.
+    """
+
+    def __init__(self, path, speed = 1.0, loop = True):
+        from pathlib import Path
+        from rosbags.highlevel import AnyReader
+
+        self.paths = [Path(path)]
+        self.reader_class = AnyReader
+        self.speed = max(float(speed), 1e-3)
+        self.loop = loop
+        self.classes = {} # type name -> message class
+        self.lock = threading.Lock()
+        self.thread = None
+
+        with AnyReader(self.paths) as reader:
+            self.topics = {connection.topic: SimTopic(connection.topic, connection.msgtype,
+                on_subscribers_changed = self.start) for connection in reader.connections}
+
+    def start(self):
+        with self.lock:
+            if self.thread is None:
+                self.thread = threading.Thread(target = self.run, name = "sim-recording", daemon = True)
+                self.thread.start()
+
+    def has_subscribers(self):
+        return any(topic.subscribers for topic in self.topics.values())
+
+    def run(self):
+        try:
+            while True:
+                with self.reader_class(self.paths) as reader:
+                    start_time = start_stamp = None
+                    for connection, timestamp, rawdata in reader.messages():
+                        if not self.has_subscribers():
+                            return
+                        if start_stamp is None:
+                            start_time, start_stamp = time.monotonic(), timestamp
+                        time.sleep(max(0.0, start_time + (timestamp - start_stamp) * 1e-9 / self.speed - time.monotonic()))
+                        topic = self.topics[connection.topic]
+                        if topic.subscribers:
+                            topic.publish(self.convert(reader.deserialize(rawdata, connection.msgtype)))
+                if not self.loop:
+                    return
+        except Exception:
+            traceback.print_exc()
+        finally:
+            with self.lock:
+                self.thread = None
+
+    def convert(self, value):
+        """
+        Converts a message deserialized by rosbags (a dataclass) to a sim message.
+        """
+        msg_type = getattr(value, "__msgtype__", None)
+        if msg_type is not None:
+            fields = [field for field in value.__dataclass_fields__ if not field.startswith("_")]
+            if msg_type not in self.classes:
+                package, dummy, name = msg_type.partition("/")
+                self.classes[msg_type] = sim_msgs.message_type("%s.msg._%s" % (package, name.rpartition("/")[2]),
+                    name.rpartition("/")[2], fields)
+            return self.classes[msg_type](**{field: self.convert(getattr(value, field)) for field in fields})
+        if type(value) is list:
+            return [self.convert(el) for el in value]
+        if hasattr(value, "dtype") and value.dtype.itemsize == 1 and value.dtype.kind == "u":
+            return value.tobytes()
+        return value
+
+class SimSubscriber(object):
+    def __init__(self, topic, callback, callback_args):
+        self.topic = topic
+        self.callback = callback
+        self.callback_args = callback_args
+        topic.add_subscriber(self)
+
+    def unregister(self):
+        self.topic.remove_subscriber(self)
+
+class SimBackend(Backend):
+    name = "sim"
+
+    def __init__(self, argv = None):
+        self.params = parse_args(sys.argv[1:] if argv is None else argv)
+        self.topics = {} # topic_name -> SimTopic
+        self.shutdown = threading.Event()
+
+    def init_node(self, node_name):
+        topic_specs = str(self.get_param("~sim_topics", DEFAULT_TOPICS))
+        for spec in topic_specs.split(","):
+            if spec.strip():
+                topic = SimTopic.parse(spec)
+                self.topics[topic.name] = topic
+
+        recording_path = self.get_param("~sim_recording", "")
+        if recording_path:
+            try:
+                recording = Recording(os.path.expanduser(recording_path),
+                    speed = self.get_param("~sim_speed", 1.0), loop = self.get_param("~sim_loop", True))
+                self.topics.update(recording.topics)
+            except ImportError:
+                self.logerr("Please install rosbags (sudo pip3 install rosbags) to replay recordings.")
+            except Exception as e:
+                self.logerr("Could not read recording %s: %s" % (recording_path, str(e)))
+
+        self.loginfo("Simulating %d topics: %s" % (len(self.topics), ", ".join(sorted(self.topics))))
+
+    def get_param(self, param_name, default = None):
+        return self.params.get(param_name, default)
+
+    def spin(self):
+        try:
+            while not self.shutdown.wait(1.0):
+                pass
+        except KeyboardInterrupt:
+            pass
+
+    def get_published_topics(self):
+        return [(topic.name, topic.type) for topic in list(self.topics.values())]
+
+    def get_msg_class(self, msg_type):
+        msg_class = getattr(sim_msgs, msg_type.rpartition("/")[2], None)
+        if isinstance(msg_class, type) and issubclass(msg_class, sim_msgs.SimMessage) \
+            and msg_class.__module__.split(".")[0] == msg_type.split("/")[0]:
+            return msg_class
+        # recorded types are made from the messages as they're replayed
+        if any(topic.type == msg_type for topic in self.topics.values()):
+            return sim_msgs.SimMessage
+        self.logerr("unknown type %s" % msg_type)
+        return None
+
+    def subscribe(self, topic_name, msg_class, callback, callback_args = None, raw = False, latest_only = False):
+        # sim messages are never serialized, so raw subscribers get the objects too.
+        # callbacks run in the publishing thread, so nothing is ever queued
+        subscriber = SimSubscriber(self.topics[topic_name], callback, callback_args)
+        subscriber.ingestion = {"latest_only": True, "queue_size": 0, "raw": False}
+        return subscriber
+
+    def advertise(self, topic_name, msg_class):
+        # messages published by clients go to the subscribers of the topic
+        if topic_name not in self.topics:
+            module, dummy, name = msg_class.__module__.partition(".msg._")
+            self.topics[topic_name] = SimTopic(topic_name, "%s/%s" % (module, msg_class.__name__))
+        return self.topics[topic_name]
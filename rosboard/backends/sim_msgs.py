@@ -0,0 +1,207 @@
+#!/usr/bin/env python3
+
+"""
+Stand-ins for the ROS messages rosboard handles specially, used by the sim backend and the
+benchmarks so that the serialization, compression and web paths run without a ROS install.
+
+They look like ROS1 (genpy) messages to ros2dict: fields are listed in __slots__ and
+__module__ is the one of the generated message class, which is what ros2dict dispatches on.
+Field values have the types rospy deserializes to (bytes for uint8[], tuples for other
+arrays), and the factories below make them at realistic sizes.
+"""
+
+import math
+
+import numpy as np
+
+from rosboard import compression
+from rosboard.cv_bridge import BAYER_LAYOUTS, ENCODINGS, YUV422_LAYOUTS
+
+class SimMessage(object):
+    __slots__ = ()
+
+    def __init__(self, **kwargs):
+        for field in self.__slots__:
+            setattr(self, field, kwargs.get(field))
+
+def message_type(module, name, fields):
+    """
+    Makes a message class, e.g. message_type("std_msgs.msg._Header", "Header", ("seq", "stamp", "frame_id")).
+    """
+    return type(name, (SimMessage,), {"__slots__": tuple(fields), "__module__": module})
+
+Time = message_type("genpy.rostime", "Time", ("secs", "nsecs"))
+Duration = message_type("genpy.rostime", "Duration", ("secs", "nsecs"))
+Header = message_type("std_msgs.msg._Header", "Header", ("seq", "stamp", "frame_id"))
+ColorRGBA = message_type("std_msgs.msg._ColorRGBA", "ColorRGBA", ("r", "g", "b", "a"))
+Point = message_type("geometry_msgs.msg._Point", "Point", ("x", "y", "z"))
+Vector3 = message_type("geometry_msgs.msg._Vector3", "Vector3", ("x", "y", "z"))
+Quaternion = message_type("geometry_msgs.msg._Quaternion", "Quaternion", ("x", "y", "z", "w"))
+Pose = message_type("geometry_msgs.msg._Pose", "Pose", ("position", "orientation"))
+Transform = message_type("geometry_msgs.msg._Transform", "Transform", ("translation", "rotation"))
+TransformStamped = message_type("geometry_msgs.msg._TransformStamped", "TransformStamped",
+    ("header", "child_frame_id", "transform"))
+TFMessage = message_type("tf2_msgs.msg._TFMessage", "TFMessage", ("transforms",))
+Image = message_type("sensor_msgs.msg._Image", "Image",
+    ("header", "height", "width", "encoding", "is_bigendian", "step", "data"))
+CompressedImage = message_type("sensor_msgs.msg._CompressedImage", "CompressedImage",
+    ("header", "format", "data"))
+PointField = message_type("sensor_msgs.msg._PointField", "PointField", ("name", "offset", "datatype", "count"))
+PointCloud2 = message_type("sensor_msgs.msg._PointCloud2", "PointCloud2",
+    ("header", "height", "width", "fields", "is_bigendian", "point_step", "row_step", "data", "is_dense"))
+LaserScan = message_type("sensor_msgs.msg._LaserScan", "LaserScan",
+    ("header", "angle_min", "angle_max", "angle_increment", "time_increment", "scan_time",
+     "range_min", "range_max", "ranges", "intensities"))
+MapMetaData = message_type("nav_msgs.msg._MapMetaData", "MapMetaData",
+    ("map_load_time", "resolution", "width", "height", "origin"))
+OccupancyGrid = message_type("nav_msgs.msg._OccupancyGrid", "OccupancyGrid", ("header", "info", "data"))
+Marker = message_type("visualization_msgs.msg._Marker", "Marker",
+    ("header", "ns", "id", "type", "action", "pose", "scale", "color", "lifetime", "frame_locked",
+     "points", "colors", "text", "mesh_resource", "mesh_use_embedded_materials"))
+MarkerArray = message_type("visualization_msgs.msg._MarkerArray", "MarkerArray", ("markers",))
+Log = message_type("rosgraph_msgs.msg._Log", "Log",
+    ("header", "level", "name", "msg", "file", "function", "line", "topics"))
+
+def header(frame_id = "base_link", seq = 0):
+    return Header(seq = seq, stamp = Time(secs = 1700000000, nsecs = 500000000), frame_id = frame_id)
+
+def pose(x = 0.0, y = 0.0, z = 0.0):
+    return Pose(position = Point(x = x, y = y, z = z), orientation = Quaternion(x = 0.0, y = 0.0, z = 0.0, w = 1.0))
+
+def _rng():
+    # same data on every run, so that timings are comparable
+    return np.random.default_rng(0)
+
+def _scene(height, width):
+    """
+    A smooth gradient with sensor-like noise, as float32 in [0, 1] with 3 channels; noise
+    keeps JPEG sizes (and encode times) close to those of camera images.
+    """
+    y, x = np.mgrid[0:height, 0:width].astype(np.float32)
+    img = np.stack((x / max(width - 1, 1), y / max(height - 1, 1), ((x + y) % 256) / 255.0), axis = -1)
+    img += _rng().normal(0, 0.04, img.shape).astype(np.float32)
+    return np.clip(img, 0.0, 1.0)
+
+def image(encoding, height = 720, width = 1280):
+    """
+    Image in any of the encodings rosboard.cv_bridge supports.
+    """
+    scene = _scene(height, width)
+
+    if encoding in ENCODINGS:
+        dtype, channels, order = ENCODINGS[encoding]
+        if channels > 3:
+            scene = np.concatenate((scene, np.ones(scene.shape[:2] + (channels - 3,), np.float32)), axis = -1)
+        else:
+            scene = scene[:, :, :channels]
+        if np.issubdtype(dtype, np.integer):
+            pixels = (scene.astype(np.float64) * np.iinfo(dtype).max).astype(dtype)
+        else:
+            pixels = scene.astype(dtype)
+        if channels == 1:
+            pixels = pixels[:, :, 0]
+
+    elif encoding in YUV422_LAYOUTS:
+        luma = (scene.mean(axis = -1) * 255).astype(np.uint8)
+        pixels = np.empty((height, width * 2), np.uint8)
+        y0, u, y1, v = YUV422_LAYOUTS[encoding]
+        pixels[:, y0::4] = luma[:, 0::2]
+        pixels[:, y1::4] = luma[:, 1::2]
+        pixels[:, u::4] = 128
+        pixels[:, v::4] = 128
+
+    elif encoding in BAYER_LAYOUTS:
+        dtype, cells = BAYER_LAYOUTS[encoding]
+        pixels = np.empty((height, width), dtype)
+        for channel, (row, col) in zip((0, 1, 1, 2), cells):
+            pixels[row::2, col::2] = (scene[row::2, col::2, channel] * np.iinfo(dtype).max).astype(dtype)
+
+    else:
+        raise ValueError("unsupported encoding %s" % encoding)
+
+    data = pixels.tobytes()
+    return Image(header = header("camera"), height = height, width = width, encoding = encoding,
+        is_bigendian = 0, step = len(data) // height, data = data)
+
+def image_encodings():
+    """
+    All the encodings rosboard.cv_bridge supports.
+    """
+    return list(ENCODINGS) + list(YUV422_LAYOUTS) + list(BAYER_LAYOUTS)
+
+def compressed_image(height = 480, width = 640):
+    data = compression.encode_jpeg((_scene(height, width) * 255).astype(np.uint8))
+    return CompressedImage(header = header("camera"), format = "rgb8; jpeg compressed bgr8", data = data)
+
+def point_cloud2(points = 131072, nan_fraction = 0.1):
+    """
+    Unorganized cloud of a 3D lidar: x, y, z, intensity (float32) and ring (uint16),
+    padded to 32 bytes per point like most drivers, with some NaN (no return) points.
+    """
+    rng = _rng()
+    dtype = np.dtype({
+        "names": ("x", "y", "z", "intensity", "ring"),
+        "formats": (np.float32, np.float32, np.float32, np.float32, np.uint16),
+        "offsets": (0, 4, 8, 16, 20),
+        "itemsize": 32,
+    })
+    cloud = np.zeros(points, dtype)
+    azimuth = rng.uniform(-math.pi, math.pi, points)
+    distance = rng.uniform(1.0, 80.0, points)
+    cloud["x"] = distance * np.cos(azimuth)
+    cloud["y"] = distance * np.sin(azimuth)
+    cloud["z"] = rng.uniform(-2.0, 8.0, points)
+    cloud["intensity"] = rng.uniform(0, 255, points)
+    cloud["ring"] = np.arange(points) % 64
+    cloud["x"][rng.random(points) < nan_fraction] = np.nan
+
+    fields = [
+        PointField(name = "x", offset = 0, datatype = 7, count = 1),
+        PointField(name = "y", offset = 4, datatype = 7, count = 1),
+        PointField(name = "z", offset = 8, datatype = 7, count = 1),
+        PointField(name = "intensity", offset = 16, datatype = 7, count = 1),
+        PointField(name = "ring", offset = 20, datatype = 4, count = 1),
+    ]
+    return PointCloud2(header = header("lidar"), height = 1, width = points, fields = fields,
+        is_bigendian = False, point_step = 32, row_step = 32 * points, data = cloud.tobytes(), is_dense = False)
+
+def laser_scan(samples = 1081, intensities = True):
+    rng = _rng()
+    ranges = rng.uniform(0.1, 30.0, samples)
+    ranges[rng.random(samples) < 0.05] = math.inf
+    return LaserScan(header = header("laser"), angle_min = -2.356, angle_max = 2.356,
+        angle_increment = 4.712 / samples, time_increment = 0.0, scan_time = 0.025,
+        range_min = 0.1, range_max = 30.0, ranges = tuple(ranges.tolist()),
+        intensities = tuple(rng.uniform(0, 10000, samples).tolist()) if intensities else ())
+
+def occupancy_grid(height = 2000, width = 2000):
+    """
+    Map at 5 cm resolution: unknown (-1) outside, free (0) inside, walls (100) on a grid.
+    """
+    grid = np.full((height, width), -1, np.int8)
+    grid[height // 8 : -height // 8, width // 8 : -width // 8] = 0
+    grid[::50, :] = 100
+    grid[:, ::50] = 100
+    return OccupancyGrid(header = header("map"),
+        info = MapMetaData(map_load_time = Time(secs = 0, nsecs = 0), resolution = 0.05,
+            width = width, height = height, origin = pose(-width * 0.025, -height * 0.025)),
+        data = tuple(grid.ravel().tolist()))
+
+def tf_message(transforms = 50):
+    return TFMessage(transforms = [TransformStamped(header = header("odom" if i == 0 else "base_link", i),
+        child_frame_id = "link_%d" % i,
+        transform = Transform(translation = Vector3(x = 0.1 * i, y = 0.0, z = 0.5),
+            rotation = Quaternion(x = 0.0, y = 0.0, z = math.sin(i / 2.0), w = math.cos(i / 2.0))))
+        for i in range(transforms)])
+
+def marker_array(markers = 200, points = 20):
+    return MarkerArray(markers = [Marker(header = header("map", i), ns = "obstacles", id = i, type = 4, action = 0,
+        pose = pose(i * 0.5, 0.0, 0.0), scale = Vector3(x = 0.05, y = 0.0, z = 0.0),
+        color = ColorRGBA(r = 1.0, g = 0.0, b = 0.0, a = 1.0), lifetime = Duration(secs = 0, nsecs = 0),
+        frame_locked = False, points = [Point(x = 0.1 * j, y = math.sin(j), z = 0.0) for j in range(points)],
+        colors = [], text = "", mesh_resource = "", mesh_use_embedded_materials = False)
+        for i in range(markers)])
+
+def log(level = 2, name = "/talker", text = "hello world"):
+    return Log(header = header(""), level = level, name = name, msg = text, file = "talker.py",
+        function = "talk", line = 42, topics = ["/chatter"])
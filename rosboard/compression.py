@@ -1,7 +1,13 @@
 import base64
 import io
 import numpy as np
+from rosboard import metrics
 from rosboard.cv_bridge import imgmsg_to_cv2
+from rosboard.depth import decode_compressed_depth, render_depth, settings as depth_settings
+
+# image codec backends in order of preference; only the first available one is imported
+cv2 = None
+PIL = None
 
 try:
     import simplejpeg
@@ -19,13 +25,90 @@ except ImportError:
         except ImportError:
             PIL = None
 
-def decode_jpeg(input_bytes):
+def jpeg_shape(input_bytes):
+    """
+    Reads the (height, width) of a JPEG from its SOF marker without decoding it.
+    Returns None if the data does not look like a JPEG.
+    """
     if simplejpeg:
-        return simplejpeg.decode_jpeg(input_bytes)
+        try:
+            height, width, _, _ = simplejpeg.decode_jpeg_header(bytes(input_bytes))
+            return height, width
+        except ValueError:
+            return None
+
+    data = memoryview(input_bytes)
+    if len(data) < 4 or data[0] != 0xFF or data[1] != 0xD8:
+        return None
+    i = 2
+    while i + 9 < len(data):
+        if data[i] != 0xFF:
+            i += 1
+            continue
+        marker = data[i + 1]
+        # SOF0..SOF15 except DHT (C4), JPG (C8) and DAC (CC) carry the frame dimensions
+        if 0xC0 <= marker <= 0xCF and marker not in (0xC4, 0xC8, 0xCC):
+            return (data[i + 5] << 8) | data[i + 6], (data[i + 7] << 8) | data[i + 8]
+        if marker in (0xD8, 0x01) or 0xD0 <= marker <= 0xD7 or marker == 0xFF:
+            i += 2 if marker != 0xFF else 1
+            continue
+        i += 2 + ((data[i + 2] << 8) | data[i + 3])
+    return None
+
+def decode_jpeg(input_bytes, min_height = 0, min_width = 0):
+    """
+    Decodes a JPEG into a numpy array. If min_height/min_width are given, the JPEG is
+    decoded in the DCT domain at the smallest of the 1/2, 1/4, 1/8 scales that still
+    satisfies both minimums, which is several times cheaper than a full decode.
+    """
+    if simplejpeg:
+        return simplejpeg.decode_jpeg(input_bytes, min_height = min_height, min_width = min_width)
     elif cv2:
-        return cv2.imdecode(np.frombuffer(input_bytes, dtype=np.uint8), cv2.IMREAD_COLOR)[:,:,::-1]
+        flags = cv2.IMREAD_COLOR
+        shape = jpeg_shape(input_bytes) if (min_height or min_width) else None
+        if shape is not None:
+            for factor, reduced_flags in ((8, cv2.IMREAD_REDUCED_COLOR_8), (4, cv2.IMREAD_REDUCED_COLOR_4), (2, cv2.IMREAD_REDUCED_COLOR_2)):
+                if -(-shape[0] // factor) >= min_height and -(-shape[1] // factor) >= min_width:
+                    flags = reduced_flags
+                    break
+        return cv2.imdecode(np.frombuffer(input_bytes, dtype=np.uint8), flags)[:,:,::-1]
     elif PIL:
-        return np.asarray(Image.open(io.BytesIO(input_bytes)))
+        pil_img = Image.open(io.BytesIO(input_bytes))
+        if min_height or min_width:
+            pil_img.draft(pil_img.mode, (min_width, min_height))
+        return np.asarray(pil_img)
+
+def resize_area(img, max_size):
+    """
+    Downscales an image so that neither dimension exceeds max_size, averaging blocks of
+    source pixels (area interpolation) instead of picking every n-th pixel, which would alias.
+    Without OpenCV, whole blocks are averaged in numpy and the remaining fractional (< 2x)
+    factor, which is all that is left after a scaled JPEG decode, is resampled nearest-neighbour.
+    """
+    if img.shape[0] <= max_size and img.shape[1] <= max_size:
+        return img
+
+    scale = max_size / max(img.shape[0], img.shape[1])
+    height, width = max(int(img.shape[0] * scale), 1), max(int(img.shape[1] * scale), 1)
+
+    if cv2:
+        return cv2.resize(np.ascontiguousarray(img), (width, height), interpolation = cv2.INTER_AREA)
+
+    factor = int(1.0 / scale)
+    if factor >= 2:
+        h, w = img.shape[0] // factor, img.shape[1] // factor
+        blocks = img[:h * factor, :w * factor].reshape((h, factor, w, factor) + img.shape[2:])
+        img = blocks.mean(axis = (1, 3), dtype = np.float32)
+        if np.issubdtype(blocks.dtype, np.integer):
+            img += 0.5
+        img = img.astype(blocks.dtype)
+
+    if img.shape[0] > height or img.shape[1] > width:
+        rows = (np.arange(height) * img.shape[0]) // height
+        cols = (np.arange(width) * img.shape[1]) // width
+        img = img[rows][:, cols]
+
+    return img
 
 def encode_jpeg(img):
     if simplejpeg:
@@ -92,7 +175,7 @@ def decode_pcl2(cloud, field_names=None, skip_nans=False, uvs=[]):
             'invalid datatype %d specified for field %s' % (field.datatype, field.name)
         field_np_datatype = _PCL2_DATATYPES_NUMPY_MAP[field.datatype]
         np_struct.append((field.name, field_np_datatype))
-        total_used_bytes += np.nbytes[field_np_datatype]
+        total_used_bytes += np.dtype(field_np_datatype).itemsize
 
     assert cloud.point_step >= total_used_bytes, \
         'error: total byte sizes of fields exceeds point_step'
@@ -125,7 +208,37 @@ def decode_pcl2(cloud, field_names=None, skip_nans=False, uvs=[]):
     else:
         return points[list(field_names)]
 
-def compress_compressed_image(msg, output):
+def crop_to_roi(img, roi):
+    """
+    Crops an image to a region of interest, returning a view (no copy).
+
+    :param img: numpy array of shape (height, width) or (height, width, channels)
+    :param roi: None, or a sequence (x, y, width, height, ...) normalized to [0, 1]
+                relative to the full image dimensions
+    :return: the cropped view of img
+    """
+    if roi is None:
+        return img
+    height, width = img.shape[0], img.shape[1]
+    x0 = int(np.floor(roi[0] * width))
+    y0 = int(np.floor(roi[1] * height))
+    x1 = int(np.ceil((roi[0] + roi[2]) * width))
+    y1 = int(np.ceil((roi[1] + roi[3]) * height))
+    x0, x1 = min(max(x0, 0), width - 1), min(max(x1, x0 + 1), width)
+    y0, y1 = min(max(y0, 0), height - 1), min(max(y1, y0 + 1), height)
+    return img[y0:y1, x0:x1]
+
+def roi_max_size(roi):
+    """
+    Returns the maximum output dimension (in pixels) requested by a region of interest,
+    or the default of 800 px if no region of interest is given.
+    """
+    if roi is None or len(roi) < 5 or not roi[4]:
+        return 800
+    return int(roi[4])
+
+@metrics.timed("compress_compressed_image")
+def compress_compressed_image(msg, output, roi = None):
     output["data"] = []
     output["__comp"] = ["data"]
 
@@ -133,18 +246,48 @@ def compress_compressed_image(msg, output):
         output["_error"] = "Please install simplejpeg, cv2 (OpenCV), or PIL (pillow) for image support."
         return
 
+    # compressed_depth_image_transport payloads: decode the PNG and render it with a colormap
+    if "compresseddepth" in msg.format.lower():
+        try:
+            img = decode_compressed_depth(msg)
+            original_shape = img.shape
+            img = crop_to_roi(img, roi)
+            # stride, since averaging would blend valid depths with invalid (zero) pixels
+            max_size = roi_max_size(roi)
+            if img.shape[0] > max_size or img.shape[1] > max_size:
+                stride = int(np.ceil(max(img.shape[0] / max_size, img.shape[1] / max_size)))
+                img = img[::stride,::stride]
+            img_jpeg = encode_jpeg(render_depth(img))
+        except Exception as e:
+            output["_error"] = "Error: %s" % str(e)
+            return
+        output["_data_jpeg"] = base64.b64encode(img_jpeg).decode()
+        output["_data_shape"] = list(original_shape)
+        output["_depth_range"] = [depth_settings["min"], depth_settings["max"]]
+        return
+
     # if message is already in jpeg format and small enough just pass it through
-    if len(msg.data) < 250000 and "jpeg" in msg.format:
+    if roi is None and len(msg.data) < 250000 and "jpeg" in msg.format:
         output["_data_jpeg"] = base64.b64encode(bytearray(msg.data)).decode()
         return
 
-    # else recompress it
+    # else recompress it, cropping to the region of interest first if one was requested
+    max_size = roi_max_size(roi)
     try:
-        img = decode_jpeg(bytearray(msg.data))
-        original_shape = img.shape
-        if img.shape[0] > 800 or img.shape[1] > 800:
-            stride = int(np.ceil(max(img.shape[0] / 800.0, img.shape[1] / 800.0)))
-            img = img[::stride,::stride]
+        data = bytearray(msg.data)
+        shape = jpeg_shape(data)
+        if shape is not None:
+            # decode only as many pixels as the (cropped) output needs
+            roi_height = shape[0] * (roi[3] if roi else 1.0)
+            roi_width = shape[1] * (roi[2] if roi else 1.0)
+            scale = min(1.0, max_size / max(roi_height, roi_width, 1))
+            img = decode_jpeg(data, min_height = int(np.ceil(shape[0] * scale)), min_width = int(np.ceil(shape[1] * scale)))
+            original_shape = tuple(shape) + img.shape[2:]
+        else:
+            img = decode_jpeg(data)
+            original_shape = img.shape
+        img = crop_to_roi(img, roi)
+        img = resize_area(img, max_size)
         img_jpeg = encode_jpeg(img)
     except Exception as e:
         output["_error"] = "Error: %s" % str(e)
@@ -153,7 +296,8 @@ def compress_compressed_image(msg, output):
     output["_data_shape"] = list(original_shape)
 
 
-def compress_image(msg, output):
+@metrics.timed("compress_image")
+def compress_image(msg, output, roi = None):
     output["data"] = []
     output["__comp"] = ["data"]
 
@@ -161,15 +305,22 @@ def compress_image(msg, output):
         output["_error"] = "Please install simplejpeg, cv2 (OpenCV), or PIL (pillow) for image support."
         return
 
-    # Decide if we need to flip channels to get RGB ordering for JPEG
+    # Color encodings (rgb/bgr, yuv422, bayer) are all requested in RGB ordering for JPEG
     enc = getattr(msg, 'encoding', '') or ''
     enc_l = enc.lower()
     # Some drivers incorrectly publish color images as generic 8UC3/8SC3 which are usually BGR-ordered
     force_bgr_like = enc_l in ('8uc3', '8sc3')
-    flip_channels = enc_l.startswith('bgr') or enc_l.startswith('bgra') or force_bgr_like
 
-    cv2_img = imgmsg_to_cv2(msg, flip_channels = flip_channels)
-    original_shape = cv2_img.shape
+    try:
+        cv2_img = imgmsg_to_cv2(msg, flip_channels = True)
+    except ValueError as e:
+        output["_error"] = str(e)
+        return
+    # full resolution shape, even if the image was demosaiced at half resolution
+    original_shape = (msg.height, msg.width) + cv2_img.shape[2:]
+
+    # crop to the requested region of interest (if any) before any other processing
+    cv2_img = crop_to_roi(cv2_img, roi)
 
     # Explicitly flip generic 3-channel byte/signed images assumed to be BGR
     if force_bgr_like and len(cv2_img.shape) == 3 and cv2_img.shape[2] == 3:
@@ -182,13 +333,19 @@ def compress_image(msg, output):
     # if image has only 2 channels, expand it to 3 channels for visualization
     # channel 0 -> R, channel 1 -> G, zeros -> B
     if len(cv2_img.shape) == 3 and cv2_img.shape[2] == 2:
-        cv2_img = np.stack((cv2_img[:,:,0], cv2_img[:,:,1], np.zeros(cv2_img[:,:,0].shape)), axis = -1)
+        cv2_img = np.stack((cv2_img[:,:,0], cv2_img[:,:,1], np.zeros(cv2_img[:,:,0].shape, dtype = cv2_img.dtype)), axis = -1)
 
-    # enforce <800px max dimension, and do a stride-based resize
-    if cv2_img.shape[0] > 800 or cv2_img.shape[1] > 800:
-        stride = int(np.ceil(max(cv2_img.shape[0] / 800.0, cv2_img.shape[1] / 800.0)))
+    # enforce max dimension (800px unless the region of interest asks otherwise), and do a stride-based resize
+    max_size = roi_max_size(roi)
+    if cv2_img.shape[0] > max_size or cv2_img.shape[1] > max_size:
+        stride = int(np.ceil(max(cv2_img.shape[0] / max_size, cv2_img.shape[1] / max_size)))
         cv2_img = cv2_img[::stride,::stride]
 
+    # depth images: map the configured depth range through a colormap
+    if enc in ('16UC1', '32FC1') and len(cv2_img.shape) == 2:
+        cv2_img = render_depth(cv2_img)
+        output["_depth_range"] = [depth_settings["min"], depth_settings["max"]]
+
     # if image format isn't already uint8, make it uint8 for visualization purposes
     if cv2_img.dtype != np.uint8:
         if cv2_img.dtype == np.uint64:
@@ -200,6 +357,10 @@ def compress_image(msg, output):
         elif cv2_img.dtype == np.uint16:
             # keep only the most significant 8 bits (0 to 255)
             cv2_img = (cv2_img >> 8).astype(np.uint8)
+        elif np.issubdtype(cv2_img.dtype, np.signedinteger):
+            # shift to unsigned and keep the most significant 8 bits (0 to 255)
+            bits = cv2_img.dtype.itemsize * 8
+            cv2_img = ((cv2_img.astype(np.int64) + (1 << (bits - 1))) >> (bits - 8)).astype(np.uint8)
         elif cv2_img.dtype == np.float16 or cv2_img.dtype == np.float32 or cv2_img.dtype == np.float64:
             # map the float range (0 to 1) to uint8 range (0 to 255)
             cv2_img = np.clip(cv2_img * 255, 0, 255).astype(np.uint8)
@@ -211,6 +372,7 @@ def compress_image(msg, output):
     except OSError as e:
         output["_error"] = str(e)
 
+@metrics.timed("compress_occupancy_grid")
 def compress_occupancy_grid(msg, output):
     output["_data"] = []
     output["__comp"] = ["data"]
@@ -220,7 +382,7 @@ def compress_occupancy_grid(msg, output):
         return
 
     try:
-        occupancy_map = np.array(msg.data, dtype=np.uint16).reshape(msg.info.height, msg.info.width)[::-1,:]
+        occupancy_map = np.array(msg.data, dtype=np.int16).reshape(msg.info.height, msg.info.width)[::-1,:]
 
         while occupancy_map.shape[0] > 800 or occupancy_map.shape[1] > 800:
             occupancy_map = occupancy_map[::2,::2]
@@ -232,6 +394,7 @@ def compress_occupancy_grid(msg, output):
 
     except Exception as e:
         output["_error"] = str(e)
+        return
     try:
         img_jpeg = encode_jpeg(cv2_img)
         output["_data_jpeg"] = base64.b64encode(img_jpeg).decode()
@@ -249,6 +412,7 @@ DATATYPE_MAPPING_PCL2_NUMPY = {
     8: np.float64,
 }
 
+@metrics.timed("compress_point_cloud2")
 def compress_point_cloud2(msg, output):
     # assuming fields are ('x', 'y', 'z', ...),
     # compression scheme is:
@@ -324,6 +488,7 @@ def compress_point_cloud2(msg, output):
     }
 
 
+@metrics.timed("compress_laser_scan")
 def compress_laser_scan(msg, output):
     # compression scheme:
     # map ranges to _ranges_uint16 in the following format:
@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+
+"""
+In-memory store of the JSON files of a directory (saved layouts, loc configs), loaded at
+startup and kept in sync with the files by mtime and size, so that serving one costs a scan
+of the directory instead of a read. Writes go to a temporary file that is renamed over the
+old one, so a file is never seen half-written, neither by the store nor by anything else
+reading the directory.
+"""
+
+import hashlib
+import json
+import os
+import tempfile
+import threading
+
+class ConfigEntry(object):
+    def __init__(self, name, stat_result, data):
+        self.name = name
+        self.mtime = stat_result.st_mtime
+        self.size = stat_result.st_size
+        self.data = data
+        self.etag = '"%s"' % hashlib.sha1(data).hexdigest()
+
+class ConfigStore(object):
+    def __init__(self, directory, extension = ".json", defaults = None):
+        """
+        defaults: dict of file name -> object, written as JSON if the file doesn't exist.
+        """
+        self.directory = directory
+        self.extension = extension
+        self.entries = {} # file name -> ConfigEntry
+        self.lock = threading.Lock()
+        try:
+            os.makedirs(self.directory, exist_ok = True)
+        except OSError:
+            pass
+        for name, obj in (defaults or {}).items():
+            if not os.path.exists(os.path.join(self.directory, name)):
+                try:
+                    self.write(name, json.dumps(obj).encode("utf-8"))
+                except OSError as e:
+                    print("Error writing default %s: %s" % (name, e))
+        self.refresh()
+
+    def refresh(self):
+        """
+        Reloads the files whose mtime or size changed since they were last read, and forgets
+        deleted ones. Costs one directory scan when nothing changed.
+        """
+        with self.lock:
+            found = set()
+            try:
+                dir_entries = list(os.scandir(self.directory))
+            except OSError:
+                dir_entries = []
+            for dir_entry in dir_entries:
+                name = dir_entry.name
+                if not name.endswith(self.extension) or name.startswith("."):
+                    continue
+                try:
+                    stat_result = dir_entry.stat()
+                except OSError:
+                    continue
+                found.add(name)
+                entry = self.entries.get(name)
+                if entry is not None and entry.mtime == stat_result.st_mtime and entry.size == stat_result.st_size:
+                    continue
+                try:
+                    with open(dir_entry.path, "rb") as f:
+                        data = f.read()
+                except OSError:
+                    continue
+                self.entries[name] = ConfigEntry(name, stat_result, data)
+
+            for name in set(self.entries) - found:
+                del self.entries[name]
+
+    def names(self):
+        self.refresh()
+        return sorted(self.entries)
+
+    def get(self, name):
+        self.refresh()
+        return self.entries.get(name)
+
+    def write(self, name, data):
+        """
+        Atomically replaces the file name with data (bytes). Blocks on disk I/O, so call it
+        from an executor when on the IOLoop.
+        """
+        path = os.path.join(self.directory, name)
+        fd, tmp_path = tempfile.mkstemp(prefix = "." + name + ".", suffix = ".tmp", dir = self.directory)
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+                f.flush()
+                os.fsync(f.fileno())
+            os.chmod(tmp_path, 0o644)
+            os.replace(tmp_path, path)
+        except BaseException:
+            try:
+                os.unlink(tmp_path)
+            except OSError:
+                pass
+            raise
+
+        entry = ConfigEntry(name, os.stat(path), data)
+        with self.lock:
+            self.entries[name] = entry
+        return entry
@@ -21,10 +21,104 @@ BPP = {
   'mono8': 1
 }
 
+# encoding -> (numpy dtype, number of channels, channel order or None if not a color image)
+ENCODINGS = {
+  'rgb8': (numpy.uint8, 3, 'rgb'),
+  'bgr8': (numpy.uint8, 3, 'bgr'),
+  'rgba8': (numpy.uint8, 4, 'rgba'),
+  'bgra8': (numpy.uint8, 4, 'bgra'),
+  'rgb16': (numpy.uint16, 3, 'rgb'),
+  'bgr16': (numpy.uint16, 3, 'bgr'),
+  'rgba16': (numpy.uint16, 4, 'rgba'),
+  'bgra16': (numpy.uint16, 4, 'bgra'),
+  'mono8': (numpy.uint8, 1, None),
+  'mono16': (numpy.uint16, 1, None),
+}
+
+# generic OpenCV-style encodings, e.g. 8UC1 ... 64FC4
+for _prefix, _dtype in (('8U', numpy.uint8), ('8S', numpy.int8), ('16U', numpy.uint16), ('16S', numpy.int16),
+                        ('32S', numpy.int32), ('32F', numpy.float32), ('64F', numpy.float64)):
+    for _channels in (1, 2, 3, 4):
+        ENCODINGS['%sC%d' % (_prefix, _channels)] = (_dtype, _channels, None)
+
+# packed YUV 4:2:2 encodings -> byte offsets of (Y0, U, Y1, V) within each 4-byte macropixel
+YUV422_LAYOUTS = {
+  'yuv422': (1, 0, 3, 2), # ROS "yuv422" is UYVY
+  'uyvy': (1, 0, 3, 2),
+  'yuv422_yuy2': (0, 1, 2, 3),
+  'yuyv': (0, 1, 2, 3),
+}
+
+# bayer encodings -> (dtype, position of R, G1, G2 and B within each 2x2 cell as (row, col))
+BAYER_LAYOUTS = {}
+for _pattern, _cells in (('rggb', ((0, 0), (0, 1), (1, 0), (1, 1))),
+                         ('bggr', ((1, 1), (0, 1), (1, 0), (0, 0))),
+                         ('gbrg', ((1, 0), (0, 0), (1, 1), (0, 1))),
+                         ('grbg', ((0, 1), (0, 0), (1, 1), (1, 0)))):
+    BAYER_LAYOUTS['bayer_%s8' % _pattern] = (numpy.uint8, _cells)
+    BAYER_LAYOUTS['bayer_%s16' % _pattern] = (numpy.uint16, _cells)
+
+def _strided_view(data, dtype, channels, row_bytes=None):
+    """
+    Builds an (height, width[, channels]) numpy view onto data.data honouring data.step,
+    so that padded rows are skipped without copying.
+    """
+    dtype = numpy.dtype(dtype)
+    if dtype.itemsize > 1 and getattr(data, 'is_bigendian', False):
+        dtype = dtype.newbyteorder('>')
+
+    buffer = data.data if not isinstance(data.data, list) else bytes(data.data)
+    row_bytes = row_bytes or data.width * channels * dtype.itemsize
+    step = data.step or row_bytes
+
+    if memoryview(buffer).nbytes < step * (data.height - 1) + row_bytes:
+        raise ValueError("image data too small for %dx%d %s with step %d" % (data.width, data.height, data.encoding, step))
+
+    if channels == 1:
+        return numpy.ndarray((data.height, row_bytes // dtype.itemsize), dtype, buffer, 0, (step, dtype.itemsize))
+    return numpy.ndarray((data.height, row_bytes // (channels * dtype.itemsize), channels), dtype, buffer, 0,
+        (step, channels * dtype.itemsize, dtype.itemsize))
+
+def _yuv422_to_rgb(data, layout):
+    """
+    Vectorized full resolution YUV 4:2:2 to RGB (BT.601) conversion.
+    """
+    # pixels share chroma in pairs, so an odd width has no complete last macropixel
+    if data.width % 2:
+        raise ValueError("%s image width must be even, got %d" % (data.encoding, data.width))
+    macropixels = _strided_view(data, numpy.uint8, 4, row_bytes = (data.width // 2) * 4)
+    y0, u, y1, v = (macropixels[:, :, i].astype(numpy.float32) for i in layout)
+    y = numpy.stack((y0, y1), axis = -1).reshape((data.height, -1))
+    u = numpy.repeat(u - 128.0, 2, axis = 1)
+    v = numpy.repeat(v - 128.0, 2, axis = 1)
+    rgb = numpy.empty(y.shape + (3,), dtype = numpy.float32)
+    rgb[:, :, 0] = y + 1.402 * v
+    rgb[:, :, 1] = y - 0.344136 * u - 0.714136 * v
+    rgb[:, :, 2] = y + 1.772 * u
+    return numpy.clip(rgb, 0, 255, out = rgb).astype(numpy.uint8)
+
+def _bayer_to_rgb(data, dtype, cells):
+    """
+    Half resolution demosaicing: each 2x2 bayer cell becomes one RGB pixel, with the two
+    green samples averaged.
+    """
+    raw = _strided_view(data, dtype, 1)
+    height, width = (raw.shape[0] // 2) * 2, (raw.shape[1] // 2) * 2
+    raw = raw[:height, :width]
+    (ry, rx), (g1y, g1x), (g2y, g2x), (by, bx) = cells
+    green = (raw[g1y::2, g1x::2].astype(numpy.uint32) + raw[g2y::2, g2x::2]) // 2
+    return numpy.stack((raw[ry::2, rx::2], green.astype(raw.dtype), raw[by::2, bx::2]), axis = -1)
+
 def imgmsg_to_cv2(data, desired_encoding="passthrough", flip_channels=False):
     """
     Converts a ROS image to an OpenCV image without using the cv_bridge package,
     for compatibility purposes.
+
+    Color images are returned in BGR order (RGB if flip_channels), with any alpha channel dropped.
+    Plain encodings are returned as views onto the message data honouring msg.step (no copy).
+    YUV 4:2:2 images are converted to 3-channel color at full resolution, and bayer images
+    are demosaiced at half resolution.
+    Raises ValueError for unsupported encodings and for data that doesn't match the image size.
     """
 
     if desired_encoding == "passthrough":
@@ -32,88 +126,25 @@ def imgmsg_to_cv2(data, desired_encoding="passthrough", flip_channels=False):
     else:
         encoding = desired_encoding
 
-    if (encoding == 'bgr8' and not flip_channels) or (encoding=='rgb8' and flip_channels):
-        return numpy.frombuffer(data.data, numpy.uint8).reshape((data.height, data.width, 3))
-    elif (encoding == 'rgb8' and not flip_channels) or (encoding=='bgr8' and flip_channels):
-        return numpy.frombuffer(data.data, numpy.uint8).reshape((data.height, data.width, 3))[:, :, ::-1]
-    elif (encoding == 'bgra8' and not flip_channels) or (encoding == 'rgba8' and flip_channels):
-        return numpy.frombuffer(data.data, numpy.uint8).reshape((data.height, data.width, 4))[:,:,0:3]
-    elif (encoding == 'rgba8' and not flip_channels) or (encoding == 'bgra8' and flip_channels):
-        return numpy.frombuffer(data.data, numpy.uint8).reshape((data.height, data.width, 4))[:, :, ::-1][:,:,1:]
-    if (encoding == 'bgr16' and not flip_channels) or (encoding=='rgb16' and flip_channels):
-        return numpy.frombuffer(data.data, numpy.uint16).reshape((data.height, data.width, 3))
-    elif (encoding == 'rgb16' and not flip_channels) or (encoding=='bgr16' and flip_channels):
-        return numpy.frombuffer(data.data, numpy.uint16).reshape((data.height, data.width, 3))[:, :, ::-1]
-    elif (encoding == 'bgra16' and not flip_channels) or (encoding == 'rgba16' and flip_channels):
-        return numpy.frombuffer(data.data, numpy.uint16).reshape((data.height, data.width, 4))[:,:,0:3]
-    elif (encoding == 'rgba16' and not flip_channels) or (encoding == 'bgra16' and flip_channels):
-        return numpy.frombuffer(data.data, numpy.uint16).reshape((data.height, data.width, 4))[:, :, ::-1][:,:,1:]
-    # 8-bit unsigned int types
-    elif encoding == 'mono8' or encoding == '8UC1':
-        return numpy.frombuffer(data.data, numpy.uint8).reshape((data.height, data.width))
-    elif encoding == '8UC2':
-        return numpy.frombuffer(data.data, numpy.uint8).reshape((data.height, data.width, 2))
-    elif encoding == '8UC3':
-        return numpy.frombuffer(data.data, numpy.uint8).reshape((data.height, data.width, 3))
-    elif encoding == '8UC4':
-        return numpy.frombuffer(data.data, numpy.uint8).reshape((data.height, data.width, 4))
-    # 16-bit unsigned int types
-    elif encoding == 'mono16' or encoding == '16UC1':
-        return numpy.frombuffer(data.data, numpy.uint16).reshape((data.height, data.width))
-    elif encoding == '16UC2':
-        return numpy.frombuffer(data.data, numpy.uint16).reshape((data.height, data.width, 2))
-    elif encoding == '16UC3':
-        return numpy.frombuffer(data.data, numpy.uint16).reshape((data.height, data.width, 3))
-    elif encoding == '16UC4':
-        return numpy.frombuffer(data.data, numpy.uint16).reshape((data.height, data.width, 4))
-    # 8-bit signed int types
-    elif encoding == '8SC1':
-        return numpy.frombuffer(data.data, numpy.int8).reshape((data.height, data.width))
-    elif encoding == '8SC2':
-        return numpy.frombuffer(data.data, numpy.int8).reshape((data.height, data.width, 2))
-    elif encoding == '8SC3':
-        return numpy.frombuffer(data.data, numpy.int8).reshape((data.height, data.width, 3))
-    elif encoding == '8SC4':
-        return numpy.frombuffer(data.data, numpy.int8).reshape((data.height, data.width, 4))
-    # 16-bit signed int types
-    elif encoding == '16SC1':
-        return numpy.frombuffer(data.data, numpy.int16).reshape((data.height, data.width))
-    elif encoding == '16SC2':
-        return numpy.frombuffer(data.data, numpy.int16).reshape((data.height, data.width, 2))
-    elif encoding == '16SC3':
-        return numpy.frombuffer(data.data, numpy.int16).reshape((data.height, data.width, 3))
-    elif encoding == '16SC4':
-        return numpy.frombuffer(data.data, numpy.int16).reshape((data.height, data.width, 4))
-    # 32-bit signed int types
-    elif encoding == '32SC1':
-        return numpy.frombuffer(data.data, numpy.int32).reshape((data.height, data.width))
-    elif encoding == '32SC2':
-        return numpy.frombuffer(data.data, numpy.int32).reshape((data.height, data.width, 2))
-    elif encoding == '32SC3':
-        return numpy.frombuffer(data.data, numpy.int32).reshape((data.height, data.width, 3))
-    elif encoding == '32SC4':
-        return numpy.frombuffer(data.data, numpy.int32).reshape((data.height, data.width, 4))
-    # 32-bit float types
-    elif encoding == '32FC1':
-        return numpy.frombuffer(data.data, numpy.float32).reshape((data.height, data.width))
-    elif encoding == '32FC2':
-        return numpy.frombuffer(data.data, numpy.float32).reshape((data.height, data.width, 2))
-    elif encoding == '32FC3':
-        return numpy.frombuffer(data.data, numpy.float32).reshape((data.height, data.width, 3))
-    elif encoding == '32FC4':
-        return numpy.frombuffer(data.data, numpy.float32).reshape((data.height, data.width, 4))
-    # 64-bit float types
-    elif encoding == '64FC1':
-        return numpy.frombuffer(data.data, numpy.float64).reshape((data.height, data.width))
-    elif encoding == '64FC2':
-        return numpy.frombuffer(data.data, numpy.float64).reshape((data.height, data.width, 2))
-    elif encoding == '64FC3':
-        return numpy.frombuffer(data.data, numpy.float64).reshape((data.height, data.width, 3))
-    elif encoding == '64FC4':
-        return numpy.frombuffer(data.data, numpy.float64).reshape((data.height, data.width, 4))
-    else:
-        print("Unsupported encoding %s" % encoding)
-        return None
+    if encoding in ENCODINGS:
+        dtype, channels, order = ENCODINGS[encoding]
+        img = _strided_view(data, dtype, channels)
+        if order is None:
+            return img
+        # order[0] tells whether the raw data starts with red or blue
+        if (order[0] == 'b') == (not flip_channels):
+            return img[:, :, 0:3]
+        return img[:, :, 2::-1]
+
+    if encoding in YUV422_LAYOUTS:
+        rgb = _yuv422_to_rgb(data, YUV422_LAYOUTS[encoding])
+        return rgb if flip_channels else rgb[:, :, ::-1]
+
+    if encoding in BAYER_LAYOUTS:
+        rgb = _bayer_to_rgb(data, *BAYER_LAYOUTS[encoding])
+        return rgb if flip_channels else rgb[:, :, ::-1]
+
+    raise ValueError("unsupported encoding %s" % encoding)
 
 def cv2_to_imgmsg(cv2img, encoding='bgr8'):
     """
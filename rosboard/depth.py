@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+
+"""
+Server-side rendering of depth images (16UC1 in millimeters, 32FC1 in meters) into
+colormapped RGB, and decoding of compressed_depth_image_transport ("compressedDepth") payloads.
+
+Rendering goes through a precomputed lookup table so that a 16UC1 frame is colorized in a
+single vectorized indexing pass. Pixel value 0 / NaN / Inf (no depth reading) renders black.
+"""
+
+import io
+import struct
+import numpy as np
+
+# rendering settings, normally set once at startup from the node's ROS parameters
+settings = {
+    "min": 0.2,          # meters; maps to the first color of the colormap
+    "max": 10.0,         # meters; maps to the last color of the colormap
+    "colormap": "turbo", # one of COLORMAPS
+}
+
+def _turbo(x):
+    # polynomial approximation of Google's Turbo colormap
+    r = 0.13572138 + x * (4.61539260 + x * (-42.66032258 + x * (132.13108234 + x * (-152.94239396 + x * 59.28637943))))
+    g = 0.09140261 + x * (2.19418839 + x * (4.84296658 + x * (-14.18503333 + x * (4.27729857 + x * 2.82956604))))
+    b = 0.10667330 + x * (12.64194608 + x * (-60.58204836 + x * (110.36276771 + x * (-89.90310912 + x * 27.34824973))))
+    return np.stack((r, g, b), axis = -1)
+
+def _jet(x):
+    return np.stack((1.5 - np.abs(4 * x - 3), 1.5 - np.abs(4 * x - 2), 1.5 - np.abs(4 * x - 1)), axis = -1)
+
+def _gray(x):
+    return np.stack((x, x, x), axis = -1)
+
+COLORMAPS = {
+    "turbo": _turbo,
+    "jet": _jet,
+    "gray": _gray,
+}
+
+# (colormap, min, max) -> lookup tables
+_lut_cache = {}
+
+def set_settings(depth_min = None, depth_max = None, colormap = None):
+    """
+    Updates the depth rendering settings. Invalid values are ignored.
+    """
+    if colormap in COLORMAPS:
+        settings["colormap"] = colormap
+    try:
+        depth_min = settings["min"] if depth_min is None else float(depth_min)
+        depth_max = settings["max"] if depth_max is None else float(depth_max)
+    except (ValueError, TypeError):
+        return
+    if depth_max > depth_min:
+        settings["min"] = depth_min
+        settings["max"] = depth_max
+
+def colormap_lut(colormap):
+    """
+    Returns a (256, 3) uint8 RGB lookup table. Index 0 is reserved for invalid pixels (black);
+    indexes 1 to 255 span the colormap.
+    """
+    key = (colormap,)
+    if key not in _lut_cache:
+        lut = np.zeros((256, 3), dtype = np.uint8)
+        x = np.linspace(0.0, 1.0, 255)
+        lut[1:] = (np.clip(COLORMAPS[colormap](x), 0.0, 1.0) * 255 + 0.5).astype(np.uint8)
+        _lut_cache[key] = lut
+    return _lut_cache[key]
+
+def depth16_lut(colormap, depth_min, depth_max):
+    """
+    Returns a (65536, 3) uint8 RGB lookup table mapping every possible 16UC1 depth value
+    (in millimeters) directly to its color.
+    """
+    key = (colormap, depth_min, depth_max)
+    if key not in _lut_cache:
+        meters = np.arange(65536, dtype = np.float32) * 0.001
+        index = 1 + np.clip((meters - depth_min) * (254.0 / (depth_max - depth_min)), 0, 254).astype(np.uint8)
+        index[0] = 0
+        _lut_cache[key] = colormap_lut(colormap)[index]
+    return _lut_cache[key]
+
+def render_depth(img):
+    """
+    Renders a single-channel depth image into an RGB uint8 image using the current settings.
+    uint16 images are treated as millimeters, floating point images as meters.
+    """
+    depth_min, depth_max, colormap = settings["min"], settings["max"], settings["colormap"]
+
+    if img.dtype == np.uint16:
+        return depth16_lut(colormap, depth_min, depth_max)[img]
+
+    img = img.astype(np.float32, copy = False)
+    with np.errstate(invalid = "ignore"):
+        index = (img - depth_min) * (254.0 / (depth_max - depth_min))
+        np.clip(index, 0, 254, out = index)
+        index += 1
+        index[~(img > 0) | ~np.isfinite(img)] = 0
+    return colormap_lut(colormap)[index.astype(np.uint8)]
+
+def _decode_png(png_bytes):
+    """
+    Decodes a (16-bit greyscale) PNG into a numpy array with OpenCV or PIL, whichever is available.
+    """
+    try:
+        import cv2
+        return cv2.imdecode(np.frombuffer(png_bytes, dtype = np.uint8), cv2.IMREAD_UNCHANGED)
+    except ImportError:
+        pass
+    try:
+        from PIL import Image
+        pil_img = Image.open(io.BytesIO(png_bytes))
+        if pil_img.mode in ("I;16", "I;16B", "I"):
+            return np.asarray(pil_img).astype(np.uint16)
+        return np.asarray(pil_img)
+    except ImportError:
+        raise ImportError("Please install cv2 (OpenCV) or PIL (pillow) for compressedDepth support.")
+
+def decode_compressed_depth(msg):
+    """
+    Decodes a sensor_msgs/CompressedImage published by compressed_depth_image_transport, whose
+    format is e.g. "16UC1; compressedDepth png" or "32FC1; compressedDepth". The data is a
+    12-byte ConfigHeader (int32 format, float32 depthParam[2]) followed by a PNG.
+    16UC1 PNGs hold raw millimeters; 32FC1 PNGs hold quantized inverse depth, where
+    depth = depthParam[0] / (value - depthParam[1]) and value 0 is invalid.
+
+    Returns a uint16 (millimeters) or float32 (meters) numpy array.
+    """
+    data = bytes(msg.data)
+    png_signature = b"\x89PNG"
+
+    if data[12:16] == png_signature:
+        _, quant_a, quant_b = struct.unpack("<iff", data[0:12])
+        png_bytes = data[12:]
+    elif data[0:4] == png_signature:
+        # very old publishers did not prepend the config header
+        quant_a, quant_b = 0.0, 0.0
+        png_bytes = data
+    else:
+        raise ValueError("compressedDepth: unrecognized payload (%s)" % msg.format)
+
+    img = _decode_png(png_bytes)
+    if img is None:
+        raise ValueError("compressedDepth: could not decode PNG")
+
+    if msg.format.strip().lower().startswith("32fc1"):
+        inverse = img.astype(np.float32)
+        with np.errstate(divide = "ignore"):
+            depth = quant_a / (inverse - quant_b)
+        depth[img == 0] = np.nan
+        return depth
+
+    return img.astype(np.uint16, copy = False)
@@ -1,21 +1,93 @@
+import base64
+import concurrent.futures
+import gc
+import hmac
 import json
 import socket
 import time
+import tracemalloc
 import tornado
+import tornado.ioloop
+import tornado.iostream
+import tornado.locks
 import tornado.web
 import tornado.websocket
 import traceback
 import types
 import uuid
 import os
-import glob
+import mmap
 
 from . import __version__
+from . import assets
+from . import metrics
+from . import profiler
+from .logbuffer import LogFilter
+from . import pcd
 
-class NoCacheStaticFileHandler(tornado.web.StaticFileHandler):
-    def set_extra_headers(self, path):
-        # Disable cache
-        self.set_header('Cache-Control', 'no-store, no-cache, must-revalidate, max-age=0')
+# directory of PCD maps available to the Multi3DViewer
+REMOTE_PCD_DIR = "/root/ws/src/maps"
+
+class StaticAssetHandler(tornado.web.RequestHandler):
+    """
+    Serves the web assets of an AssetManifest from memory. Requests carrying the asset's
+    current version (?v=<hash>) are cached by the browser for good; index.html and unversioned
+    requests are revalidated with the ETag on every load. Prebuilt gzip/brotli variants are
+    served according to Accept-Encoding.
+    """
+
+    def initialize(self, manifest, default_filename="index.html"):
+        self.manifest = manifest
+        self.default_filename = default_filename
+
+    def head(self, path):
+        return self.get(path, include_body=False)
+
+    def get(self, path, include_body=True):
+        if path == "" or path.endswith("/"):
+            path += self.default_filename
+        if path == assets.INDEX_FILENAME:
+            # pick up edited assets (if watching them) so that the page references their new versions
+            self.manifest.maybe_refresh()
+
+        asset = self.manifest.get(path)
+        if asset is None:
+            raise tornado.web.HTTPError(404)
+
+        if path != assets.INDEX_FILENAME and self.get_argument("v", None) == asset.version:
+            self.set_header('Cache-Control', 'public, max-age=31536000, immutable')
+        else:
+            self.set_header('Cache-Control', 'no-cache')
+
+        encoding, body = asset.negotiate(self.request.headers.get('Accept-Encoding'))
+        self.set_header('Content-Type', asset.content_type)
+        self.set_header('Vary', 'Accept-Encoding')
+        self.set_header('Etag', '"%s%s"' % (asset.version, "-" + encoding if encoding else ""))
+        if encoding:
+            self.set_header('Content-Encoding', encoding)
+
+        if self.check_etag_header():
+            self.set_status(304)
+            return
+        if include_body:
+            self.write(body)
+        else:
+            self.set_header('Content-Length', len(body))
+
+class ViewersManifestHandler(tornado.web.RequestHandler):
+    """
+    Serves the manifest of the frontend's viewer classes (see AssetManifest.viewers), which
+    lets the frontend load only the viewers that the current layout and topics need.
+    """
+
+    def initialize(self, manifest):
+        self.manifest = manifest
+
+    def get(self):
+        self.manifest.maybe_refresh()
+        self.set_header('Content-Type', 'application/json')
+        self.set_header('Cache-Control', 'no-cache')
+        self.finish(json.dumps({"viewers": self.manifest.viewers()}))
 
 class ROSBoardSocketHandler(tornado.websocket.WebSocketHandler):
     sockets = set()
@@ -45,6 +117,10 @@ class ROSBoardSocketHandler(tornado.websocket.WebSocketHandler):
 
         self.update_intervals_by_topic = {}  # this socket's throttle rate on each topic
         self.last_data_times_by_topic = {}   # last time this socket received data on each topic
+        self.rois_by_topic = {}              # this socket's image region of interest on each topic
+        self.log_filters_by_topic = {}       # this socket's LogFilter on each log topic
+        self.metrics_labels = (str(self.id)[:8], self.request.remote_ip)
+        self.buffered_bytes = 0              # bytes passed to write_message that haven't been sent yet
 
         ROSBoardSocketHandler.sockets.add(self)
 
@@ -55,12 +131,28 @@ class ROSBoardSocketHandler(tornado.websocket.WebSocketHandler):
 
     def on_close(self):
         ROSBoardSocketHandler.sockets.remove(self)
+        metrics.SOCKET_SENT_BYTES.remove(*self.metrics_labels)
+        metrics.SOCKET_SENT_FRAMES.remove(*self.metrics_labels)
 
         # when socket closes, remove ourselves from all subscriptions
         for topic_name in self.node.remote_subs:
             if self.id in self.node.remote_subs[topic_name]:
                 self.node.remote_subs[topic_name].remove(self.id)
 
+    def write_message(self, message, binary=False):
+        metrics.SOCKET_SENT_BYTES.inc(*self.metrics_labels, amount=len(message))
+        metrics.SOCKET_SENT_FRAMES.inc(*self.metrics_labels)
+        future = super().write_message(message, binary)
+
+        # the returned future completes once the message has been written to the socket
+        if future is not None:
+            size = len(message)
+            def on_sent(_):
+                self.buffered_bytes -= size
+            self.buffered_bytes += size
+            future.add_done_callback(on_sent)
+        return future
+
     @classmethod
     def send_pings(cls):
         """
@@ -79,7 +171,90 @@ class ROSBoardSocketHandler(tornado.websocket.WebSocketHandler):
             except Exception as e:
                 print("Error sending message: %s" % str(e))
 
+    @staticmethod
+    def parse_roi(roi):
+        """
+        Validates a region of interest sent by the client, e.g.
+            {"x": 0.25, "y": 0.25, "width": 0.5, "height": 0.5, "size": 800}
+        where x, y, width, height are normalized to the full image dimensions and size is the
+        maximum output dimension in pixels. Returns a hashable tuple (x, y, width, height, size),
+        or None if roi is empty, invalid, or covers the whole image at the default size.
+        """
+        if type(roi) is not dict:
+            return None
+        try:
+            x = min(max(float(roi.get("x", 0.0)), 0.0), 1.0)
+            y = min(max(float(roi.get("y", 0.0)), 0.0), 1.0)
+            width = min(max(float(roi.get("width", 1.0)), 1e-3), 1.0 - x)
+            height = min(max(float(roi.get("height", 1.0)), 1e-3), 1.0 - y)
+            size = min(max(int(roi.get("size", 800)), 16), 4096)
+        except (ValueError, TypeError):
+            return None
+        if width <= 0.0 or height <= 0.0:
+            return None
+        roi = (round(x, 4), round(y, 4), round(width, 4), round(height, 4), size)
+        if roi == (0.0, 0.0, 1.0, 1.0, 800):
+            return None
+        return roi
+
     @classmethod
+    def get_rois(cls, node, topic_name):
+        """
+        Returns the set of distinct regions of interest requested by the subscribers (sockets
+        and MJPEG streams) of topic_name. None in the set stands for the full frame.
+        """
+        rois = set()
+        sockets_by_id = {socket.id: socket for socket in list(cls.sockets)}
+        for subscriber_id in list(node.remote_subs.get(topic_name, ())):
+            socket = sockets_by_id.get(subscriber_id)
+            rois.add(socket.rois_by_topic.get(topic_name) if socket else None)
+        return rois
+
+    @classmethod
+    def broadcast_logs(cls, entries):
+        """
+        Sends log entries (see LogBuffer) to the sockets subscribed to their topic, each only
+        the entries that match its log filter, and at most MAX_LOGS_PER_FLUSH of them per call.
+        """
+        json_msgs = {}
+        try:
+            for socket in cls.sockets:
+                if not socket.ws_connection or socket.ws_connection.is_closing():
+                    continue
+                matching = []
+                for entry in entries:
+                    topic_name = entry["_topic_name"]
+                    if socket.id not in socket.node.remote_subs.get(topic_name, ()):
+                        continue
+                    log_filter = socket.log_filters_by_topic.get(topic_name)
+                    if log_filter is None or log_filter.matches(entry):
+                        matching.append(entry)
+                for entry in matching[-cls.MAX_LOGS_PER_FLUSH:]:
+                    # each topic's LogBuffer numbers its entries separately
+                    key = (entry["_topic_name"], entry["_seq"])
+                    if key not in json_msgs:
+                        json_msgs[key] = json.dumps([ROSBoardSocketHandler.MSG_MSG, entry], separators=(',', ':'))
+                    socket.write_message(json_msgs[key])
+                    stats = getattr(socket.node, "topic_stats", {}).get(entry["_topic_name"])
+                    if stats is not None:
+                        stats.record_encoded(len(json_msgs[key]), 1)
+        except Exception as e:
+            print("Error sending message: %s" % str(e))
+            traceback.print_exc()
+
+    def send_log_backfill(self, topic_name):
+        """
+        Sends the latest buffered log entries of topic_name that match this socket's filter.
+        """
+        log_buffer = getattr(self.node, "log_buffers", {}).get(topic_name)
+        if log_buffer is None:
+            return
+        log_filter = self.log_filters_by_topic.get(topic_name) or LogFilter()
+        for entry in log_buffer.query(log_filter):
+            self.write_message(json.dumps([ROSBoardSocketHandler.MSG_MSG, entry], separators=(',', ':')))
+
+    @classmethod
+    @metrics.timed("broadcast")
     def broadcast(cls, message):
         """
         Broadcasts a dict-ified ROS message (message) to all sockets that care about that topic.
@@ -96,11 +271,18 @@ class ROSBoardSocketHandler(tornado.websocket.WebSocketHandler):
             elif message[0] == ROSBoardSocketHandler.MSG_MSG:
                 topic_name = message[1]["_topic_name"]
                 json_msg = None
+                sent = 0
+                node = None
                 for socket in cls.sockets:
                     if topic_name not in socket.node.remote_subs:
                         continue
                     if socket.id not in socket.node.remote_subs[topic_name]:
                         continue
+                    # images rendered for a region of interest only go to the sockets that asked for it
+                    if "_roi" in message[1]:
+                        roi = socket.rois_by_topic.get(topic_name)
+                        if (list(roi) if roi else None) != message[1]["_roi"]:
+                            continue
                     t = time.time()
                     interval = socket.update_intervals_by_topic.get(topic_name, 1.0/24.0)
                     try:
@@ -108,12 +290,21 @@ class ROSBoardSocketHandler(tornado.websocket.WebSocketHandler):
                     except Exception:
                         needs_wait = False
                     if needs_wait:
+                        metrics.THROTTLED_MESSAGES.inc(topic_name, "socket")
                         continue
                     if socket.ws_connection and not socket.ws_connection.is_closing():
                         if json_msg is None:
+                            encode_start = time.perf_counter()
                             json_msg = json.dumps(message, separators=(',', ':'))
+                            metrics.ENCODE_SECONDS.observe(time.perf_counter() - encode_start, message[1].get("_topic_type"))
                         socket.write_message(json_msg)
                     socket.last_data_times_by_topic[topic_name] = t
+                    sent += 1
+                    node = socket.node
+                if sent and topic_name in getattr(node, "topic_stats", {}):
+                    node.topic_stats[topic_name].record_encoded(len(json_msg), sent)
+                if "_data_jpeg" in message[1] and not message[1].get("_roi"):
+                    MJPEGStreamHandler.push(topic_name, message[1]["_data_jpeg"])
         except Exception as e:
             print("Error sending message: %s" % str(e))
             traceback.print_exc()
@@ -163,6 +354,10 @@ class ROSBoardSocketHandler(tornado.websocket.WebSocketHandler):
             max_update_rate = float(argv[1].get("maxUpdateRate", 24.0))
 
             self.update_intervals_by_topic[topic_name] = 1.0 / max_update_rate
+            if "roi" in argv[1]:
+                self.rois_by_topic[topic_name] = ROSBoardSocketHandler.parse_roi(argv[1].get("roi"))
+            if "logFilter" in argv[1]:
+                self.log_filters_by_topic[topic_name] = LogFilter(argv[1].get("logFilter"))
             self.node.update_intervals_by_topic[topic_name] = min(
                 self.node.update_intervals_by_topic.get(topic_name, 1.),
                 self.update_intervals_by_topic[topic_name]
@@ -177,6 +372,7 @@ class ROSBoardSocketHandler(tornado.websocket.WebSocketHandler):
 
             self.node.remote_subs[topic_name].add(self.id)
             self.node.sync_subs()
+            self.send_log_backfill(topic_name)
 
         # client wants to unsubscribe from topic
         elif argv[0] == ROSBoardSocketHandler.MSG_UNSUB:
@@ -188,11 +384,37 @@ class ROSBoardSocketHandler(tornado.websocket.WebSocketHandler):
             if topic_name not in self.node.remote_subs:
                 self.node.remote_subs[topic_name] = set()
 
+            self.rois_by_topic.pop(topic_name, None)
+            self.log_filters_by_topic.pop(topic_name, None)
+
             try:
                 self.node.remote_subs[topic_name].remove(self.id)
             except KeyError:
                 print("KeyError trying to remove sub")
 
+        # client wants to change the region of interest of an image topic without resubscribing
+        elif argv[0] == ROSBoardSocketHandler.MSG_ROI:
+            if len(argv) != 2 or type(argv[1]) is not dict:
+                print("error: roi: bad: %s" % message)
+                return
+            topic_name = argv[1].get("topicName")
+            if topic_name is None:
+                print("error: no topic specified")
+                return
+            self.rois_by_topic[topic_name] = ROSBoardSocketHandler.parse_roi(argv[1].get("roi"))
+
+        # client wants to change the filter of a log topic without resubscribing
+        elif argv[0] == ROSBoardSocketHandler.MSG_LOG_FILTER:
+            if len(argv) != 2 or type(argv[1]) is not dict:
+                print("error: log filter: bad: %s" % message)
+                return
+            topic_name = argv[1].get("topicName")
+            if topic_name is None:
+                print("error: no topic specified")
+                return
+            self.log_filters_by_topic[topic_name] = LogFilter(argv[1].get("logFilter"))
+            self.send_log_backfill(topic_name)
+
         # client wants to publish a message
         elif argv[0] == ROSBoardSocketHandler.MSG_PUB:
             try:
@@ -217,14 +439,336 @@ ROSBoardSocketHandler.MSG_SUB = "s";
 ROSBoardSocketHandler.MSG_SYSTEM = "y";
 ROSBoardSocketHandler.MSG_UNSUB = "u";
 ROSBoardSocketHandler.MSG_PUB = "b";
+ROSBoardSocketHandler.MSG_ROI = "r";
+ROSBoardSocketHandler.MSG_LOG_FILTER = "l";
+
+# maximum number of log messages sent to a socket per batch (see broadcast_logs)
+ROSBoardSocketHandler.MAX_LOGS_PER_FLUSH = 200
 
 ROSBoardSocketHandler.PING_SEQ = "s";
 ROSBoardSocketHandler.PONG_SEQ = "s";
 ROSBoardSocketHandler.PONG_TIME = "t";
 
+metrics.Gauge("rosboard_connected_clients", "Connected websockets.",
+    collect=lambda: {(): len(ROSBoardSocketHandler.sockets)})
+metrics.Gauge("rosboard_socket_latency_seconds", "Latency (half the ping round trip) of each websocket.", ["socket", "client"],
+    collect=lambda: {socket.metrics_labels: socket.latency / 1000.0 for socket in list(ROSBoardSocketHandler.sockets)})
+
+class MetricsHandler(tornado.web.RequestHandler):
+    """
+    Prometheus metrics of rosboard itself (see metrics.py), for node exporters to scrape.
+    """
+
+    def get(self):
+        self.set_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+        self.finish(metrics.expose())
+
+class DebugHandler(tornado.web.RequestHandler):
+    """
+    Base of the debugging endpoints, which expose the internals of the process. If a token is
+    configured (~debug_token), requests must carry it (?token=...); otherwise they are only
+    accepted from localhost.
+    """
+
+    def initialize(self, token=None):
+        self.token = token or None
+
+    def prepare(self):
+        if self.token is not None:
+            allowed = hmac.compare_digest(self.get_argument("token", ""), self.token)
+        else:
+            allowed = self.request.remote_ip in ("127.0.0.1", "::1")
+        if not allowed:
+            self.set_status(403)
+            self.finish(json.dumps({"error": "forbidden"}))
+
+class ProfileHandler(DebugHandler):
+    """
+    Samples the stacks of all threads for ?seconds= (default 10) every ?interval= milliseconds
+    (default 5) and returns them as collapsed stacks for a flame graph, e.g.
+        curl 'localhost:8888/rosboard/api/debug/profile?seconds=30' | flamegraph.pl > rosboard.svg
+    One profile runs at a time.
+    """
+
+    async def get(self):
+        try:
+            seconds = float(self.get_argument("seconds", "10"))
+            interval = float(self.get_argument("interval", "5")) / 1000.0
+        except ValueError:
+            self.set_status(400)
+            self.finish(json.dumps({"error": "invalid seconds or interval"}))
+            return
+
+        if not profiler.lock.acquire(blocking=False):
+            self.set_status(409)
+            self.finish(json.dumps({"error": "a profile is already running"}))
+            return
+        try:
+            stacks = await tornado.ioloop.IOLoop.current().run_in_executor(None, profiler.sample, seconds, interval)
+        finally:
+            profiler.lock.release()
+
+        self.set_header('Content-Type', 'text/plain; charset=utf-8')
+        self.set_header('Content-Disposition', 'attachment; filename="rosboard-%s.collapsed"' % time.strftime("%Y%m%d-%H%M%S"))
+        self.finish(profiler.collapsed(stacks))
+
+def _rss_bytes():
+    try:
+        with open("/proc/self/statm", "r") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return None
+
+class MemoryHandler(DebugHandler):
+    """
+    Reports what rosboard holds in memory, to find what grows in a long-running process:
+    bytes buffered for each client, sizes of the per-topic caches, and registry entries that
+    no longer serve anyone (stale).
+    """
+
+    def initialize(self, node, token=None):
+        super().initialize(token)
+        self.node = node
+
+    def get(self):
+        node = self.node
+        sockets = list(ROSBoardSocketHandler.sockets)
+        socket_ids = set(socket.id for socket in sockets) | set(stream.id for stream in MJPEGStreamHandler.streams)
+        remote_subs = dict(node.remote_subs)
+
+        report = {
+            "rss_bytes": _rss_bytes(),
+            "gc_objects": len(gc.get_objects()),
+            "gc_counts": gc.get_count(),
+            "sockets": [{
+                "socket": socket.metrics_labels[0],
+                "client": socket.metrics_labels[1],
+                "buffered_bytes": socket.buffered_bytes,
+                "latency_ms": socket.latency,
+                "topics": len(socket.update_intervals_by_topic),
+                "ping_slots": len(socket.last_ping_times),
+            } for socket in sockets],
+            "mjpeg_streams": [{
+                "topic": stream.topic_name,
+                "buffered_bytes": stream.buffered_bytes,
+                "pending_frame_bytes": len(stream.frame or b""),
+            } for stream in list(MJPEGStreamHandler.streams)],
+            "topics": {},
+            "stale": {
+                # topics nobody subscribes to anymore
+                "remote_subs_empty": sorted(topic for topic, subscribers in remote_subs.items() if not subscribers),
+                # subscriptions of sockets and streams that are gone
+                "remote_subs_closed": sum(len(set(subscribers) - socket_ids) for subscribers in remote_subs.values()),
+                "update_intervals": sorted(topic for topic in node.update_intervals_by_topic if not remote_subs.get(topic)),
+                "last_data_times": sorted(topic for topic in node.last_data_times_by_topic if not remote_subs.get(topic)),
+                "log_buffers": sorted(topic for topic in getattr(node, "log_buffers", {}) if not remote_subs.get(topic)),
+                # cached publishers; kept for the lifetime of the process
+                "local_pubs": sorted(getattr(node, "local_pubs", {})),
+            },
+            "pcd_builds": len(pcd_builds),
+            "tracemalloc": tracemalloc.is_tracing(),
+        }
+
+        for topic in sorted(set(remote_subs) | set(node.local_subs) | set(getattr(node, "log_buffers", {}))):
+            log_buffer = getattr(node, "log_buffers", {}).get(topic)
+            report["topics"][topic] = {
+                "subscribers": len(remote_subs.get(topic, ())),
+                "local_sub": topic in node.local_subs,
+                "log_buffer_entries": len(log_buffer.entries) if log_buffer else 0,
+                "topic_stats": topic in getattr(node, "topic_stats", {}),
+            }
+
+        self.set_header('Content-Type', 'application/json')
+        self.finish(json.dumps(report))
+
+class TracemallocHandler(DebugHandler):
+    """
+    Pins memory growth to lines of code with tracemalloc:
+        POST /rosboard/api/debug/tracemalloc/start?frames=1   start tracing (slows allocations down)
+        GET  /rosboard/api/debug/tracemalloc/snapshot?limit=30 top allocation sites, and their
+                                                              growth since the previous snapshot
+        POST /rosboard/api/debug/tracemalloc/stop              stop tracing and free the traces
+    """
+
+    # previous snapshot, to diff against
+    snapshot = None
+
+    def post(self, action):
+        if action == "start":
+            try:
+                frames = min(max(int(self.get_argument("frames", "1")), 1), 64)
+            except ValueError:
+                frames = 1
+            if not tracemalloc.is_tracing():
+                tracemalloc.start(frames)
+            TracemallocHandler.snapshot = None
+        elif action == "stop":
+            tracemalloc.stop()
+            TracemallocHandler.snapshot = None
+        else:
+            self.set_status(404)
+            self.finish(json.dumps({"error": "unknown action"}))
+            return
+        self.set_header('Content-Type', 'application/json')
+        self.finish(json.dumps({"tracing": tracemalloc.is_tracing()}))
+
+    async def get(self, action):
+        if action != "snapshot":
+            self.set_status(404)
+            self.finish(json.dumps({"error": "unknown action"}))
+            return
+        if not tracemalloc.is_tracing():
+            self.set_status(409)
+            self.finish(json.dumps({"error": "tracemalloc is not running; POST to start first"}))
+            return
+        try:
+            limit = min(max(int(self.get_argument("limit", "30")), 1), 1000)
+        except ValueError:
+            limit = 30
+        key_type = "traceback" if tracemalloc.get_traceback_limit() > 1 else "lineno"
+
+        def take_snapshot():
+            snapshot = tracemalloc.take_snapshot().filter_traces((
+                tracemalloc.Filter(False, tracemalloc.__file__),
+                tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+            ))
+            top = snapshot.statistics(key_type)[:limit]
+            diff = snapshot.compare_to(TracemallocHandler.snapshot, key_type)[:limit] if TracemallocHandler.snapshot else None
+            return snapshot, top, diff
+
+        # taking and comparing snapshots can take a while with many traces
+        snapshot, top, diff = await tornado.ioloop.IOLoop.current().run_in_executor(None, take_snapshot)
+        TracemallocHandler.snapshot = snapshot
+
+        current, peak = tracemalloc.get_traced_memory()
+        self.set_header('Content-Type', 'application/json')
+        self.finish(json.dumps({
+            "traced_bytes": current,
+            "peak_bytes": peak,
+            "top": [{
+                "where": [str(frame) for frame in stat.traceback],
+                "size": stat.size,
+                "count": stat.count,
+            } for stat in top],
+            "diff": [{
+                "where": [str(frame) for frame in stat.traceback],
+                "size": stat.size,
+                "size_diff": stat.size_diff,
+                "count": stat.count,
+                "count_diff": stat.count_diff,
+            } for stat in diff] if diff is not None else None,
+        }))
+
+class TopicStatsHandler(tornado.web.RequestHandler):
+    """
+    Returns the live statistics (rate, bandwidth, header stamp age) of the subscribed topics,
+    the same that are published on the _topic_stats topic.
+    """
+
+    def initialize(self, node):
+        self.node = node
+
+    def get(self):
+        try:
+            self.set_header('Content-Type', 'application/json')
+            self.set_header('Cache-Control', 'no-cache')
+            self.finish(json.dumps({"topics": self.node.get_topic_stats()}))
+        except Exception as e:
+            self.set_status(500)
+            self.finish(json.dumps({"error": str(e)}))
+
+class MJPEGStreamHandler(tornado.web.RequestHandler):
+    """
+    Serves the JPEG frames of an image topic as a multipart/x-mixed-replace (MJPEG) stream, e.g.
+        <img src="/rosboard/stream/camera/image_raw.mjpg?maxUpdateRate=10">
+    The frames are the same encoder output that is sent over the websocket. Each stream only
+    keeps the latest frame, so slow clients skip frames instead of buffering them.
+    """
+    streams = set()
+
+    BOUNDARY = "rosboardframe"
+
+    def initialize(self, node):
+        self.node = node
+
+    @classmethod
+    def push(cls, topic_name, data_jpeg):
+        """
+        Hands a base64-encoded JPEG frame of topic_name to all streams of that topic.
+        Must be called from the IOLoop thread.
+        """
+        frame = None
+        for stream in cls.streams:
+            if stream.topic_name != topic_name:
+                continue
+            if frame is None:
+                frame = base64.b64decode(data_jpeg)
+            stream.frame = frame
+            stream.frame_event.set()
+
+    async def get(self, topic_name):
+        self.id = uuid.uuid4()
+        self.topic_name = "/" + topic_name.lstrip("/")
+        self.frame = None
+        self.frame_event = tornado.locks.Event()
+        self.closed = False
+        self.buffered_bytes = 0 # bytes of the frame being flushed
+
+        try:
+            interval = 1.0 / float(self.get_argument("maxUpdateRate", "24.0"))
+        except (ValueError, ZeroDivisionError):
+            interval = 1.0 / 24.0
+
+        self.set_header("Content-Type", "multipart/x-mixed-replace; boundary=%s" % MJPEGStreamHandler.BOUNDARY)
+        self.set_header("Cache-Control", "no-store, no-cache, must-revalidate, max-age=0")
+        self.set_header("Pragma", "no-cache")
+
+        self.node.update_intervals_by_topic[self.topic_name] = min(
+            self.node.update_intervals_by_topic.get(self.topic_name, 1.),
+            interval,
+        )
+        if self.topic_name not in self.node.remote_subs:
+            self.node.remote_subs[self.topic_name] = set()
+        self.node.remote_subs[self.topic_name].add(self.id)
+        MJPEGStreamHandler.streams.add(self)
+        self.node.sync_subs()
+
+        try:
+            last_frame_time = 0.0
+            while not self.closed:
+                await self.frame_event.wait()
+                self.frame_event.clear()
+                if self.frame is None or time.time() - last_frame_time < interval - 2e-4:
+                    continue
+                frame, self.frame = self.frame, None
+                last_frame_time = time.time()
+                part_header = ("--%s\r\nContent-Type: image/jpeg\r\nContent-Length: %d\r\n\r\n" % (
+                    MJPEGStreamHandler.BOUNDARY, len(frame))).encode()
+                self.write(part_header)
+                self.write(frame)
+                self.write(b"\r\n")
+                self.buffered_bytes = len(part_header) + len(frame) + 2
+                await self.flush()
+                self.buffered_bytes = 0
+        except tornado.iostream.StreamClosedError:
+            pass
+        finally:
+            self._unsubscribe()
+
+    def on_connection_close(self):
+        self.closed = True
+        self.frame_event.set()
+        self._unsubscribe()
+
+    def _unsubscribe(self):
+        MJPEGStreamHandler.streams.discard(self)
+        if self.topic_name in self.node.remote_subs:
+            self.node.remote_subs[self.topic_name].discard(self.id)
+
 class LayoutsBaseHandler(tornado.web.RequestHandler):
-    def initialize(self, config_dir=None):
+    def initialize(self, config_dir=None, store=None):
         self.config_dir = config_dir or os.path.join(os.path.dirname(os.path.realpath(__file__)), 'configs')
+        self.store = store
         try:
             os.makedirs(self.config_dir, exist_ok=True)
         except Exception:
@@ -238,12 +782,25 @@ class LayoutsBaseHandler(tornado.web.RequestHandler):
     def _path_for(self, name):
         return os.path.join(self.config_dir, f"{name}.json")
 
+    def _finish_entry(self, entry):
+        """
+        Serves a ConfigEntry of the store, or 304 if the client's copy is current.
+        """
+        self.set_header('Content-Type', 'application/json')
+        self.set_header('Cache-Control', 'no-cache')
+        self.set_header('Etag', entry.etag)
+        if self.check_etag_header():
+            self.set_status(304)
+            self.finish()
+            return
+        self.finish(entry.data)
+
 class LayoutsListHandler(LayoutsBaseHandler):
     def get(self):
         try:
-            files = glob.glob(os.path.join(self.config_dir, '*.json'))
-            names = sorted([os.path.splitext(os.path.basename(f))[0] for f in files])
+            names = [os.path.splitext(name)[0] for name in self.store.names()]
             self.set_header('Content-Type', 'application/json')
+            self.set_header('Cache-Control', 'no-cache')
             self.finish(json.dumps({"layouts": names}))
         except Exception as e:
             self.set_status(500)
@@ -253,23 +810,19 @@ class LayoutHandler(LayoutsBaseHandler):
     def get(self, name):
         try:
             safe = self._safe_name(name)
-            path = self._path_for(safe)
-            if not os.path.exists(path):
+            entry = self.store.get(f"{safe}.json")
+            if entry is None:
                 self.set_status(404)
                 self.finish(json.dumps({"error": "not found"}))
                 return
-            with open(path, 'r', encoding='utf-8') as f:
-                data = f.read()
-            self.set_header('Content-Type', 'application/json')
-            self.finish(data)
+            self._finish_entry(entry)
         except Exception as e:
             self.set_status(500)
             self.finish(json.dumps({"error": str(e)}))
 
-    def post(self, name):
+    async def post(self, name):
         try:
             safe = self._safe_name(name)
-            path = self._path_for(safe)
             body = self.request.body.decode('utf-8') if self.request.body else ''
             # Accept either raw JSON string or object
             try:
@@ -277,8 +830,8 @@ class LayoutHandler(LayoutsBaseHandler):
                 data = json.dumps(obj)
             except Exception:
                 data = body
-            with open(path, 'w', encoding='utf-8') as f:
-                f.write(data)
+            # written to a temporary file and renamed, off the IOLoop
+            await tornado.ioloop.IOLoop.current().run_in_executor(None, self.store.write, f"{safe}.json", data.encode('utf-8'))
             self.set_header('Content-Type', 'application/json')
             self.finish(json.dumps({"ok": True, "name": safe}))
         except Exception as e:
@@ -286,103 +839,244 @@ class LayoutHandler(LayoutsBaseHandler):
             self.finish(json.dumps({"error": str(e)}))
 
 class RemotePcdFilesHandler(LayoutsBaseHandler):
-    """Handler for listing PCD files in remote directory"""
+    """
+    Handler for listing PCD files in remote directory, along with a catalogue of their
+    metadata (see pcd.file_metadata). Metadata is cached and only re-read, from the header, for
+    files whose mtime or size changed, so listing costs one stat per file. Bounding boxes are
+    computed in the background, one file at a time, and are null (with bbox_pending) until then.
+    """
 
-    def get(self):
+    async def get(self):
         try:
             # Remote directory path
-            remote_dir = "/root/ws/src/maps"
+            remote_dir = REMOTE_PCD_DIR
 
             # List PCD files in the remote directory
             pcd_files = []
             try:
                 if os.path.exists(remote_dir):
-                    for file in os.listdir(remote_dir):
+                    for file in sorted(os.listdir(remote_dir)):
                         if file.lower().endswith('.pcd'):
                             pcd_files.append(file)
-                else:
-                    # If remote directory doesn't exist, try to create it or use alternative
-                    # rospy.logwarn(f"Remote directory {remote_dir} does not exist") # This line was commented out in the original file
-                    pass # Added pass to avoid syntax error if rospy is not imported
             except Exception as e:
-                # rospy.logwarn(f"Error accessing remote directory {remote_dir}: {e}") # This line was commented out in the original file
-                print(f"Error accessing remote directory {remote_dir}: {e}") # Changed from rospy.logwarn to print
+                print(f"Error accessing remote directory {remote_dir}: {e}")
+
+            maps = {}
+            changed = False
+            for file in pcd_files:
+                path = os.path.join(remote_dir, file)
+                try:
+                    stat_result = os.stat(path)
+                except OSError:
+                    continue
+                maps[file] = pcd.cached_metadata(path, stat_result)
+                if maps[file] is None:
+                    try:
+                        maps[file] = pcd.file_metadata(path, stat_result)
+                    except Exception as e:
+                        # catalogued too, so that broken files aren't reparsed on every listing
+                        print(f"Error reading PCD file {file}: {e}")
+                        maps[file] = {"name": file, "size": stat_result.st_size, "mtime": stat_result.st_mtime, "error": str(e)}
+                    pcd.store_metadata(path, maps[file])
+                    changed = True
+                if maps[file].get("bbox_pending"):
+                    compute_pcd_bbox(path, stat_result)
+
+            if changed:
+                try:
+                    pcd.save_catalog(remote_dir)
+                except Exception as e:
+                    print(f"Error saving PCD catalogue of {remote_dir}: {e}")
 
             self.set_header('Content-Type', 'application/json')
-            self.finish(json.dumps({"files": pcd_files}))
+            self.finish(json.dumps({"files": list(maps.keys()), "maps": list(maps.values())}))
         except Exception as e:
             self.set_status(500)
             self.finish(json.dumps({"error": str(e)}))
 
-class RemotePcdFileHandler(LayoutsBaseHandler):
-    """Handler for loading individual PCD files from remote directory"""
+# a thread of its own, so that bounding box passes over large maps don't hold up the IOLoop's executor
+pcd_bbox_executor = concurrent.futures.ThreadPoolExecutor(1, thread_name_prefix = "rosboard-pcd-bbox")
 
-    def get(self, filename):
+# paths of the PCD files whose bounding box is being computed
+pcd_bbox_pending = set()
+
+def compute_pcd_bbox(path, stat_result):
+    """
+    Computes the bounding box of a catalogued PCD file in the background, and catalogues it
+    if the file hasn't changed in the meantime. Must be called from the IOLoop thread.
+    """
+    if path in pcd_bbox_pending:
+        return
+    pcd_bbox_pending.add(path)
+
+    def on_done(future):
+        pcd_bbox_pending.discard(path)
+        entry = pcd.cached_metadata(path, stat_result)
+        if entry is None:
+            return
         try:
-            # Remote directory path
-            remote_dir = "/root/ws/src/maps"
-            file_path = os.path.join(remote_dir, filename)
+            entry["bbox"] = future.result()
+        except Exception as e:
+            print(f"Error reading PCD file {path}: {e}")
+            entry["error"] = str(e)
+        entry["bbox_pending"] = False
+        try:
+            pcd.save_catalog(os.path.dirname(path))
+        except Exception as e:
+            print(f"Error saving PCD catalogue of {os.path.dirname(path)}: {e}")
 
-            # Validate filename (security check)
-            if not filename.lower().endswith('.pcd'):
-                self.set_status(400)
-                self.finish(json.dumps({"error": "Invalid file type. Only .pcd files are allowed."}))
-                return
+    future = tornado.ioloop.IOLoop.current().run_in_executor(pcd_bbox_executor, pcd.file_bbox, path)
+    future.add_done_callback(on_done)
 
-            # Check if file exists
-            if not os.path.exists(file_path):
-                self.set_status(404)
-                self.finish(json.dumps({"error": "File not found"}))
+# (build function, arguments) -> future of a build of a PCD derived file in progress
+pcd_builds = {}
+
+def run_pcd_build(build, *args):
+    """
+    Runs one of the pcd.build_* functions in the IOLoop's executor. Concurrent requests for
+    the same build share one future instead of building the same file several times.
+    """
+    key = (build, args)
+    if key not in pcd_builds:
+        future = tornado.ioloop.IOLoop.current().run_in_executor(None, build, *args)
+        future.add_done_callback(lambda f: pcd_builds.pop(key, None))
+        pcd_builds[key] = future
+    return pcd_builds[key]
+
+def remote_pcd_path(root, filename):
+    """
+    Resolves filename inside root, raising an HTTPError unless it is an existing .pcd file there.
+    """
+    if not filename.lower().endswith('.pcd'):
+        raise tornado.web.HTTPError(400, reason="Invalid file type. Only .pcd files are allowed.")
+    file_path = os.path.realpath(os.path.join(root, filename))
+    if not file_path.startswith(os.path.realpath(root) + os.path.sep) or not os.path.isfile(file_path):
+        raise tornado.web.HTTPError(404, reason="File not found")
+    return file_path
+
+class RemotePcdFileHandler(tornado.web.StaticFileHandler):
+    """
+    Serves individual PCD files from the remote maps directory. Files are streamed from a
+    memory map in chunks (with Range and ETag support inherited from StaticFileHandler)
+    rather than read into memory. With ?lod=N, a cached voxel-decimated version of the map
+    is served instead, built in an executor on first access (see rosboard/pcd.py).
+    """
+
+    CHUNK_SIZE = 1 << 20
+
+    async def get(self, filename, include_body=True):
+        lod = self.get_argument("lod", None)
+        if lod is None:
+            return await super().get(filename, include_body)
+
+        file_path = remote_pcd_path(self.root, filename)
+
+        try:
+            level = int(lod)
+        except ValueError:
+            raise tornado.web.HTTPError(400, reason="Invalid level of detail")
+
+        try:
+            lod_path = await run_pcd_build(pcd.build_lod, file_path, level)
+        except ValueError as e:
+            raise tornado.web.HTTPError(400, reason=str(e))
+        except Exception as e:
+            print(f"Error building LOD {level} of PCD file {file_path}: {e}")
+            raise tornado.web.HTTPError(500, reason=f"Error building level of detail: {str(e)}")
+
+        self.root = os.path.dirname(lod_path)
+        return await super().get(os.path.basename(lod_path), include_body)
+
+    def validate_absolute_path(self, root, absolute_path):
+        if not absolute_path.lower().endswith('.pcd'):
+            raise tornado.web.HTTPError(400, reason="Invalid file type. Only .pcd files are allowed.")
+        return super().validate_absolute_path(root, absolute_path)
+
+    def compute_etag(self):
+        # the default etag hashes the whole file once and never notices it changing
+        stat_result = os.stat(self.absolute_path)
+        return '"%x-%x"' % (int(stat_result.st_mtime * 1e6), stat_result.st_size)
+
+    @classmethod
+    def get_content(cls, abspath, start=None, end=None):
+        with open(abspath, 'rb') as f:
+            size = os.fstat(f.fileno()).st_size
+            start = start or 0
+            end = size if end is None else min(end, size)
+            if end <= start:
                 return
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as m:
+                for offset in range(start, end, cls.CHUNK_SIZE):
+                    yield m[offset:min(offset + cls.CHUNK_SIZE, end)]
 
-            # Read and return the PCD file
-            try:
-                with open(file_path, 'rb') as f:
-                    file_data = f.read()
+    def get_content_type(self):
+        return 'application/octet-stream'
 
-                self.set_header('Content-Type', 'application/octet-stream')
-                self.set_header('Content-Disposition', f'attachment; filename="{filename}"')
-                self.finish(file_data)
-            except Exception as e:
-                # rospy.logerr(f"Error reading PCD file {file_path}: {e}") # This line was commented out in the original file
-                print(f"Error reading PCD file {file_path}: {e}") # Changed from rospy.logerr to print
-                self.set_status(500)
-                self.finish(json.dumps({"error": f"Error reading file: {str(e)}"}))
+    def set_extra_headers(self, path):
+        self.set_header('Content-Disposition', f'attachment; filename="{os.path.basename(path)}"')
+
+    def write_error(self, status_code, **kwargs):
+        self.set_header('Content-Type', 'application/json')
+        self.finish(json.dumps({"error": self._reason}))
+
+
+class RemotePcdOctreeHandler(tornado.web.RequestHandler):
+    """
+    Serves the octree of a remote PCD file for progressive loading: the JSON index without a
+    node ID, or the float32 x, y, z points of one node with a node ID. The octree is built in
+    an executor on first access and cached next to the map (see pcd.build_octree).
+    """
+
+    # index path -> (mtime, parsed index)
+    indexes = {}
 
+    def initialize(self, path):
+        self.root = path
+
+    async def get(self, filename, node_id=None):
+        file_path = remote_pcd_path(self.root, filename)
+
+        try:
+            index_path = await run_pcd_build(pcd.build_octree, file_path)
         except Exception as e:
-            self.set_status(500)
-            self.finish(json.dumps({"error": str(e)}))
+            print(f"Error building octree of PCD file {file_path}: {e}")
+            raise tornado.web.HTTPError(500, reason=f"Error building octree: {str(e)}")
+
+        mtime = os.path.getmtime(index_path)
+        cached = RemotePcdOctreeHandler.indexes.get(index_path)
+        if cached is None or cached[0] != mtime:
+            with open(index_path, 'r', encoding='utf-8') as f:
+                cached = (mtime, json.load(f))
+            RemotePcdOctreeHandler.indexes[index_path] = cached
+        index = cached[1]
+
+        if node_id is None:
+            self.set_header('Content-Type', 'application/json')
+            self.finish(json.dumps(index, separators=(',', ':')))
+            return
+
+        if node_id not in index["nodes"]:
+            raise tornado.web.HTTPError(404, reason="Node not found")
+        offset, count = index["nodes"][node_id]
+        with open(os.path.splitext(index_path)[0] + '.bin', 'rb') as f:
+            f.seek(offset * 12)
+            data = f.read(count * 12)
+        self.set_header('Content-Type', 'application/octet-stream')
+        self.finish(data)
+
+    def write_error(self, status_code, **kwargs):
+        self.set_header('Content-Type', 'application/json')
+        self.finish(json.dumps({"error": self._reason}))
 
 
 class LocConfigsListHandler(LayoutsBaseHandler):
     """List JSON config files under loc_config directory next to configs."""
 
-    def initialize(self, config_dir=None):
-        base_dir = os.path.dirname(os.path.realpath(__file__))
-        self.config_dir = os.path.join(base_dir, 'loc_config')
-        try:
-            os.makedirs(self.config_dir, exist_ok=True)
-        except Exception:
-            pass
-
     def get(self):
         try:
-            files = glob.glob(os.path.join(self.config_dir, '*.json'))
-            # Ensure default file exists
-            default_path = os.path.join(self.config_dir, 'paths.json')
-            if not os.path.exists(default_path):
-                try:
-                    with open(default_path, 'w', encoding='utf-8') as f:
-                        json.dump({
-                            "garage": {"x0": -3, "y0": 15, "x1": -3, "y1": 20},
-                            "water": {"x0": -7, "y0": 7, "x1": -5, "y1": 7}
-                        }, f)
-                except Exception:
-                    pass
-                files = glob.glob(os.path.join(self.config_dir, '*.json'))
-            names = sorted([os.path.basename(f) for f in files])
             self.set_header('Content-Type', 'application/json')
-            self.finish(json.dumps({"files": names}))
+            self.set_header('Cache-Control', 'no-cache')
+            self.finish(json.dumps({"files": self.store.names()}))
         except Exception as e:
             self.set_status(500)
             self.finish(json.dumps({"error": str(e)}))
@@ -391,30 +1085,18 @@ class LocConfigsListHandler(LayoutsBaseHandler):
 class LocConfigFileHandler(LayoutsBaseHandler):
     """Serve a specific loc_config JSON file by name."""
 
-    def initialize(self, config_dir=None):
-        base_dir = os.path.dirname(os.path.realpath(__file__))
-        self.config_dir = os.path.join(base_dir, 'loc_config')
-        try:
-            os.makedirs(self.config_dir, exist_ok=True)
-        except Exception:
-            pass
-
     def get(self, filename):
         try:
             if not filename.lower().endswith('.json'):
                 self.set_status(400)
                 self.finish(json.dumps({"error": "Invalid file type. Only .json files are allowed."}))
                 return
-            safe = os.path.basename(filename)
-            path = os.path.join(self.config_dir, safe)
-            if not os.path.exists(path):
+            entry = self.store.get(os.path.basename(filename))
+            if entry is None:
                 self.set_status(404)
                 self.finish(json.dumps({"error": "not found"}))
                 return
-            with open(path, 'r', encoding='utf-8') as f:
-                data = f.read()
-            self.set_header('Content-Type', 'application/json')
-            self.finish(data)
+            self._finish_entry(entry)
         except Exception as e:
             self.set_status(500)
             self.finish(json.dumps({"error": str(e)}))
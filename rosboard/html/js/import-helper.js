@@ -1,18 +1,25 @@
 let importedPaths = {};
 
+// versioned URL of an asset, using the table of asset versions injected into index.html
+// by the server (see rosboard/assets.py), so that it can be cached by the browser for good
+function assetUrl(path) {
+  let versions = window.ROSBOARD_ASSET_VERSIONS || {};
+  return (path in versions) ? path + "?v=" + versions[path] : path;
+}
+
 function importCssOnce(path) {
   if(path in importedPaths) return;
   $('<link>').appendTo('head').attr({
     type: 'text/css',
     rel: 'stylesheet',
-    href: path
+    href: assetUrl(path)
   });
   importedPaths[path] = 1;
 }
 
 function importJsOnce(path) {
   if(path in importedPaths) return;
-  var result = $.ajax({ url: path, dataType: "script", async: false })
+  var result = $.ajax({ url: assetUrl(path), dataType: "script", async: false, cache: true })
   if(result.status === 200) {
     importedPaths[path] = 1;
   } else {
@@ -1,29 +1,31 @@
 "use strict";
 
 importJsOnce("js/viewers/meta/Viewer.js");
-importJsOnce("js/viewers/meta/Space2DViewer.js");
-importJsOnce("js/viewers/meta/Space3DViewer.js");
-
-importJsOnce("js/viewers/ImageViewer.js");
-importJsOnce("js/viewers/LogViewer.js");
-importJsOnce("js/viewers/ProcessListViewer.js");
-importJsOnce("js/viewers/HtopViewer.js");
-importJsOnce("js/viewers/MapViewer.js");
-importJsOnce("js/viewers/LaserScanViewer.js");
-importJsOnce("js/viewers/GeometryViewer.js");
-importJsOnce("js/viewers/PolygonViewer.js");
-importJsOnce("js/viewers/DiagnosticViewer.js");
-importJsOnce("js/viewers/TimeSeriesPlotViewer.js");
-importJsOnce("js/viewers/PointCloud2Viewer.js");
-importJsOnce("js/viewers/Multi3DViewer.js");
-importJsOnce("js/viewers/Viewer3D.js");
-importJsOnce("js/viewers/JoystickViewer.js");
-importJsOnce("js/viewers/StatusViewer.js");
-importJsOnce("js/viewers/InitialPathViewer.js");
-importJsOnce("js/viewers/ControlActivatorViewer.js");
 
+// viewers are loaded on demand using the manifest served by the backend (see Viewer.loadViewer).
+// when several viewers support a topic type, the first one in this list is the default.
 // GenericViewer must be last
-importJsOnce("js/viewers/GenericViewer.js");
+Viewer.preferenceOrder = [
+  "ImageViewer",
+  "LogViewer",
+  "ProcessListViewer",
+  "HtopViewer",
+  "MapViewer",
+  "LaserScanViewer",
+  "GeometryViewer",
+  "PolygonViewer",
+  "DiagnosticViewer",
+  "TimeSeriesPlotViewer",
+  "PointCloud2Viewer",
+  "Multi3DViewer",
+  "Viewer3D",
+  "JoystickViewer",
+  "StatusViewer",
+  "InitialPathViewer",
+  "ControlActivatorViewer",
+  "GenericViewer",
+];
+Viewer.loadManifest();
 
 importJsOnce("js/transports/WebSocketV1Transport.js");
 
@@ -344,17 +346,17 @@ let onOpen = function() {
 
           // Find the viewer constructor
           if (sub.preferredViewer) {
-            viewerCtor = Viewer._viewers.find(v => v && v.name === sub.preferredViewer) || null;
+            viewerCtor = Viewer.loadViewer(sub.preferredViewer);
           }
 
           // Use default viewer if not found
           if (!viewerCtor) {
             if (topic_name === "_topics_monitor") {
-              viewerCtor = StatusViewer;
+              viewerCtor = Viewer.loadViewer("StatusViewer");
             } else if (topic_name === "_manual_control") {
-              viewerCtor = JoystickViewer;
+              viewerCtor = Viewer.loadViewer("JoystickViewer");
             } else if (topic_name === "_initial_path_picker") {
-              viewerCtor = InitialPathViewer;
+              viewerCtor = Viewer.loadViewer("InitialPathViewer");
             }
           }
 
@@ -430,7 +432,7 @@ let onMsg = function(msg) {
   // Also feed any Multi3D viewer layers
   // CRITICAL: Use requestRender (async) instead of direct _render() to avoid blocking message processing
   try {
-    const viewers = Object.values(subscriptions).map(s=>s.viewer).filter(v=>v && v instanceof Multi3DViewer);
+    const viewers = Object.values(subscriptions).map(s=>s.viewer).filter(v=>v && v.constructor.name === "Multi3DViewer");
     for(const v of viewers) {
       if(v.layers[msg._topic_name]) {
         v.layers[msg._topic_name].lastMsg = msg;
@@ -509,12 +511,18 @@ let onTopics = function(topics) {
   .text("System stats")
   .appendTo($("#topics-nav-system"));
 
+  $('<a></a>')
+  .addClass("mdl-navigation__link")
+  .click(() => { initSubscribe({topicName: "_topic_stats", topicType: "rosboard_msgs/msg/TopicStats"}); })
+  .text("Topic stats")
+  .appendTo($("#topics-nav-system"));
+
   $('<a></a>')
   .addClass("mdl-navigation__link")
   .click(() => {
     // Create a manual control joystick viewer
     const card = newCard();
-    const viewer = new JoystickViewer(card, "_manual_control", "std_msgs/String");
+    const viewer = new (Viewer.loadViewer("JoystickViewer"))(card, "_manual_control", "std_msgs/String");
 
     // Store in regular subscriptions system like other viewers
     subscriptions["_manual_control"] = {
@@ -539,7 +547,7 @@ let onTopics = function(topics) {
   .click(() => {
     // Create a topics monitor viewer directly
     const card = newCard();
-    const viewer = new StatusViewer(card, "_topics_monitor", "std_msgs/String");
+    const viewer = new (Viewer.loadViewer("StatusViewer"))(card, "_topics_monitor", "std_msgs/String");
 
     // Store in regular subscriptions system like other viewers
     subscriptions["_topics_monitor"] = {
@@ -564,7 +572,7 @@ let onTopics = function(topics) {
   .click(() => {
     // Create Control Activator viewer (special, non-ROS topic-like card)
     const card = newCard();
-    const viewer = new ControlActivatorViewer(card, "_control_activator", "std_msgs/Bool");
+    const viewer = new (Viewer.loadViewer("ControlActivatorViewer"))(card, "_control_activator", "std_msgs/Bool");
 
     // Store like other viewers under a special key
     subscriptions["_control_activator"] = {
@@ -584,7 +592,7 @@ let onTopics = function(topics) {
   .click(() => {
     // Create Initial Path picker viewer (special, non-ROS topic)
     const card = newCard();
-    const viewer = new InitialPathViewer(card, "_initial_path_picker", "std_msgs/String");
+    const viewer = new (Viewer.loadViewer("InitialPathViewer"))(card, "_initial_path_picker", "std_msgs/String");
 
     subscriptions["_initial_path_picker"] = {
       topicType: "std_msgs/String",
@@ -658,7 +666,7 @@ function initSubscribe({topicName, topicType}) {
     let viewerCtor = null;
     try {
       const prefName = subscriptions[topicName].preferredViewer;
-      if(prefName){ viewerCtor = Viewer._viewers.find(v => v && v.name === prefName) || null; }
+      if(prefName){ viewerCtor = Viewer.loadViewer(prefName); }
     } catch(e){}
     if(!viewerCtor) viewerCtor = Viewer.getDefaultViewerForType(topicType);
     let viewer = viewerCtor;
@@ -816,12 +824,12 @@ function applyLayout(layout){
       try {
         console.log('Restoring manual control viewer, it.viewer:', it.viewer);
         if (it.viewer) {
-          viewerCtor = Viewer._viewers.find(v => v && v.name === it.viewer) || null;
+          viewerCtor = Viewer.loadViewer(it.viewer);
           console.log('Found viewerCtor:', viewerCtor);
         }
         if (!viewerCtor) {
           // Default to JoystickViewer for manual control
-          viewerCtor = JoystickViewer;
+          viewerCtor = Viewer.loadViewer("JoystickViewer");
           console.log('Using default JoystickViewer');
         }
 
@@ -856,12 +864,12 @@ function applyLayout(layout){
         console.log('Restoring topics monitor viewer, it.viewer:', it.viewer);
         console.log('Available viewers in Viewer._viewers:', Viewer._viewers.map(v => v ? v.name : 'null'));
         if (it.viewer) {
-          viewerCtor = Viewer._viewers.find(v => v && v.name === it.viewer) || null;
+          viewerCtor = Viewer.loadViewer(it.viewer);
           console.log('Found viewerCtor for topics monitor:', viewerCtor);
         }
         if (!viewerCtor) {
           // Default to StatusViewer for topics monitor
-          viewerCtor = StatusViewer;
+          viewerCtor = Viewer.loadViewer("StatusViewer");
           console.log('Using default StatusViewer');
         }
 
@@ -895,7 +903,7 @@ function applyLayout(layout){
 
     } else if (it.topicName === "_initial_path_picker") {
       const card = newCard();
-      let viewerCtor = InitialPathViewer;
+      let viewerCtor = Viewer.loadViewer("InitialPathViewer");
       try {
         const viewer = new viewerCtor(card, it.topicName, it.topicType);
         subscriptions[it.topicName] = { topicType: it.topicType, viewer: viewer };
@@ -915,10 +923,10 @@ function applyLayout(layout){
       let viewerCtor = null;
       try {
         if (it.viewer) {
-          viewerCtor = Viewer._viewers.find(v => v && v.name === it.viewer) || null;
+          viewerCtor = Viewer.loadViewer(it.viewer);
         }
         if (!viewerCtor) {
-          viewerCtor = ControlActivatorViewer;
+          viewerCtor = Viewer.loadViewer("ControlActivatorViewer");
         }
 
         const viewer = new viewerCtor(card, it.topicName, it.topicType);
@@ -949,7 +957,7 @@ function applyLayout(layout){
         const sub = subscriptions[it.topicName];
         if(sub && sub.viewer && it.viewer && sub.viewer.constructor && sub.viewer.constructor.name !== it.viewer){
           let target = null;
-          try { target = Viewer._viewers.find(v => v && v.name === it.viewer); } catch(e){}
+          try { target = Viewer.loadViewer(it.viewer); } catch(e){}
           if(!target) target = Viewer.getDefaultViewerForType(it.topicType);
           if(target) Viewer.onSwitchViewer(sub.viewer, target);
         }
@@ -0,0 +1,19 @@
+"use strict";
+
+// Process table of the _top topic, which only carries the processes that changed since the
+// previous message (plus the pids of those that exited), and the full list every few messages
+// (msg.full). See rosboard/subscribers/processes_subscriber.py.
+
+class ProcessList {
+  constructor() {
+    this.processes = {}; // pid -> process
+  }
+
+  // merges a _top message; returns the processes sorted by decreasing CPU usage
+  update(msg) {
+    if(msg.full) this.processes = {};
+    for(let pid of (msg.removed || [])) delete this.processes[pid];
+    for(let process of (msg.processes || [])) this.processes[process.pid] = process;
+    return Object.values(this.processes).sort((a, b) => b.cpu - a.cpu);
+  }
+}
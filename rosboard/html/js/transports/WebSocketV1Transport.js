@@ -57,8 +57,21 @@ class WebSocketV1Transport {
       return (this.ws && this.ws.readyState === this.ws.OPEN);
     }
 
-    subscribe({topicName, maxUpdateRate = 24.0}) {
-      this.ws.send(JSON.stringify([WebSocketV1Transport.MSG_SUB, {topicName: topicName, maxUpdateRate: maxUpdateRate}]));
+    subscribe({topicName, maxUpdateRate = 24.0, roi = undefined, logFilter = undefined}) {
+      let args = {topicName: topicName, maxUpdateRate: maxUpdateRate};
+      if(roi !== undefined) args.roi = roi;
+      if(logFilter !== undefined) args.logFilter = logFilter;
+      this.ws.send(JSON.stringify([WebSocketV1Transport.MSG_SUB, args]));
+    }
+
+    setRoi({topicName, roi = null}) {
+      // roi: {x, y, width, height, size} normalized to the full image, or null for the full frame
+      this.ws.send(JSON.stringify([WebSocketV1Transport.MSG_ROI, {topicName: topicName, roi: roi}]));
+    }
+
+    setLogFilter({topicName, logFilter = null}) {
+      // logFilter: {minLevel, nodes, text, regex, backfill}, or null for everything
+      this.ws.send(JSON.stringify([WebSocketV1Transport.MSG_LOG_FILTER, {topicName: topicName, logFilter: logFilter}]));
     }
 
     unsubscribe({topicName}) {
@@ -83,6 +96,8 @@ class WebSocketV1Transport {
   WebSocketV1Transport.MSG_SYSTEM = "y";
   WebSocketV1Transport.MSG_UNSUB = "u";
   WebSocketV1Transport.MSG_PUB = "b"; // publish from client
+  WebSocketV1Transport.MSG_ROI = "r"; // image region of interest from client
+  WebSocketV1Transport.MSG_LOG_FILTER = "l"; // log topic filter from client
 
   WebSocketV1Transport.PING_SEQ= "s";
   WebSocketV1Transport.PONG_SEQ = "s";
@@ -2,11 +2,14 @@
 
 // Htop-like viewer for _top (non-ROS system process list)
 
+importJsOnce("js/process-list.js");
+
 class HtopViewer extends Viewer {
   constructor(card, topicName, topicType){
     super(card, topicName, topicType);
     this._sortKey = 'cpu'; // 'cpu' | 'mem' | 'pid' | 'user' | 'command'
     this._filter = '';
+    this._processList = new ProcessList();
   }
 
   onCreate(){
@@ -111,7 +114,13 @@ class HtopViewer extends Viewer {
     this.table[0].innerHTML = html;
   }
 
+  onDataPaused(msg){
+    // keep the table current, since messages only carry the processes that changed
+    this._processList.update(msg);
+  }
+
   onData(msg){
+    msg = Object.assign({}, msg, { processes: this._processList.update(msg) });
     this._lastMsg = msg;
     this.card.title.text(msg._topic_name + ' (htop)');
     this._render(msg);
@@ -11,25 +11,29 @@ class ImageViewer extends Viewer {
       .appendTo(this.card.content);
 
     this.img = $('<img></img>')
-      .css({"width": "100%"})
+      .css({"width": "100%", "touch-action": "none"})
+      .attr("draggable", "false")
       .appendTo(this.viewerNode);
 
+    // region of interest requested from the server, normalized to the full image
+    // (null means the full frame). zoom with the mouse wheel, drag to pan, double click to reset.
+    this.roi = null;
+    this.lastRoiSendTime = 0;
+
     let that = this;
 
     this.img[0].addEventListener('pointermove', function(e) {
       if(!that.lastMsg) return;
       if(!that.img[0].clientWidth || !that.img[0].clientHeight) return;
 
-      let width = that.img[0].naturalWidth;
-      let height = that.img[0].naturalHeight;
-      if(that.lastMsg._data_shape) {
-        height = that.lastMsg._data_shape[0];
-        width = that.lastMsg._data_shape[1];
+      if(that.dragStart && that.roi) {
+        let dx = (e.clientX - that.dragStart.clientX) / that.img[0].clientWidth * that.roi.width;
+        let dy = (e.clientY - that.dragStart.clientY) / that.img[0].clientHeight * that.roi.height;
+        that.setRoi(that.dragStart.x - dx, that.dragStart.y - dy, that.roi.width, that.roi.height);
+        return;
       }
-      let x = e.offsetX / that.img[0].clientWidth * width;
-      let y = e.offsetY / that.img[0].clientHeight * height;
-      x = Math.min(Math.max(x, 0), width);
-      y = Math.min(Math.max(y, 0), height);
+
+      let [x, y] = that.imageCoordinates(e);
       that.tip("(" + x.toFixed(0) + ", " + y.toFixed(0) + ")");
     });
 
@@ -37,25 +41,112 @@ class ImageViewer extends Viewer {
       if(!that.lastMsg) return;
       if(!that.img[0].clientWidth || !that.img[0].clientHeight) return;
 
-      let width = that.img[0].naturalWidth;
-      let height = that.img[0].naturalHeight;
-      if(that.lastMsg._data_shape) {
-        height = that.lastMsg._data_shape[0];
-        width = that.lastMsg._data_shape[1];
+      if(that.roi) {
+        that.dragStart = {clientX: e.clientX, clientY: e.clientY, x: that.roi.x, y: that.roi.y};
+        try { that.img[0].setPointerCapture(e.pointerId); } catch(err) {}
       }
-      let x = e.offsetX / that.img[0].clientWidth * width;
-      let y = e.offsetY / that.img[0].clientHeight * height;
+
+      let [x, y] = that.imageCoordinates(e);
       console.log("clicked at " + x + ", " + y);
     });
 
+    let endDrag = function(e) { that.dragStart = null; };
+    this.img[0].addEventListener('pointerup', endDrag);
+    this.img[0].addEventListener('pointercancel', endDrag);
+
+    this.img[0].addEventListener('wheel', function(e) {
+      if(!that.lastMsg) return;
+      if(!that.img[0].clientWidth || !that.img[0].clientHeight) return;
+      e.preventDefault();
+
+      let roi = that.roi || {x: 0, y: 0, width: 1, height: 1};
+      let scale = e.deltaY > 0 ? 1.25 : 0.8;
+      let width = Math.min(Math.max(roi.width * scale, 0.02), 1.0);
+      let height = Math.min(Math.max(roi.height * scale, 0.02), 1.0);
+
+      // keep the point under the cursor fixed while zooming
+      let fx = e.offsetX / that.img[0].clientWidth;
+      let fy = e.offsetY / that.img[0].clientHeight;
+      let cx = roi.x + fx * roi.width;
+      let cy = roi.y + fy * roi.height;
+      that.setRoi(cx - fx * width, cy - fy * height, width, height);
+    }, {passive: false});
+
+    this.img[0].addEventListener('dblclick', function(e) {
+      that.setRoi(0, 0, 1, 1);
+    });
+
     this.lastMsg = null;
 
     super.onCreate();
   }
 
+  imageCoordinates(e) {
+    // maps a pointer event on the displayed (possibly cropped) image to full image pixel coordinates
+    let width = this.img[0].naturalWidth;
+    let height = this.img[0].naturalHeight;
+    if(this.lastMsg._data_shape) {
+      height = this.lastMsg._data_shape[0];
+      width = this.lastMsg._data_shape[1];
+    }
+    let roi = this.lastMsg._roi ?
+      {x: this.lastMsg._roi[0], y: this.lastMsg._roi[1], width: this.lastMsg._roi[2], height: this.lastMsg._roi[3]} :
+      {x: 0, y: 0, width: 1, height: 1};
+    let x = (roi.x + e.offsetX / this.img[0].clientWidth * roi.width) * width;
+    let y = (roi.y + e.offsetY / this.img[0].clientHeight * roi.height) * height;
+    x = Math.min(Math.max(x, 0), width);
+    y = Math.min(Math.max(y, 0), height);
+    return [x, y];
+  }
+
+  setRoi(x, y, width, height) {
+    width = Math.min(Math.max(width, 0.02), 1.0);
+    height = Math.min(Math.max(height, 0.02), 1.0);
+    x = Math.min(Math.max(x, 0), 1.0 - width);
+    y = Math.min(Math.max(y, 0), 1.0 - height);
+
+    // same precision the server keeps, so that received frames can be matched to the request
+    let round = (v) => Math.round(v * 1e4) / 1e4;
+    [x, y, width, height] = [round(x), round(y), round(width), round(height)];
+
+    if(width >= 0.999 && height >= 0.999) {
+      this.roi = null;
+    } else {
+      // ask for about as many pixels as the card can actually display
+      let size = Math.round((this.img[0].clientWidth || 800) * (window.devicePixelRatio || 1));
+      this.roi = {x: x, y: y, width: width, height: height, size: Math.min(Math.max(size, 320), 1920)};
+    }
+    this.sendRoi();
+  }
+
+  sendRoi() {
+    let transport = (typeof currentTransport !== 'undefined' && currentTransport) ? currentTransport : (window.currentTransport || null);
+    if(!transport || !transport.isConnected() || typeof transport.setRoi !== 'function') return;
+    this.lastRoiSendTime = Date.now();
+    transport.setRoi({topicName: this.topicName, roi: this.roi});
+  }
+
+  serializeState() {
+    return this.roi ? {roi: this.roi} : null;
+  }
+
+  applyState(state) {
+    if(state && state.roi) {
+      this.roi = state.roi;
+      this.sendRoi();
+    }
+  }
+
   onData(msg) {
     this.card.title.text(msg._topic_name);
 
+    // if the server is not rendering the region of interest we want (e.g. after a reconnect), ask again
+    let wantRoi = this.roi ? [this.roi.x, this.roi.y, this.roi.width, this.roi.height] : null;
+    let gotRoi = msg._roi ? msg._roi.slice(0, 4) : null;
+    if(msg._roi !== undefined && JSON.stringify(wantRoi) !== JSON.stringify(gotRoi) && Date.now() - this.lastRoiSendTime > 1000) {
+      this.sendRoi();
+    }
+
     if(msg.__comp) {
       this.decodeAndRenderCompressed(msg);
     } else {
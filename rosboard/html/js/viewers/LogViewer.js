@@ -1,7 +1,8 @@
 "use strict";
 
 // Viewer for /rosout and other logs that can be expressed in
-// rcl_interfaces/msgs/Log format.
+// rcl_interfaces/msgs/Log format. The level/node/text filter is applied by
+// the server (see rosboard/logbuffer.py), so only matching lines are sent.
 
 class LogViewer extends Viewer {
     /**
@@ -11,6 +12,9 @@ class LogViewer extends Viewer {
     onCreate() {
         this.card.title.text("LogViewer");
 
+        this.logFilter = {minLevel: 0, nodes: [], text: "", regex: true};
+        this.lastFilterSendTime = 0;
+
         // wrapper and wrapper2 are css BS that are necessary to 
         // have something that is 100% width but fixed aspect ratio
         this.wrapper = $('<div></div>')
@@ -19,6 +23,32 @@ class LogViewer extends Viewer {
                 "width": "100%",
             })
             .appendTo(this.card.content);
+
+        // filter controls
+        let controls = $('<div></div>')
+            .css({"display": "flex", "gap": "6px", "align-items": "center", "padding": "4px"})
+            .appendTo(this.wrapper);
+        let inputCss = {"background": "#404040", "border": "1px solid #505050", "color": "#e0e0e0", "padding": "2px 4px", "font-size": "10px"};
+
+        this.levelSelect = $('<select></select>')
+            .append('<option value="0">ALL</option>')
+            .append('<option value="20">INFO+</option>')
+            .append('<option value="30">WARN+</option>')
+            .append('<option value="40">ERROR+</option>')
+            .append('<option value="50">FATAL</option>')
+            .css(inputCss)
+            .change(() => this.onFilterChange())
+            .appendTo(controls);
+
+        this.nodesInput = $('<input type="text" placeholder="nodes (comma separated)"/>')
+            .css(inputCss).css({"flex": "1 1 30%", "min-width": "60px"})
+            .change(() => this.onFilterChange())
+            .appendTo(controls);
+
+        this.textInput = $('<input type="text" placeholder="filter (regex)"/>')
+            .css(inputCss).css({"flex": "1 1 50%", "min-width": "80px"})
+            .change(() => this.onFilterChange())
+            .appendTo(controls);
         
         this.wrapper2 = $('<div></div>')
             .css({
@@ -57,7 +87,62 @@ class LogViewer extends Viewer {
         }, 1000);
     }
 
+    onFilterChange() {
+        this.logFilter = {
+            minLevel: parseInt(this.levelSelect.val()) || 0,
+            nodes: (this.nodesInput.val() || "").split(",").map((node) => node.trim()).filter((node) => node),
+            text: (this.textInput.val() || "").trim(),
+            regex: true,
+        };
+        // the server answers with the latest matching lines
+        this.logContainer.empty();
+        this.sendLogFilter();
+    }
+
+    sendLogFilter() {
+        let transport = (typeof currentTransport !== 'undefined' && currentTransport) ? currentTransport : (window.currentTransport || null);
+        if(!transport || !transport.isConnected() || typeof transport.setLogFilter !== 'function') return;
+        this.lastFilterSendTime = Date.now();
+        transport.setLogFilter({topicName: this.topicName, logFilter: this.logFilter});
+    }
+
+    matchesFilter(msg) {
+        // same rules as LogFilter in rosboard/logbuffer.py
+        const ros1Levels = {1: 10, 2: 20, 4: 30, 8: 40, 16: 50};
+        let level = ros1Levels[msg.level] || msg.level || 0;
+        if(level < this.logFilter.minLevel) return false;
+        if(this.logFilter.nodes.length && !this.logFilter.nodes.includes(msg.name)) return false;
+        if(this.logFilter.text) {
+            try {
+                return new RegExp(this.logFilter.text, "i").test(msg.msg || "");
+            } catch(e) {
+                return String(msg.msg || "").toLowerCase().includes(this.logFilter.text.toLowerCase());
+            }
+        }
+        return true;
+    }
+
+    serializeState() {
+        return {logFilter: this.logFilter};
+    }
+
+    applyState(state) {
+        if(state && state.logFilter) {
+            this.levelSelect.val(String(state.logFilter.minLevel || 0));
+            this.nodesInput.val((state.logFilter.nodes || []).join(", "));
+            this.textInput.val(state.logFilter.text || "");
+            this.onFilterChange();
+        }
+    }
+
     onData(msg) {
+        // lines the server didn't filter (e.g. after a reconnect, or a bag file): filter them here,
+        // and send the filter again in case the server forgot it
+        if(!this.matchesFilter(msg)) {
+            if(Date.now() - this.lastFilterSendTime > 1000) this.sendLogFilter();
+            return;
+        }
+
         while(this.logContainer.children().length > 30) {
             this.logContainer.children()[0].remove();
         }
@@ -1,5 +1,8 @@
 "use strict";
 
+importCssOnce("css/leaflet.css");
+importJsOnce("js/leaflet.js");
+
 class MapViewer extends Viewer {
   /**
     * Gets called when Viewer is first initialized.
@@ -38,6 +38,7 @@ class Multi3DViewer extends Space3DViewer {
     this._rebuildTopicsDebounced = this._debounce(() => this._rebuildTopics(), 500);
     this._topicsRefreshInterval = setInterval(()=>this._rebuildTopicsDebounced(), 2000); // Reduced frequency
     this._tfRefreshInterval = setInterval(()=>this._populateFrames(), 1000);
+    this._pcdOctreeInterval = setInterval(()=>this._updatePcdOctrees(), 250);
 
     // requestAnimationFrame-based render coalescing
     this._rafPending = false;
@@ -326,6 +327,7 @@ class Multi3DViewer extends Space3DViewer {
   destroy() {
     if(this._topicsRefreshInterval) clearInterval(this._topicsRefreshInterval);
     if(this._tfRefreshInterval) clearInterval(this._tfRefreshInterval);
+    if(this._pcdOctreeInterval) clearInterval(this._pcdOctreeInterval);
 
     // Unsubscribe from TF updates
     if(this._tfUpdateListener && window.ROSBOARD_TF && window.ROSBOARD_TF.removeListener) {
@@ -1557,7 +1559,7 @@ class Multi3DViewer extends Space3DViewer {
     // Add PCD layers to draw objects
     for (const layerId in this.pcdLayers) {
       const pcdLayer = this.pcdLayers[layerId];
-      if (!pcdLayer.visible) continue;
+      if (!pcdLayer.visible || !pcdLayer.pointCount) continue;
 
       // Use the pre-calculated Z-based colors with transparency
       const colors = pcdLayer.colors || new Float32Array(pcdLayer.pointCount * 4);
@@ -1931,15 +1933,22 @@ class Multi3DViewer extends Space3DViewer {
 
   // Load remote PCD file for restoration (from layout import)
   _loadRemotePcdFileForRestore(filename, metadata) {
-    // Use fetch instead of jQuery for better binary data handling
-    fetch('/rosboard/api/remote-pcd-files/' + encodeURIComponent(filename))
-      .then(response => {
-        if (!response.ok) {
-          throw new Error(`HTTP ${response.status}: ${response.statusText}`);
-        }
-        return response.arrayBuffer();
-      })
-      .then(arrayBuffer => {
+    this._fetchRemotePcdOctree(filename).then(index => {
+      if (!index) { this._loadRemotePcdFileForRestoreWhole(filename, metadata); return; }
+      const pointCloud = this._createPcdOctreeLayer(filename, index);
+      pointCloud.visible = metadata.visible !== false;
+      pointCloud.pointSize = metadata.pointSize || 2.0;
+      pointCloud.transparency = metadata.transparency !== undefined ? metadata.transparency : 1.0;
+      if (metadata.pointBudget !== undefined) pointCloud.pointBudget = metadata.pointBudget;
+      if (metadata.stride !== undefined) pointCloud.stride = metadata.stride;
+      this._addPcdLayer(pointCloud);
+      console.log('Successfully restored remote PCD file (octree):', filename);
+    });
+  }
+
+  _loadRemotePcdFileForRestoreWhole(filename, metadata) {
+    this._fetchRemotePcdFile(filename)
+      .then(({ arrayBuffer, coarse }) => {
         try {
           // Parse the PCD data
           const pointCloud = this._parsePcdFile(arrayBuffer, filename);
@@ -1958,6 +1967,7 @@ class Multi3DViewer extends Space3DViewer {
 
             // Add to PCD layers using the proper method to ensure colors are calculated
             this._addPcdLayer(pointCloud);
+            if (coarse) this._refineRemotePcdLayer(pointCloud, filename);
 
             console.log('Successfully restored remote PCD file:', filename);
 
@@ -2061,7 +2071,7 @@ class Multi3DViewer extends Space3DViewer {
       method: 'GET',
       success: (data) => {
         loadingDiv.remove();
-        this._renderRemotePcdFileList(dialog, data.files || []);
+        this._renderRemotePcdFileList(dialog, data.files || [], data.maps || []);
       },
       error: (xhr, status, error) => {
         loadingDiv.html(`<div style="color: #ff6b6b;">Failed to load remote PCD files: ${error}</div>`);
@@ -2074,7 +2084,11 @@ class Multi3DViewer extends Space3DViewer {
   }
 
   // Render remote PCD file list
-  _renderRemotePcdFileList(dialog, files) {
+  _renderRemotePcdFileList(dialog, files, maps) {
+    // catalogued metadata of each file (point count, size, bounds, ...) by file name
+    const infoByName = {};
+    (maps || []).forEach(info => { if (info && info.name) infoByName[info.name] = info; });
+
     if (files.length === 0) {
       $('<div style="color: #ccc; text-align: center; margin: 20px 0;">No PCD files found in remote directory</div>').appendTo(dialog);
       $('<button class="mdl-button mdl-js-button mdl-button--raised" style="margin-top: 10px;">Close</button>')
@@ -2103,11 +2117,18 @@ class Multi3DViewer extends Space3DViewer {
             () => fileRow.css('backgroundColor', '#404040'),
             () => fileRow.css('backgroundColor', 'transparent')
           )
-          .click(() => this._loadRemotePcdFile(file, dialog))
+          .click(() => this._loadRemotePcdFile(file, dialog, infoByName[file]))
           .appendTo(fileList);
 
+        const info = infoByName[file];
+        let details = 'Click to load';
+        if (info && info.error) {
+          details = 'Unreadable: ' + info.error;
+        } else if (info && info.points !== undefined) {
+          details = `${info.points.toLocaleString()} pts, ${(info.size / 1048576).toFixed(1)} MB, ${info.data}`;
+        }
         $('<span style="color: #fff;">').text(file).appendTo(fileRow);
-        $('<span style="color: #808080; font-size: 12px;">').text('Click to load').appendTo(fileRow);
+        $('<span style="color: #808080; font-size: 12px;">').text(details).appendTo(fileRow);
       }
     });
 
@@ -2118,19 +2139,22 @@ class Multi3DViewer extends Space3DViewer {
   }
 
   // Load PCD file from remote directory
-  _loadRemotePcdFile(filename, dialog) {
+  _loadRemotePcdFile(filename, dialog, info) {
     // Show loading message
     dialog.html('<div style="text-align: center; color: #ccc;">Loading PCD file...</div>');
 
-    // Use fetch instead of jQuery for better binary data handling
-    fetch('/rosboard/api/remote-pcd-files/' + encodeURIComponent(filename))
-      .then(response => {
-        if (!response.ok) {
-          throw new Error(`HTTP ${response.status}: ${response.statusText}`);
-        }
-        return response.arrayBuffer();
+    this._fetchRemotePcdOctree(filename, info)
+      .then(index => {
+        if (!index) return this._fetchRemotePcdFile(filename);
+        // Large map: stream octree nodes around the camera instead of loading every point
+        this._addPcdLayer(this._createPcdOctreeLayer(filename, index));
+        dialog.html('<div style="text-align: center; color: #4caf50;">PCD file loaded successfully!</div>');
+        setTimeout(() => dialog.remove(), 1500);
+        return null;
       })
-      .then(arrayBuffer => {
+      .then(result => {
+        if (!result) return;
+        const { arrayBuffer, coarse } = result;
         try {
           // Parse the PCD data
           const pointCloud = this._parsePcdFile(arrayBuffer, filename);
@@ -2139,6 +2163,7 @@ class Multi3DViewer extends Space3DViewer {
             // Store the remote file path
             pointCloud.filePath = `/root/ws/src/maps/${filename}`;
             this._addPcdLayer(pointCloud);
+            if (coarse) this._refineRemotePcdLayer(pointCloud, filename);
 
             // Show success message
             dialog.html('<div style="text-align: center; color: #4caf50;">PCD file loaded successfully!</div>');
@@ -2160,6 +2185,209 @@ class Multi3DViewer extends Space3DViewer {
       });
   }
 
+  // Fetch a remote PCD file, preferring the server's coarse level of detail (built and cached
+  // server-side) so that large maps show up quickly; the full map is fetched afterwards by
+  // _refineRemotePcdLayer. Resolves to { arrayBuffer, coarse }.
+  _fetchRemotePcdFile(filename, lod) {
+    const url = '/rosboard/api/remote-pcd-files/' + encodeURIComponent(filename);
+    const fetchBuffer = (query) => fetch(url + query)
+      .then(response => {
+        if (!response.ok) {
+          throw new Error(`HTTP ${response.status}: ${response.statusText}`);
+        }
+        return response.arrayBuffer();
+      });
+
+    if (lod === null) {
+      return fetchBuffer('').then(arrayBuffer => ({ arrayBuffer, coarse: false }));
+    }
+    return fetchBuffer('?lod=' + (lod || 0))
+      .then(arrayBuffer => ({ arrayBuffer, coarse: true }))
+      .catch(error => {
+        console.warn('Coarse PCD not available, loading full file:', filename, error);
+        return fetchBuffer('').then(arrayBuffer => ({ arrayBuffer, coarse: false }));
+      });
+  }
+
+  // Resolves to the octree index of a remote PCD file if it is large enough to be worth
+  // streaming by octree nodes (see RemotePcdOctreeHandler), or to null otherwise. The file
+  // size is taken from its catalogue entry if given, otherwise from a HEAD request.
+  _fetchRemotePcdOctree(filename, info) {
+    const url = '/rosboard/api/remote-pcd-files/' + encodeURIComponent(filename);
+    const sizePromise = (info && info.size !== undefined) ? Promise.resolve(info.size) :
+      fetch(url, { method: 'HEAD' }).then(response => response.ok ? parseInt(response.headers.get('Content-Length') || '0') : 0);
+    return sizePromise
+      .then(size => {
+        if (size < Multi3DViewer.pcdOctreeMinBytes) return null;
+        return fetch(url + '/octree').then(response => response.ok ? response.json() : null);
+      })
+      .catch(error => {
+        console.warn('PCD octree not available:', filename, error);
+        return null;
+      });
+  }
+
+  _createPcdOctreeLayer(filename, index) {
+    return {
+      id: ++this.pcdCounter,
+      name: filename,
+      filePath: `/root/ws/src/maps/${filename}`,
+      points: new Float32Array(0),
+      pointCount: 0,
+      color: [1.0, 1.0, 1.0, 1.0],
+      visible: true,
+      pointSize: 2.0,
+      // color by the height range of the whole map so colors don't change as nodes stream in
+      zRange: [index.min[2], index.max[2]],
+      octree: {
+        url: '/rosboard/api/remote-pcd-files/' + encodeURIComponent(filename) + '/octree/',
+        index: index,
+        loaded: {},          // node id -> Float32Array of x, y, z
+        loading: new Set(),
+        selected: [],
+        selectionKey: null,
+        dirty: false,
+      },
+    };
+  }
+
+  // Returns false if the cube (min, size) is entirely outside the view frustum
+  _pcdBoxVisible(min, size) {
+    const m = this.mvp;
+    const outside = [0, 0, 0, 0, 0, 0];
+    for (let c = 0; c < 8; c++) {
+      const x = min[0] + ((c >> 2) & 1) * size;
+      const y = min[1] + ((c >> 1) & 1) * size;
+      const z = min[2] + (c & 1) * size;
+      const cx = m[0] * x + m[4] * y + m[8] * z + m[12];
+      const cy = m[1] * x + m[5] * y + m[9] * z + m[13];
+      const cz = m[2] * x + m[6] * y + m[10] * z + m[14];
+      const cw = m[3] * x + m[7] * y + m[11] * z + m[15];
+      if (cx < -cw) outside[0]++;
+      if (cx > cw) outside[1]++;
+      if (cy < -cw) outside[2]++;
+      if (cy > cw) outside[3]++;
+      if (cz < -cw) outside[4]++;
+      if (cz > cw) outside[5]++;
+    }
+    return outside.every(n => n < 8);
+  }
+
+  // Pick the octree nodes to show: visible nodes, largest on screen first, until the point
+  // budget is used up. A node is only picked if its parent is.
+  _selectPcdOctreeNodes(pointCloud) {
+    const index = pointCloud.octree.index;
+    const budget = Math.max(0.01, Math.min(1.0, pointCloud.pointBudget || 1.0)) * Multi3DViewer.pcdOctreePointBudget;
+    const camPos = this.cam_pos;
+    const queue = [{ id: 'r', min: index.min, size: index.size, priority: Infinity }];
+    const selected = [];
+    let total = 0;
+
+    while (queue.length > 0) {
+      let best = 0;
+      for (let i = 1; i < queue.length; i++) if (queue[i].priority > queue[best].priority) best = i;
+      const node = queue[best];
+      queue[best] = queue[queue.length - 1];
+      queue.pop();
+
+      const count = index.nodes[node.id][1];
+      if (total + count > budget && selected.length > 0) break;
+      selected.push(node.id);
+      total += count;
+
+      const half = node.size / 2;
+      for (let c = 0; c < 8; c++) {
+        const childId = node.id + c;
+        if (!index.nodes[childId]) continue;
+        const min = [node.min[0] + ((c >> 2) & 1) * half, node.min[1] + ((c >> 1) & 1) * half, node.min[2] + (c & 1) * half];
+        if (!this._pcdBoxVisible(min, half)) continue;
+        const dx = min[0] + half / 2 - camPos[0], dy = min[1] + half / 2 - camPos[1], dz = min[2] + half / 2 - camPos[2];
+        queue.push({ id: childId, min: min, size: half, priority: half / Math.max(1e-3, Math.sqrt(dx * dx + dy * dy + dz * dz)) });
+      }
+    }
+    return selected;
+  }
+
+  // Called periodically: reselect octree nodes when the camera or budget changed, fetch
+  // missing nodes and rebuild the layer's points from the loaded ones.
+  _updatePcdOctrees() {
+    let changed = false;
+    for (const layerId in this.pcdLayers) {
+      const pointCloud = this.pcdLayers[layerId];
+      const octree = pointCloud.octree;
+      if (!octree || !pointCloud.visible) continue;
+
+      const selectionKey = Array.prototype.join.call(this.mvp, ',') + '|' + pointCloud.pointBudget;
+      if (selectionKey !== octree.selectionKey) {
+        octree.selectionKey = selectionKey;
+        octree.selected = this._selectPcdOctreeNodes(pointCloud);
+        octree.dirty = true;
+      }
+
+      for (const id of octree.selected) {
+        if (octree.loading.size >= 4) break;
+        if (octree.loaded[id] || octree.loading.has(id)) continue;
+        octree.loading.add(id);
+        fetch(octree.url + id)
+          .then(response => {
+            if (!response.ok) throw new Error(`HTTP ${response.status}: ${response.statusText}`);
+            return response.arrayBuffer();
+          })
+          .then(arrayBuffer => {
+            octree.loaded[id] = new Float32Array(arrayBuffer);
+            octree.dirty = true;
+          })
+          .catch(error => console.warn('Failed to load PCD octree node', id, error))
+          .finally(() => octree.loading.delete(id));
+      }
+
+      if (!octree.dirty) continue;
+      octree.dirty = false;
+
+      // drop nodes that are no longer shown once the cache holds twice the budget
+      const selectedSet = new Set(octree.selected);
+      let cached = 0;
+      for (const id in octree.loaded) cached += octree.loaded[id].length / 3;
+      if (cached > 2 * Multi3DViewer.pcdOctreePointBudget) {
+        for (const id in octree.loaded) if (!selectedSet.has(id)) delete octree.loaded[id];
+      }
+
+      const nodes = octree.selected.filter(id => octree.loaded[id]);
+      let length = 0;
+      for (const id of nodes) length += octree.loaded[id].length;
+      const points = new Float32Array(length);
+      let offset = 0;
+      for (const id of nodes) { points.set(octree.loaded[id], offset); offset += octree.loaded[id].length; }
+      pointCloud.points = points;
+      pointCloud.pointCount = length / 3;
+      this._computePcdColors(pointCloud);
+      this._rebuildPcdMesh(pointCloud);
+      $(`.pcd-layer-row[data-layer-id="${layerId}"] .pcd-layer-count`).text(`${pointCloud.pointCount} / ${octree.index.points} pts`);
+      changed = true;
+    }
+    if (changed) this._render();
+  }
+
+  // Replace the points of a coarse remote PCD layer with the full map once it is downloaded
+  _refineRemotePcdLayer(pointCloud, filename) {
+    this._fetchRemotePcdFile(filename, null)
+      .then(({ arrayBuffer }) => {
+        const layerId = `pcd_${pointCloud.id}`;
+        if (this.pcdLayers[layerId] !== pointCloud) return; // removed in the meantime
+        const full = this._parsePcdFile(arrayBuffer, filename);
+        if (!full) return;
+        pointCloud.points = full.points;
+        pointCloud.pointCount = full.pointCount;
+        this._computePcdColors(pointCloud);
+        this._rebuildPcdMesh(pointCloud);
+        $(`.pcd-layer-row[data-layer-id="${layerId}"] .pcd-layer-count`).text(`${pointCloud.pointCount} pts`);
+        this._render();
+      })
+      .catch(error => {
+        console.warn('Failed to load full PCD file, keeping coarse version:', filename, error);
+      });
+  }
+
   _parsePcdFile(arrayBuffer, filename) {
     const dataView = new DataView(arrayBuffer);
     const decoder = new TextDecoder('utf-8');
@@ -2378,23 +2606,14 @@ class Multi3DViewer extends Space3DViewer {
     }
   }
 
-  _addPcdLayer(pointCloud) {
-    // Check if PCD with same file path already exists - PREVENT DUPLICATION
-    if (pointCloud.filePath) {
-      for (const [existingId, existingPcd] of Object.entries(this.pcdLayers)) {
-        if (existingPcd.filePath === pointCloud.filePath) {
-          console.log('PCD already exists with same file path, skipping duplicate:', pointCloud.filePath);
-          return; // Don't add duplicate
-        }
-      }
-    }
-
-    // Calculate Z-based colors for the point cloud
+  // Calculate Z-based colors for a PCD layer
+  _computePcdColors(pointCloud) {
     const colors = new Float32Array(pointCloud.pointCount * 4);
 
     // Find Z min/max for color scaling
     let zmin = Infinity, zmax = -Infinity;
-    for (let i = 0; i < pointCloud.pointCount; i++) {
+    if (pointCloud.zRange) [zmin, zmax] = pointCloud.zRange;
+    else for (let i = 0; i < pointCloud.pointCount; i++) {
       const z = pointCloud.points[i * 3 + 2];
       if (z < zmin) zmin = z;
       if (z > zmax) zmax = z;
@@ -2414,6 +2633,20 @@ class Multi3DViewer extends Space3DViewer {
     pointCloud.colors = colors;
     pointCloud.zmin = zmin;
     pointCloud.zmax = zmax;
+  }
+
+  _addPcdLayer(pointCloud) {
+    // Check if PCD with same file path already exists - PREVENT DUPLICATION
+    if (pointCloud.filePath) {
+      for (const [existingId, existingPcd] of Object.entries(this.pcdLayers)) {
+        if (existingPcd.filePath === pointCloud.filePath) {
+          console.log('PCD already exists with same file path, skipping duplicate:', pointCloud.filePath);
+          return; // Don't add duplicate
+        }
+      }
+    }
+
+    this._computePcdColors(pointCloud);
 
     // Set default transparency and point size if not specified
     if (pointCloud.transparency === undefined) {
@@ -2535,7 +2768,7 @@ class Multi3DViewer extends Space3DViewer {
     $('<span style="flex: 1; font-size: 12px;">').text(pointCloud.name).appendTo(row);
 
     // Point count
-    const countEl = $('<span style="color: #808080; font-size: 11px;">').text(`${pointCloud.pointCount} pts`).appendTo(row);
+    const countEl = $('<span class="pcd-layer-count" style="color: #808080; font-size: 11px;">').text(`${pointCloud.pointCount} pts`).appendTo(row);
 
     // Transparency control
     const transparencyLabel = $('<span style="color: #808080; font-size: 11px;">').text('Transp:').appendTo(row);
@@ -2713,7 +2946,8 @@ class Multi3DViewer extends Space3DViewer {
     try {
       const total = pointCloud.pointCount || (pointCloud.points ? Math.floor(pointCloud.points.length/3) : 0);
       if (!pointCloud.points || !pointCloud.colors || total === 0) { pointCloud.mesh = null; pointCloud.decimatedPoints = null; pointCloud.decimatedColors = null; return; }
-      const budget = Math.max(0.01, Math.min(1.0, pointCloud.pointBudget || 1.0));
+      // octree layers apply the budget when selecting nodes
+      const budget = pointCloud.octree ? 1.0 : Math.max(0.01, Math.min(1.0, pointCloud.pointBudget || 1.0));
       const targetCount = Math.max(1, Math.floor(total * budget));
       const strideBudget = Math.max(1, Math.floor(total / targetCount));
       const effStride = Math.max(1, Math.floor(Math.max(pointCloud.stride || 1, strideBudget)));
@@ -2756,6 +2990,10 @@ class Multi3DViewer extends Space3DViewer {
 }
 
 Multi3DViewer.friendlyName = "Multi 3D (PCD + PoseStamped + Path)";
+// remote PCD files larger than this are streamed by octree nodes instead of loaded whole
+Multi3DViewer.pcdOctreeMinBytes = 32 * 1024 * 1024;
+// maximum number of points of an octree-streamed PCD layer at 100% budget
+Multi3DViewer.pcdOctreePointBudget = 1500000;
 // Support all types since this viewer handles PCDs and other 3D data
 Multi3DViewer.supportedTypes = [
   "sensor_msgs/PointCloud2",
@@ -2,6 +2,8 @@
 
 // Viewer for _top (process list, non-ros)
 
+importJsOnce("js/process-list.js");
+
 class ProcessListViewer extends Viewer {
     /**
       * Gets called when Viewer is first initialized.
@@ -10,6 +12,8 @@ class ProcessListViewer extends Viewer {
     onCreate() {
         this.card.title.text("ProcessListViewer");
 
+        this.processList = new ProcessList();
+
         // wrapper and wrapper2 are css BS that are necessary to 
         // have something that is 100% width but fixed aspect ratio
         this.wrapper = $('<div></div>')
@@ -49,8 +53,14 @@ class ProcessListViewer extends Viewer {
         super.onCreate();
     }
 
+    onDataPaused(msg) {
+        // keep the table current, since messages only carry the processes that changed
+        this.processList.update(msg);
+    }
+
     onData(msg) {
         this.card.title.text(msg._topic_name);
+        let processes = this.processList.update(msg);
         
         // use vanilla JS here for speed, jQuery is slow
 
@@ -59,12 +69,12 @@ class ProcessListViewer extends Viewer {
         let html = "";
         html += '<tr><th style="width:20%">PID</th><th style="width:10%">CPU</th><th style="width:10%">MEM</th><th class=\"mdl-data-table__cell--non-numeric\" style="width:15%">USER</th><th class=\"mdl-data-table__cell--non-numeric\" style="width:45%">COMMAND</th></tr>';
 
-        for(let i in msg.processes) {
+        for(let i in processes) {
             if(i>50) {
                 html += "<tr><td colspan=\"5\">Process list truncated.</td></tr>";
                 break;
             }
-            let process = msg.processes[i];
+            let process = processes[i];
             html += "<tr><td>" + process.pid + "</td><td>" + process.cpu + "</td><td>" + process.mem + "</td><td class=\"mdl-data-table__cell--non-numeric\">" + process.user + "</td><td class=\"mdl-data-table__cell--non-numeric\" style=\"text-overflow:ellipsis;overflow:hidden;\">" + process.command + "</td></tr>";
         }
         this.processTable[0].innerHTML = html;
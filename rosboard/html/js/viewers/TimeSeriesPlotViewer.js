@@ -1,5 +1,8 @@
 "use strict";
 
+importCssOnce("css/uPlot.min.css");
+importJsOnce("js/uPlot.iife.min.js");
+
 // Plots time series data of a single .data variable.
 // Works on all ROS single value std_msgs types.
 
@@ -1,5 +1,8 @@
 "use strict";
 
+importJsOnce("js/gl-matrix.js");
+importJsOnce("js/litegl.min.js");
+
 // Space3DViewer is an extension of a Viewer that implements the common visualization
 // framework for 3D stuff.
 // Space3DViewer implements drawing functionality, but does not implement any
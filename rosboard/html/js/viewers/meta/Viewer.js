@@ -73,11 +73,15 @@ class Viewer {
     // <li disabled class="mdl-menu__item">Disabled Action</li> \
     // <li class="mdl-menu__item">Yet Another Action</li> \
 
-    let viewers = Viewer.getViewersForType(this.topicType);
+    // list the alternative viewers from the manifest, so that they are only loaded when picked
+    let viewers = Viewer.getViewerEntriesForType(this.topicType);
     for(let i in viewers) {
       let item = $('<li ' + (viewers[i].name === this.constructor.name ? 'disabled' : '') + ' class="mdl-menu__item">' + viewers[i].friendlyName + '</li>').appendTo(this.card.menu);
       let that = this;
-      item.click(() => { Viewer.onSwitchViewer(that, viewers[i]); });
+      item.click(() => {
+        let viewer = Viewer.loadViewer(viewers[i].name);
+        if(viewer) Viewer.onSwitchViewer(that, viewer);
+      });
     }
 
     componentHandler.upgradeAllRegistered();
@@ -496,32 +500,49 @@ Viewer.registerViewer = (viewer) => {
 };
 
 // not to be overwritten by child class!
-Viewer.getDefaultViewerForType = (type) => {
-  // gets the viewer class for a given message type (e.g. "std_msgs/msg/String")
+// manifest of all viewer classes by class name, as served by /rosboard/api/viewers:
+// {name, path, extends, friendlyName, supportedTypes}. null if it couldn't be loaded, in
+// which case all viewers are loaded up front.
+Viewer._manifest = null;
 
-  // if type is "package/MessageType", converted it to "package/msgs/MessageType"
-  let tokens = type.split("/");
-  if(tokens.length == 2) {
-    type = [tokens[0], "msg", tokens[1]].join("/");
-  }
+// order of preference among viewers supporting the same type; viewers that are not listed
+// come after the listed ones except the last. set by index.js
+Viewer.preferenceOrder = [];
 
-  // go down the list of registered viewers and return the first match
-  for(let i in Viewer._viewers) {
-    if(Viewer._viewers[i].supportedTypes.includes(type)) {
-      return Viewer._viewers[i];
-    }
-    if(Viewer._viewers[i].supportedTypes.includes("*")) {
-      return Viewer._viewers[i];
-    }
+// not to be overwritten by child class!
+Viewer.loadManifest = () => {
+  let result = $.ajax({ url: "/rosboard/api/viewers", dataType: "json", async: false });
+  if(result.status === 200 && result.responseJSON) {
+    Viewer._manifest = {};
+    for(let entry of result.responseJSON.viewers) Viewer._manifest[entry.name] = entry;
+  } else {
+    console.log(result.status + " error while loading the viewer manifest, loading all viewers");
+    importJsOnce("js/viewers/meta/Space2DViewer.js");
+    importJsOnce("js/viewers/meta/Space3DViewer.js");
+    for(let name of Viewer.preferenceOrder) importJsOnce("js/viewers/" + name + ".js");
   }
-  return null;
-}
+};
 
 // not to be overwritten by child class!
-Viewer.getViewersForType = (type) => {
-  // gets the viewer classes for a given message type (e.g. "std_msgs/msg/String")
+Viewer.getViewerByName = (name) => {
+  return Viewer._viewers.find(v => v && v.name === name) || null;
+};
 
-  let matchingViewers = [];
+// not to be overwritten by child class!
+Viewer.loadViewer = (name) => {
+  // returns the viewer class with the given name, loading it and its base classes first if needed
+  let viewer = Viewer.getViewerByName(name);
+  if(viewer || !Viewer._manifest || !(name in Viewer._manifest)) return viewer;
+  let entry = Viewer._manifest[name];
+  if(entry.extends && entry.extends !== "Viewer") Viewer.loadViewer(entry.extends);
+  importJsOnce(entry.path);
+  return Viewer.getViewerByName(name);
+};
+
+// not to be overwritten by child class!
+Viewer.getViewerEntriesForType = (type) => {
+  // gets the manifest entries (or, without a manifest, the loaded viewer classes) of the viewers
+  // supporting a given message type (e.g. "std_msgs/msg/String"), in order of preference
 
   // if type is "package/MessageType", converted it to "package/msgs/MessageType"
   let tokens = type.split("/");
@@ -529,16 +550,27 @@ Viewer.getViewersForType = (type) => {
     type = [tokens[0], "msg", tokens[1]].join("/");
   }
 
-  // go down the list of registered viewers and return the first match
-  for(let i in Viewer._viewers) {
-    if(Viewer._viewers[i].supportedTypes.includes(type)) {
-      matchingViewers.push(Viewer._viewers[i]);
-    }
-    if(Viewer._viewers[i].supportedTypes.includes("*")) {
-      matchingViewers.push(Viewer._viewers[i]);
-    }
+  let entries = Viewer._viewers;
+  if(Viewer._manifest) {
+    let order = Viewer.preferenceOrder;
+    let unlisted = Object.keys(Viewer._manifest).filter(name => !order.includes(name));
+    entries = order.slice(0, -1).concat(unlisted, order.slice(-1))
+      .filter(name => name in Viewer._manifest).map(name => Viewer._manifest[name]);
   }
 
-  return matchingViewers;
+  return entries.filter(entry => entry.supportedTypes.includes(type) || entry.supportedTypes.includes("*"));
+};
+
+// not to be overwritten by child class!
+Viewer.getDefaultViewerForType = (type) => {
+  // gets the viewer class for a given message type (e.g. "std_msgs/msg/String")
+  let entries = Viewer.getViewerEntriesForType(type);
+  return entries.length > 0 ? Viewer.loadViewer(entries[0].name) : null;
 }
 
+// not to be overwritten by child class!
+Viewer.getViewersForType = (type) => {
+  // gets the viewer classes for a given message type (e.g. "std_msgs/msg/String"),
+  // loading them if needed
+  return Viewer.getViewerEntriesForType(type).map(entry => Viewer.loadViewer(entry.name)).filter(v => v);
+}
@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+
+"""
+Server-side buffer of log messages (/rosout and other rcl_interfaces/msg/Log or
+rosgraph_msgs/Log topics), so that clients only receive the lines that pass their filter
+instead of every DEBUG/INFO line of every node, and get the latest matching lines as soon as
+they subscribe.
+"""
+
+import collections
+import re
+import threading
+
+LOG_TYPES = ("rcl_interfaces/msg/Log", "rosgraph_msgs/msg/Log", "rosgraph_msgs/Log")
+
+# ROS1 levels (1, 2, 4, 8, 16) -> ROS2 levels (10, 20, 30, 40, 50)
+_ros1_levels = {1: 10, 2: 20, 4: 30, 8: 40, 16: 50}
+_level_names = {"DEBUG": 10, "INFO": 20, "WARN": 30, "WARNING": 30, "ERROR": 40, "FATAL": 50}
+
+def normalize_level(level):
+    """
+    Returns the ROS2 level (10 DEBUG ... 50 FATAL) of a ROS1 or ROS2 level or level name.
+    """
+    if isinstance(level, str):
+        return _level_names.get(level.strip().upper(), 0)
+    try:
+        level = int(level)
+    except (ValueError, TypeError):
+        return 0
+    return _ros1_levels.get(level, level)
+
+class LogFilter(object):
+    """
+    Filter of a client's subscription to a log topic, parsed from the "logFilter" it sends:
+        {"minLevel": 30 or "WARN", "nodes": ["/camera", ...], "text": "timeout", "regex": false,
+         "backfill": 30}
+    All criteria are optional; the default filter matches everything.
+    """
+
+    DEFAULT_BACKFILL = 30
+    MAX_BACKFILL = 1000
+
+    def __init__(self, spec = None):
+        spec = spec if type(spec) is dict else {}
+        self.min_level = normalize_level(spec.get("minLevel", 0))
+        nodes = spec.get("nodes")
+        self.nodes = set(str(node) for node in nodes) if type(nodes) is list and nodes else None
+        self.text = str(spec.get("text") or "")
+        self.pattern = None
+        if self.text and spec.get("regex"):
+            try:
+                self.pattern = re.compile(self.text, re.I)
+            except re.error:
+                self.pattern = None
+        try:
+            self.backfill = min(max(int(spec.get("backfill", self.DEFAULT_BACKFILL)), 0), self.MAX_BACKFILL)
+        except (ValueError, TypeError):
+            self.backfill = self.DEFAULT_BACKFILL
+
+    def matches(self, entry):
+        if entry["_level"] < self.min_level:
+            return False
+        if self.nodes is not None and entry.get("name") not in self.nodes:
+            return False
+        if self.pattern is not None:
+            return self.pattern.search(entry.get("msg", "")) is not None
+        if self.text:
+            return self.text.lower() in entry.get("msg", "").lower()
+        return True
+
+class LogBuffer(object):
+    """
+    Ring buffer of the latest log entries (dict-ified Log messages) of a topic, indexed by node
+    name and by level so that filtered queries don't have to scan every DEBUG line. Safe to
+    append to from ROS threads while the IOLoop queries it.
+    """
+
+    def __init__(self, capacity = 5000):
+        self.entries = collections.deque()
+        self.capacity = capacity
+        self.by_node = {} # node name -> deque of entries, oldest first
+        self.by_level = {} # level -> deque of entries, oldest first
+        self.seq = 0
+        self.lock = threading.Lock()
+
+    def append(self, entry):
+        """
+        Adds a log entry, evicting the oldest one if full. Sets its "_level" (normalized) and
+        "_seq" (order of arrival).
+        """
+        entry["_level"] = normalize_level(entry.get("level", 0))
+        with self.lock:
+            self.seq += 1
+            entry["_seq"] = self.seq
+            if len(self.entries) >= self.capacity:
+                evicted = self.entries.popleft()
+                # evicted is the oldest entry overall, hence also the oldest of its indexes
+                self.by_node[evicted.get("name")].popleft()
+                if not self.by_node[evicted.get("name")]:
+                    del self.by_node[evicted.get("name")]
+                self.by_level[evicted["_level"]].popleft()
+            self.entries.append(entry)
+            self.by_node.setdefault(entry.get("name"), collections.deque()).append(entry)
+            self.by_level.setdefault(entry["_level"], collections.deque()).append(entry)
+
+    def nodes(self):
+        with self.lock:
+            return sorted(str(name) for name in self.by_node)
+
+    def query(self, log_filter, limit = None):
+        """
+        Returns the latest (up to limit, default log_filter.backfill) entries matching
+        log_filter, oldest first.
+        """
+        limit = log_filter.backfill if limit is None else limit
+        if limit <= 0:
+            return []
+
+        with self.lock:
+            # scan the smallest candidate set the indexes give
+            if log_filter.nodes is not None:
+                candidates = [self.by_node.get(node, ()) for node in log_filter.nodes]
+            elif log_filter.min_level > 0:
+                candidates = [entries for level, entries in self.by_level.items() if level >= log_filter.min_level]
+            else:
+                candidates = [self.entries]
+
+            result = []
+            for entries in candidates:
+                count = 0
+                for entry in reversed(entries):
+                    if log_filter.matches(entry):
+                        result.append(entry)
+                        count += 1
+                        if count >= limit:
+                            break
+
+        result.sort(key = lambda entry: entry["_seq"])
+        return result[-limit:]
@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+
+"""
+Minimal Prometheus metrics (counters, gauges, histograms with labels) of rosboard's own
+work, exposed in the Prometheus text format at /metrics by MetricsHandler. Self-contained so
+that it doesn't add a dependency; recording a value is a dict lookup and an addition.
+"""
+
+import math
+import threading
+import time
+
+# latency buckets (seconds), from 100 us to 2.5 s
+DEFAULT_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+
+registry = []
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _format_value(value):
+    if value == math.inf:
+        return "+Inf"
+    if isinstance(value, float) and value.is_integer() and abs(value) < 1e15:
+        return str(int(value))
+    return repr(value) if isinstance(value, float) else str(value)
+
+def _format_labels(names, values, extra = ()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join('%s="%s"' % (name, _escape(value)) for name, value in pairs) + "}"
+
+class Metric(object):
+    kind = None
+
+    def __init__(self, name, documentation, labelnames = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.values = {} # label values tuple -> value
+        self.lock = threading.Lock()
+        registry.append(self)
+
+    def remove(self, *labelvalues):
+        with self.lock:
+            self.values.pop(tuple(str(value) for value in labelvalues), None)
+
+    def samples(self):
+        """
+        Returns [(suffix, label values, extra labels, value)] to expose.
+        """
+        with self.lock:
+            return [("", labels, (), value) for labels, value in self.values.items()]
+
+    def expose(self):
+        lines = ["# HELP %s %s" % (self.name, self.documentation), "# TYPE %s %s" % (self.name, self.kind)]
+        for suffix, labels, extra, value in self.samples():
+            lines.append("%s%s%s %s" % (self.name, suffix, _format_labels(self.labelnames, labels, extra), _format_value(value)))
+        return "\n".join(lines)
+
+class Counter(Metric):
+    kind = "counter"
+
+    def inc(self, *labelvalues, amount = 1):
+        key = tuple(str(value) for value in labelvalues)
+        with self.lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+class Gauge(Metric):
+    """
+    Gauge whose values are either set, or read when scraped from collect(), a function
+    returning {label values tuple: value}.
+    """
+    kind = "gauge"
+
+    def __init__(self, name, documentation, labelnames = (), collect = None):
+        super().__init__(name, documentation, labelnames)
+        self.collect = collect
+
+    def set(self, value, *labelvalues):
+        with self.lock:
+            self.values[tuple(str(v) for v in labelvalues)] = value
+
+    def samples(self):
+        if self.collect is None:
+            return super().samples()
+        try:
+            values = self.collect()
+        except Exception:
+            values = {}
+        return [("", tuple(str(v) for v in labels), (), value) for labels, value in values.items()]
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labelnames = (), buckets = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(buckets) + (math.inf,)
+
+    def observe(self, value, *labelvalues):
+        key = tuple(str(v) for v in labelvalues)
+        with self.lock:
+            counts = self.values.get(key)
+            if counts is None:
+                # per-bucket (non-cumulative) counts, then the sum
+                counts = self.values[key] = [0] * len(self.buckets) + [0.0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[i] += 1
+                    break
+            counts[-1] += value
+
+    def samples(self):
+        samples = []
+        with self.lock:
+            for labels, counts in self.values.items():
+                cumulative = 0
+                for bound, count in zip(self.buckets, counts):
+                    cumulative += count
+                    samples.append(("_bucket", labels, (("le", _format_value(float(bound))),), cumulative))
+                samples.append(("_sum", labels, (), counts[-1]))
+                samples.append(("_count", labels, (), cumulative))
+        return samples
+
+def timed(span):
+    """
+    Decorator recording the duration of every call of a function in SPAN_SECONDS.
+    """
+    def decorator(function):
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                SPAN_SECONDS.observe(time.perf_counter() - start, span)
+        wrapper.__name__ = function.__name__
+        wrapper.__doc__ = function.__doc__
+        wrapper.__wrapped__ = function
+        return wrapper
+    return decorator
+
+def expose():
+    """
+    Returns all the metrics in the Prometheus text exposition format.
+    """
+    return "\n".join(metric.expose() for metric in registry) + "\n"
+
+# ---------- rosboard's metrics ----------
+
+SERIALIZE_SECONDS = Histogram("rosboard_serialize_seconds",
+    "Time to convert a ROS message into a dict (ros2dict), including image compression.", ["type"])
+DESERIALIZE_SECONDS = Histogram("rosboard_deserialize_seconds",
+    "Time to deserialize a message received serialized, after throttling.", ["type"])
+ENCODE_SECONDS = Histogram("rosboard_encode_seconds",
+    "Time to encode a message to JSON for the websockets.", ["type"])
+THROTTLED_MESSAGES = Counter("rosboard_throttled_messages_total",
+    "Messages dropped by throttling, by the node (fastest client rate) or per socket.", ["topic", "stage"])
+SOCKET_SENT_BYTES = Counter("rosboard_socket_sent_bytes_total",
+    "Bytes written to each websocket.", ["socket", "client"])
+SOCKET_SENT_FRAMES = Counter("rosboard_socket_sent_frames_total",
+    "Messages written to each websocket.", ["socket", "client"])
+SYNC_SUBS_SECONDS = Histogram("rosboard_sync_subs_seconds",
+    "Duration of sync_subs (topic discovery and subscriber updates).",
+    buckets = (0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0))
+SPAN_SECONDS = Histogram("rosboard_span_seconds",
+    "Time spent in the hot paths of message handling: on_ros_msg, broadcast and each compress_* function "
+    "(ros2dict is rosboard_serialize_seconds).", ["span"])
+IOLOOP_CALLBACK_DELAY_SECONDS = Histogram("rosboard_ioloop_callback_delay_seconds",
+    "Delay between add_callback from another thread and the callback running on the IOLoop, sampled every 5 s.")
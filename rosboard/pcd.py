@@ -0,0 +1,674 @@
+#!/usr/bin/env python3
+
+"""
+Helpers for reading PCD (Point Cloud Library) map files on the server side, and for
+building cached, voxel-decimated level-of-detail (LOD) versions of them that the
+Multi3DViewer can load quickly before fetching the full map.
+"""
+
+import io
+import itertools
+import json
+import os
+import shutil
+import tempfile
+import numpy as np
+
+try:
+    import lzf
+except ImportError:
+    lzf = None
+
+# maximum number of points at each level of detail (coarsest first)
+LOD_POINT_TARGETS = (100000, 1000000)
+
+# number of points processed at once when streaming through a file
+CHUNK_POINTS = 4000000
+
+# number of lines of an ascii PCD file parsed at once
+ASCII_CHUNK_LINES = 200000
+
+# binary_compressed files are decompressed as a whole; without the lzf module (pip3 install
+# python-lzf) the pure python fallback is too slow for larger ones, so they are refused
+PURE_LZF_MAX_BYTES = 64 << 20
+
+_PCD_TYPES = {
+    ("F", 4): np.float32,
+    ("F", 8): np.float64,
+    ("I", 1): np.int8,
+    ("I", 2): np.int16,
+    ("I", 4): np.int32,
+    ("I", 8): np.int64,
+    ("U", 1): np.uint8,
+    ("U", 2): np.uint16,
+    ("U", 4): np.uint32,
+    ("U", 8): np.uint64,
+}
+
+def read_header(path):
+    """
+    Parses the ASCII header of a PCD file.
+
+    Returns a dict with keys fields, size, type, count, width, height, points, data
+    ("ascii", "binary" or "binary_compressed") and header_length (byte offset of the data).
+    Raises ValueError if the file is not a valid PCD file.
+    """
+    header = {}
+    with open(path, "rb") as f:
+        header_length = 0
+        while True:
+            line = f.readline(4096)
+            if not line:
+                raise ValueError("%s: no DATA line in PCD header" % path)
+            header_length += len(line)
+            tokens = line.decode("ascii", errors = "replace").strip().split()
+            if not tokens or tokens[0].startswith("#"):
+                continue
+            key, values = tokens[0].lower(), tokens[1:]
+            header[key] = values
+            if key == "data":
+                break
+            if header_length > 65536:
+                raise ValueError("%s: PCD header too long" % path)
+
+    try:
+        fields = header["fields"]
+        result = {
+            "fields": fields,
+            "size": [int(x) for x in header.get("size", ["4"] * len(fields))],
+            "type": [x.upper() for x in header.get("type", ["F"] * len(fields))],
+            "count": [int(x) for x in header.get("count", ["1"] * len(fields))],
+            "width": int(header.get("width", ["0"])[0]),
+            "height": int(header.get("height", ["1"])[0]),
+            "data": header["data"][0].lower(),
+            "header_length": header_length,
+        }
+        result["points"] = int(header.get("points", [str(result["width"] * result["height"])])[0])
+    except (KeyError, IndexError, ValueError) as e:
+        raise ValueError("%s: invalid PCD header (%s)" % (path, str(e)))
+
+    if result["data"] not in ("ascii", "binary", "binary_compressed"):
+        raise ValueError("%s: unsupported PCD DATA type %s" % (path, result["data"]))
+
+    return result
+
+def _numpy_dtype(header):
+    """
+    Builds the structured numpy dtype of one point as laid out in a binary PCD file.
+    """
+    dtype = []
+    for i, (name, size, type_, count) in enumerate(zip(header["fields"], header["size"], header["type"], header["count"])):
+        base = _PCD_TYPES.get((type_, size), np.uint8 if size == 1 else None)
+        if base is None:
+            raise ValueError("unsupported PCD field %s of type %s%d" % (name, type_, size))
+        name = name if name != "_" else "_padding_%d" % i
+        dtype.append((name, base) if count == 1 else (name, base, (count,)))
+    return np.dtype(dtype)
+
+def lzf_decompress(data, expected_size):
+    """
+    Decompresses an LZF block, using the lzf module if available and a pure python
+    implementation otherwise. Raises ValueError if the data is corrupt.
+    """
+    if lzf is not None:
+        out = lzf.decompress(bytes(data), expected_size)
+        if out is None:
+            raise ValueError("corrupt LZF data")
+        return out
+
+    data = memoryview(data)
+    out = bytearray(expected_size)
+    i = o = 0
+    while i < len(data):
+        ctrl = data[i]
+        i += 1
+        if ctrl < 32:
+            # literal run of ctrl + 1 bytes
+            length = ctrl + 1
+            if i + length > len(data) or o + length > expected_size:
+                raise ValueError("corrupt LZF data")
+            out[o:o + length] = data[i:i + length]
+            i += length
+            o += length
+        else:
+            # back reference of length + 2 bytes
+            length = ctrl >> 5
+            if length == 7:
+                if i >= len(data):
+                    raise ValueError("corrupt LZF data")
+                length += data[i]
+                i += 1
+            if i >= len(data):
+                raise ValueError("corrupt LZF data")
+            ref = o - ((ctrl & 0x1f) << 8) - data[i] - 1
+            i += 1
+            length += 2
+            if ref < 0 or o + length > expected_size:
+                raise ValueError("corrupt LZF data")
+            if o - ref >= length:
+                out[o:o + length] = out[ref:ref + length]
+            else:
+                # overlapping: the reference repeats the last o - ref bytes
+                for k in range(length):
+                    out[o + k] = out[ref + k]
+            o += length
+    if o != expected_size:
+        raise ValueError("corrupt LZF data")
+    return bytes(out)
+
+def iter_xyz(path, header = None, chunk_points = CHUNK_POINTS):
+    """
+    Yields the x, y, z coordinates of a PCD file as (n, 3) float32 arrays, chunk by chunk,
+    skipping points with NaN/Inf coordinates. Binary files are read chunk by chunk so that
+    arbitrarily large maps can be processed without loading them into memory.
+    """
+    header = header or read_header(path)
+    fields = header["fields"]
+    if "x" not in fields or "y" not in fields:
+        raise ValueError("%s: PCD file must contain x and y fields" % path)
+    axes = ("x", "y", "z") if "z" in fields else ("x", "y")
+
+    def finish(columns):
+        xyz = np.zeros((len(columns[0]), 3), dtype = np.float32)
+        for i, column in enumerate(columns):
+            xyz[:, i] = column
+        return xyz[np.isfinite(xyz).all(axis = 1)]
+
+    if header["data"] == "binary":
+        dtype = _numpy_dtype(header)
+        count = min(header["points"], (os.path.getsize(path) - header["header_length"]) // dtype.itemsize)
+        if count <= 0:
+            return
+        # read chunk by chunk rather than memory-mapped, so that the pages of the map that were
+        # read don't stay resident in rosboard's process
+        with open(path, "rb") as f:
+            f.seek(header["header_length"])
+            for start in range(0, count, chunk_points):
+                chunk = np.fromfile(f, dtype = dtype, count = min(chunk_points, count - start))
+                yield finish([chunk[axis] for axis in axes])
+
+    elif header["data"] == "binary_compressed":
+        # compressed size, uncompressed size, then LZF-compressed fields stored one after the other
+        dtype = _numpy_dtype(header)
+        with open(path, "rb") as f:
+            f.seek(header["header_length"])
+            sizes = f.read(8)
+            if len(sizes) < 8:
+                raise ValueError("%s: truncated PCD data" % path)
+            compressed_size, uncompressed_size = (int(x) for x in np.frombuffer(sizes, dtype = "<u4"))
+            if uncompressed_size < dtype.itemsize * header["points"]:
+                raise ValueError("%s: PCD data smaller than its %d points" % (path, header["points"]))
+            if lzf is None and uncompressed_size > PURE_LZF_MAX_BYTES:
+                raise ValueError("%s: binary_compressed PCD files over %d MB need the lzf module "
+                    "(sudo pip3 install python-lzf)" % (path, PURE_LZF_MAX_BYTES >> 20))
+            try:
+                raw = lzf_decompress(f.read(compressed_size), uncompressed_size)
+            except ValueError as e:
+                raise ValueError("%s: %s" % (path, str(e)))
+        count = header["points"]
+        columns = {}
+        offset = 0
+        for name in dtype.names:
+            field_dtype = dtype.fields[name][0]
+            nbytes = field_dtype.itemsize * count
+            columns[name] = np.frombuffer(raw, dtype = field_dtype.base, count = count * max(1, int(np.prod(field_dtype.shape))), offset = offset)
+            offset += nbytes
+        for start in range(0, count, chunk_points):
+            yield finish([columns[axis][start:start + chunk_points] for axis in axes])
+
+    else:
+        # a field with COUNT n takes n columns
+        columns = np.concatenate(([0], np.cumsum(header["count"])))
+        usecols = [int(columns[fields.index(axis)]) for axis in axes]
+        with open(path, "rb") as f:
+            f.seek(header["header_length"])
+            lines = io.TextIOWrapper(f, encoding = "ascii", errors = "replace")
+            while True:
+                batch = list(itertools.islice(lines, min(chunk_points, ASCII_CHUNK_LINES)))
+                if not batch:
+                    break
+                data = np.loadtxt([line for line in batch if line.strip()], dtype = np.float32, usecols = usecols, ndmin = 2)
+                if len(data):
+                    yield finish([data[:, i] for i in range(len(axes))])
+
+def _voxel_keys(xyz, voxel_size):
+    """
+    Packs the integer voxel coordinates of each point into one int64 key (21 bits per axis).
+    """
+    ijk = np.floor(xyz / voxel_size).astype(np.int64) + (1 << 20)
+    np.clip(ijk, 0, (1 << 21) - 1, out = ijk)
+    return (ijk[:, 0] << 42) | (ijk[:, 1] << 21) | ijk[:, 2]
+
+def voxel_decimate(xyz, voxel_size):
+    """
+    Keeps one point (the first one) per occupied voxel of the given size.
+    """
+    _, index = np.unique(_voxel_keys(xyz, voxel_size), return_index = True)
+    return xyz[np.sort(index)]
+
+def voxel_size_for_count(sample, target_count):
+    """
+    Estimates, from a uniform sample of the map, the voxel size at which the map
+    decimates to about target_count points.
+    """
+    if len(sample) <= target_count:
+        return 1e-3
+    origin = sample.min(axis = 0)
+    extent = max(float(np.max(sample.max(axis = 0) - origin)), 1e-3)
+
+    # count occupied voxels on an octree-like pyramid of grids, halving the resolution each
+    # step, until the count drops under the target
+    def occupied(ijk):
+        _, index = np.unique((ijk[:, 0] << 42) | (ijk[:, 1] << 21) | ijk[:, 2], return_index = True)
+        return ijk[index]
+
+    # start at a resolution where a mapped surface has a few times the target number of
+    # voxels, going finer for sparser (e.g. linear) maps
+    resolution = 2 << int(np.ceil(np.log2(np.sqrt(target_count))))
+    while True:
+        voxel_size = extent / resolution
+        ijk = occupied(((sample - origin) / voxel_size).astype(np.int64))
+        count = len(ijk)
+        if count > target_count or resolution >= (1 << 20):
+            break
+        resolution <<= 2
+
+    while True:
+        coarser = occupied(ijk >> 1)
+        if len(coarser) <= target_count:
+            break
+        ijk, count, voxel_size = coarser, len(coarser), voxel_size * 2
+
+    # interpolate between the last two levels in log space
+    if count > len(coarser):
+        voxel_size *= 2 ** (np.log(count / target_count) / np.log(count / len(coarser)))
+    return voxel_size
+
+def write_xyz_pcd(path, xyz):
+    """
+    Atomically writes an (n, 3) float32 array as a binary PCD file with fields x y z.
+    """
+    xyz = np.ascontiguousarray(xyz, dtype = "<f4")
+    header = (
+        "# .PCD v0.7 - Point Cloud Data file format\n"
+        "VERSION 0.7\nFIELDS x y z\nSIZE 4 4 4\nTYPE F F F\nCOUNT 1 1 1\n"
+        "WIDTH %d\nHEIGHT 1\nVIEWPOINT 0 0 0 1 0 0 0\nPOINTS %d\nDATA binary\n" % (len(xyz), len(xyz))
+    )
+    fd, tmp_path = tempfile.mkstemp(dir = os.path.dirname(path), suffix = ".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(header.encode("ascii"))
+            f.write(xyz.tobytes())
+        os.replace(tmp_path, path)
+    except Exception:
+        os.unlink(tmp_path)
+        raise
+
+def cache_dir_for(pcd_path):
+    """
+    Returns a writable directory for derived files of pcd_path: a .rosboard_cache directory
+    next to the map if possible, otherwise ~/.cache/rosboard/pcd.
+    """
+    for cache_dir in (
+        os.path.join(os.path.dirname(os.path.realpath(pcd_path)), ".rosboard_cache"),
+        os.path.join(os.path.expanduser("~"), ".cache", "rosboard", "pcd"),
+    ):
+        try:
+            os.makedirs(cache_dir, exist_ok = True)
+            if os.access(cache_dir, os.W_OK):
+                return cache_dir
+        except OSError:
+            continue
+    raise OSError("no writable cache directory for %s" % pcd_path)
+
+def lod_path(pcd_path, level):
+    name = os.path.splitext(os.path.basename(pcd_path))[0]
+    return os.path.join(cache_dir_for(pcd_path), "%s.lod%d.pcd" % (name, level))
+
+def build_lod(pcd_path, level):
+    """
+    Returns the path of the cached level-of-detail file of pcd_path, building it first if it
+    doesn't exist or is older than the map. Level 0 is the coarsest (LOD_POINT_TARGETS[0] points).
+    Intended to be run in an executor since it may take a while for large maps.
+    """
+    if level < 0 or level >= len(LOD_POINT_TARGETS):
+        raise ValueError("invalid level of detail %d" % level)
+
+    path = lod_path(pcd_path, level)
+    if os.path.exists(path) and os.path.getmtime(path) >= os.path.getmtime(pcd_path):
+        return path
+
+    header = read_header(pcd_path)
+    target_count = LOD_POINT_TARGETS[level]
+
+    # estimate the voxel size from an evenly spaced sample of about 2M points
+    sample_step = max(1, header["points"] // 2000000)
+    sample = np.concatenate([chunk[::sample_step] for chunk in iter_xyz(pcd_path, header)] or [np.zeros((0, 3), np.float32)])
+    if header["points"] <= target_count:
+        write_xyz_pcd(path, sample if sample_step == 1 else np.concatenate(list(iter_xyz(pcd_path, header))))
+        return path
+    voxel_size = voxel_size_for_count(sample, target_count)
+    del sample
+
+    # decimate chunk by chunk, then merge the survivors of all chunks
+    survivors = [voxel_decimate(chunk, voxel_size) for chunk in iter_xyz(pcd_path, header)]
+    xyz = voxel_decimate(np.concatenate(survivors), voxel_size) if survivors else np.zeros((0, 3), np.float32)
+    write_xyz_pcd(path, xyz)
+    return path
+
+# maximum number of points stored in one octree node
+OCTREE_NODE_POINTS = 20000
+
+# each octree node keeps at most one point per cell of an OCTREE_GRID ** 3 grid over its cube
+OCTREE_GRID = 128
+
+OCTREE_MAX_DEPTH = 16
+
+# nodes with more points than this are built from temporary files next to the cache, streaming
+# through them chunk by chunk, so that memory use doesn't grow with the size of the map
+OCTREE_IN_MEMORY_POINTS = 2000000
+
+def octree_paths(pcd_path):
+    """
+    Returns the (index, data) paths of the cached octree of pcd_path.
+    """
+    name = os.path.splitext(os.path.basename(pcd_path))[0]
+    cache_dir = cache_dir_for(pcd_path)
+    return os.path.join(cache_dir, "%s.octree.json" % name), os.path.join(cache_dir, "%s.octree.bin" % name)
+
+def _grid_keys(points, origin, node_size):
+    """
+    Returns the index of the OCTREE_GRID ** 3 grid cell of the node that each point falls in.
+    """
+    cell = node_size / OCTREE_GRID
+    ijk = np.clip(((points - origin) / cell).astype(np.int64), 0, OCTREE_GRID - 1)
+    return (ijk[:, 0] << 14) | (ijk[:, 1] << 7) | ijk[:, 2]
+
+def _subsample(index):
+    """
+    Given the index of the first point of every occupied cell, in cell order, returns the
+    sorted indexes of the points the node keeps (at most OCTREE_NODE_POINTS).
+    """
+    if len(index) > OCTREE_NODE_POINTS:
+        index = index[np.random.default_rng(0).permutation(len(index))[:OCTREE_NODE_POINTS]]
+    return np.sort(index)
+
+def _octants(points, origin, half):
+    return (((points[:, 0] >= origin[0] + half).astype(np.int64) << 2)
+        | ((points[:, 1] >= origin[1] + half).astype(np.int64) << 1)
+        | (points[:, 2] >= origin[2] + half).astype(np.int64))
+
+def _child_origin(origin, half, child):
+    return origin + half * np.array(((child >> 2) & 1, (child >> 1) & 1, child & 1))
+
+def _read_xyz_chunks(path, chunk_points = OCTREE_IN_MEMORY_POINTS):
+    """
+    Yields the points of a temporary file of float32 x, y, z coordinates, chunk by chunk.
+    """
+    with open(path, "rb") as f:
+        while True:
+            chunk = np.fromfile(f, dtype = "<f4", count = chunk_points * 3)
+            if not len(chunk):
+                return
+            yield chunk.reshape((-1, 3))
+
+def build_octree(pcd_path):
+    """
+    Returns the index path of the cached octree of pcd_path, building it first if it doesn't
+    exist or is older than the map.
+
+    The octree is laid out like Potree's: node "r" is the root cube around the map, and the
+    ID of a child is its parent's ID followed by a digit 0-7 ((x >= mid) << 2 | (y >= mid) << 1 | (z >= mid)).
+    Every node holds a grid-subsampled share of the points of its cube (at most one point per
+    cell of an OCTREE_GRID ** 3 grid) and hands the remaining points down to its children,
+    so rendering a node together with all its ancestors gives a uniform density that
+    increases with depth.
+
+    The data file holds the float32 x, y, z coordinates of every node one after the other, and
+    the JSON index maps node IDs to [offset, count] in points. Intended to be run in an executor.
+    Nodes of more than OCTREE_IN_MEMORY_POINTS points are split out of core, through temporary
+    files of their points (up to 12 bytes per point of the map in total), so memory use is
+    bounded whatever the size of the map.
+    """
+    index_path, data_path = octree_paths(pcd_path)
+    if os.path.exists(index_path) and os.path.getmtime(index_path) >= os.path.getmtime(pcd_path):
+        return index_path
+
+    nodes = {}
+    work_dir = tempfile.mkdtemp(dir = os.path.dirname(data_path), suffix = ".tmp")
+    fd, tmp_data_path = tempfile.mkstemp(dir = os.path.dirname(data_path), suffix = ".tmp")
+    try:
+        # copy the coordinates of the map to a temporary file, measuring its bounding box
+        root_path = os.path.join(work_dir, "r")
+        point_count = 0
+        bbox_min, bbox_max = np.full(3, np.inf, np.float32), np.full(3, -np.inf, np.float32)
+        with open(root_path, "wb") as f:
+            for xyz in iter_xyz(pcd_path, chunk_points = OCTREE_IN_MEMORY_POINTS):
+                if len(xyz):
+                    np.ascontiguousarray(xyz, dtype = "<f4").tofile(f)
+                    point_count += len(xyz)
+                    bbox_min = np.minimum(bbox_min, xyz.min(axis = 0))
+                    bbox_max = np.maximum(bbox_max, xyz.max(axis = 0))
+        if not point_count:
+            bbox_min = bbox_max = np.zeros(3, np.float32)
+        size = max(float(np.max(bbox_max - bbox_min)), 1e-3) * 1.0001
+
+        with os.fdopen(fd, "wb") as f:
+            # depth-first, so that the data of a subtree is contiguous. the points of a node are
+            # either an array or, for large nodes, a (path, count) temporary file
+            stack = [("r", (root_path, point_count), bbox_min.astype(np.float64), size)]
+            offset = 0
+            while stack:
+                node_id, points, origin, node_size = stack.pop()
+                depth = len(node_id) - 1
+                half = node_size / 2
+
+                if not isinstance(points, np.ndarray) and points[1] <= max(OCTREE_IN_MEMORY_POINTS, OCTREE_NODE_POINTS):
+                    path = points[0]
+                    points = np.fromfile(path, dtype = "<f4").reshape((-1, 3))
+                    os.unlink(path)
+
+                if isinstance(points, np.ndarray):
+                    if len(points) <= OCTREE_NODE_POINTS or depth >= OCTREE_MAX_DEPTH:
+                        kept, rest = points, points[:0]
+                    else:
+                        _, index = np.unique(_grid_keys(points, origin, node_size), return_index = True)
+                        index = _subsample(index)
+                        mask = np.ones(len(points), dtype = bool)
+                        mask[index] = False
+                        kept, rest = points[index], points[mask]
+
+                    f.write(np.ascontiguousarray(kept, dtype = "<f4").tobytes())
+                    nodes[node_id] = [offset, len(kept)]
+                    offset += len(kept)
+
+                    if len(rest):
+                        octant = _octants(rest, origin, half)
+                        order = np.argsort(octant, kind = "stable")
+                        bounds = np.concatenate(([0], np.cumsum(np.bincount(octant, minlength = 8))))
+                        for child in range(7, -1, -1):
+                            if bounds[child + 1] > bounds[child]:
+                                stack.append((node_id + str(child), rest[order[bounds[child]:bounds[child + 1]]],
+                                    _child_origin(origin, half, child), half))
+                    del points, kept, rest
+                    continue
+
+                path, count = points
+                if depth >= OCTREE_MAX_DEPTH:
+                    # (near) duplicate points that no subdivision separates: keep them all
+                    for chunk in _read_xyz_chunks(path):
+                        f.write(chunk.tobytes())
+                    nodes[node_id] = [offset, count]
+                    offset += count
+                    os.unlink(path)
+                    continue
+
+                # first pass: the first point of every occupied grid cell, as in np.unique
+                first = np.full(OCTREE_GRID ** 3, -1, dtype = np.int64)
+                start = 0
+                for chunk in _read_xyz_chunks(path):
+                    keys, index = np.unique(_grid_keys(chunk, origin, node_size), return_index = True)
+                    new = first[keys] < 0
+                    first[keys[new]] = start + index[new]
+                    start += len(chunk)
+                kept_index = _subsample(first[first >= 0])
+                del first
+
+                # second pass: write the kept points, and hand the rest to the children's files
+                child_paths = [os.path.join(work_dir, node_id + str(child)) for child in range(8)]
+                child_counts = [0] * 8
+                child_files = [open(child_path, "wb") for child_path in child_paths]
+                try:
+                    start = 0
+                    for chunk in _read_xyz_chunks(path):
+                        lo, hi = np.searchsorted(kept_index, (start, start + len(chunk)))
+                        local = kept_index[lo:hi] - start
+                        f.write(chunk[local].tobytes())
+                        mask = np.ones(len(chunk), dtype = bool)
+                        mask[local] = False
+                        rest = chunk[mask]
+                        octant = _octants(rest, origin, half)
+                        for child in range(8):
+                            child_points = rest[octant == child]
+                            if len(child_points):
+                                child_files[child].write(child_points.tobytes())
+                                child_counts[child] += len(child_points)
+                        start += len(chunk)
+                finally:
+                    for child_file in child_files:
+                        child_file.close()
+                os.unlink(path)
+
+                nodes[node_id] = [offset, len(kept_index)]
+                offset += len(kept_index)
+                for child in range(7, -1, -1):
+                    if child_counts[child]:
+                        stack.append((node_id + str(child), (child_paths[child], child_counts[child]),
+                            _child_origin(origin, half, child), half))
+                    else:
+                        os.unlink(child_paths[child])
+        os.replace(tmp_data_path, data_path)
+    except Exception:
+        os.unlink(tmp_data_path)
+        raise
+    finally:
+        shutil.rmtree(work_dir, ignore_errors = True)
+
+    index = {
+        "version": 1,
+        "points": int(point_count),
+        "min": [float(v) for v in bbox_min],
+        "max": [float(v) for v in bbox_max],
+        "size": size,
+        "grid": OCTREE_GRID,
+        "nodes": nodes,
+    }
+    fd, tmp_index_path = tempfile.mkstemp(dir = os.path.dirname(index_path), suffix = ".tmp")
+    with os.fdopen(fd, "w") as f:
+        json.dump(index, f, separators = (",", ":"))
+    os.replace(tmp_index_path, index_path)
+    return index_path
+
+# absolute path -> metadata of PCD files (see file_metadata), persisted per directory
+_catalog = {}
+
+# directories whose persisted catalogue has been read
+_catalog_dirs = set()
+
+def _catalog_path(directory):
+    return os.path.join(cache_dir_for(os.path.join(directory, "catalog")), "catalog.json")
+
+def octree_bbox(path, mtime):
+    """
+    Returns the bounding box of the points of path from its octree index, or None if there's
+    no index as recent as mtime or the map is empty.
+    """
+    try:
+        index_path, _ = octree_paths(path)
+        if os.path.exists(index_path) and os.path.getmtime(index_path) >= mtime:
+            with open(index_path, "r") as f:
+                index = json.load(f)
+            if index["points"] > 0:
+                return {"min": index["min"], "max": index["max"]}
+    except (OSError, ValueError, KeyError):
+        pass
+    return None
+
+def file_bbox(path):
+    """
+    Returns the bounding box of the points of a PCD file ({"min": [x, y, z], "max": [x, y, z]},
+    or None if it has no valid points), from the octree index if there is an up to date one,
+    otherwise with a pass over the data. Intended to be run in an executor.
+    """
+    bbox = octree_bbox(path, os.path.getmtime(path))
+    if bbox is not None:
+        return bbox
+
+    bbox_min, bbox_max = np.full(3, np.inf), np.full(3, -np.inf)
+    for xyz in iter_xyz(path):
+        if len(xyz):
+            bbox_min = np.minimum(bbox_min, xyz.min(axis = 0))
+            bbox_max = np.maximum(bbox_max, xyz.max(axis = 0))
+    if not np.all(np.isfinite(bbox_min)):
+        return None
+    return {"min": [float(v) for v in bbox_min], "max": [float(v) for v in bbox_max]}
+
+def file_metadata(path, stat_result = None):
+    """
+    Returns the metadata of a PCD file: name, size and mtime of the file, point count, width,
+    height, fields and data type ("ascii", "binary" or "binary_compressed") from the header,
+    and the bounding box of its points if it's known from the octree index (see file_bbox).
+    Only reads the header; if the bounding box still has to be computed, it is None and
+    bbox_pending is True.
+    """
+    stat_result = stat_result or os.stat(path)
+    header = read_header(path)
+    bbox = octree_bbox(path, stat_result.st_mtime)
+
+    return {
+        "name": os.path.basename(path),
+        "size": stat_result.st_size,
+        "mtime": stat_result.st_mtime,
+        "points": header["points"],
+        "width": header["width"],
+        "height": header["height"],
+        "fields": header["fields"],
+        "data": header["data"],
+        "bbox": bbox,
+        "bbox_pending": bbox is None and header["points"] > 0,
+    }
+
+def cached_metadata(path, stat_result):
+    """
+    Returns the catalogued metadata of path if it is still valid for the given os.stat result,
+    or None if the file is new or has changed since it was catalogued.
+    """
+    directory = os.path.dirname(path)
+    if directory not in _catalog_dirs:
+        _catalog_dirs.add(directory)
+        try:
+            with open(_catalog_path(directory), "r") as f:
+                for name, entry in json.load(f).items():
+                    _catalog.setdefault(os.path.join(directory, name), entry)
+        except (OSError, ValueError):
+            pass
+
+    entry = _catalog.get(path)
+    if entry is None or entry.get("mtime") != stat_result.st_mtime or entry.get("size") != stat_result.st_size:
+        return None
+    return entry
+
+def store_metadata(path, entry):
+    _catalog[path] = entry
+
+def save_catalog(directory):
+    """
+    Atomically persists the catalogued metadata of the PCD files in directory.
+    """
+    entries = {os.path.basename(path): entry for path, entry in _catalog.items()
+        if os.path.dirname(path) == directory and os.path.exists(path)}
+    catalog_path = _catalog_path(directory)
+    fd, tmp_path = tempfile.mkstemp(dir = os.path.dirname(catalog_path), suffix = ".tmp")
+    with os.fdopen(fd, "w") as f:
+        json.dump(entries, f)
+    os.replace(tmp_path, catalog_path)
@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+
+"""
+In-process sampling profiler: samples the Python stacks of all threads (the ROS spin thread,
+the IOLoop, sync_subs, pingpong and subscriber threads) and returns them as collapsed stacks
+("thread;outer frame;...;inner frame count" per line), the input format of flamegraph.pl,
+speedscope and most flame graph viewers.
+"""
+
+import collections
+import os
+import sys
+import threading
+import time
+
+MAX_DURATION = 120.0
+
+lock = threading.Lock()
+
+def _frame_name(frame):
+    code = frame.f_code
+    return "%s (%s:%d)" % (code.co_name, os.path.basename(code.co_filename), frame.f_lineno)
+
+def sample(duration, interval = 0.005):
+    """
+    Samples the stacks of all threads but the calling one every interval seconds for duration
+    seconds. Blocks, so run it in an executor. Returns a collections.Counter of stack tuples
+    (thread name first, innermost frame last) -> number of samples.
+    """
+    duration = min(max(float(duration), 0.1), MAX_DURATION)
+    interval = min(max(float(interval), 0.001), 1.0)
+
+    stacks = collections.Counter()
+    own_id = threading.get_ident()
+    end_time = time.monotonic() + duration
+    while time.monotonic() < end_time:
+        names = {thread.ident: thread.name for thread in threading.enumerate()}
+        for thread_id, frame in sys._current_frames().items():
+            if thread_id == own_id:
+                continue
+            stack = []
+            while frame is not None:
+                stack.append(_frame_name(frame))
+                frame = frame.f_back
+            stack.append(names.get(thread_id, "thread-%d" % thread_id))
+            stacks[tuple(reversed(stack))] += 1
+        time.sleep(interval)
+    return stacks
+
+def collapsed(stacks):
+    """
+    Formats sampled stacks as collapsed stack text.
+    """
+    return "".join("%s %d\n" % (";".join(frame.replace(";", ":") for frame in stack), count)
+        for stack, count in sorted(stacks.items()))
@@ -1,7 +1,6 @@
 #!/usr/bin/env python3
 
 import asyncio
-import importlib
 import os
 import socket
 import threading
@@ -9,33 +8,65 @@ import time
 import tornado, tornado.web, tornado.websocket
 import traceback
 
-if os.environ.get("ROS_VERSION") == "1":
-    import rospy # ROS1
-elif os.environ.get("ROS_VERSION") == "2":
-    import rosboard.rospy2 as rospy # ROS2
-    from rclpy.qos import HistoryPolicy, QoSProfile, QoSReliabilityPolicy, QoSDurabilityPolicy
-else:
-    print("ROS not detected. Please source your ROS environment\n(e.g. 'source /opt/ros/DISTRO/setup.bash')")
-    exit(1)
+from rosboard.backends import backend_name, load_backend, SerializedMessage
 
-from rosgraph_msgs.msg import Log
+if backend_name() is None:
+    print("ROS not detected. Please source your ROS environment\n(e.g. 'source /opt/ros/DISTRO/setup.bash'),\n"
+        "or set ROSBOARD_BACKEND=sim to run on simulated topics")
+    exit(1)
 
+from rosboard import depth
+from rosboard import metrics
+from rosboard.assets import AssetManifest
+from rosboard.configstore import ConfigStore
+from rosboard.logbuffer import LogBuffer, LOG_TYPES
+from rosboard.topicstats import TopicStats
 from rosboard.serialization import ros2dict
 from rosboard.subscribers.dmesg_subscriber import DMesgSubscriber
 from rosboard.subscribers.processes_subscriber import ProcessesSubscriber
-from rosboard.subscribers.system_stats_subscriber import SystemStatsSubscriber
+from rosboard.subscribers.system_stats_subscriber import SystemStatsSampler, SystemStatsSubscriber
 from rosboard.subscribers.dummy_subscriber import DummySubscriber
-from rosboard.handlers import ROSBoardSocketHandler, NoCacheStaticFileHandler, LayoutsListHandler, LayoutHandler
-from rosboard.handlers import RemotePcdFilesHandler, RemotePcdFileHandler
+from rosboard.subscribers.topic_stats_subscriber import TopicStatsSubscriber
+from rosboard.handlers import ROSBoardSocketHandler, StaticAssetHandler, ViewersManifestHandler, LayoutsListHandler, LayoutHandler
+from rosboard.handlers import MJPEGStreamHandler
+from rosboard.handlers import RemotePcdFilesHandler, RemotePcdFileHandler, RemotePcdOctreeHandler, REMOTE_PCD_DIR
 from rosboard.handlers import LocConfigsListHandler, LocConfigFileHandler
+from rosboard.handlers import MetricsHandler, ProfileHandler, MemoryHandler, TracemallocHandler, TopicStatsHandler
 
 class ROSBoardNode(object):
     instance = None
-    def __init__(self, node_name = "rosboard_node"):
+    def __init__(self, node_name = "rosboard_node", backend = None):
         self.__class__.instance = self
-        rospy.init_node(node_name)
-        self.port = rospy.get_param("~port", 8888)
-        self.title = rospy.get_param("~title", socket.gethostname())
+
+        # middleware (ROS1, ROS2 or sim) that topics are discovered, subscribed and published through
+        self.backend = backend or load_backend()
+        backend = self.backend
+        backend.init_node(node_name)
+        self.port = backend.get_param("~port", 8888)
+        self.title = backend.get_param("~title", socket.gethostname())
+
+        # subscribe to messages serialized, and only deserialize those that aren't throttled
+        self.lazy_deserialization = backend.get_param("~lazy_deserialization", True)
+
+        # "live view" ingestion: queue only the newest message of each topic, so that rosboard
+        # shows fresh data rather than a backlog when it falls behind
+        self.latest_only = backend.get_param("~latest_only", True)
+
+        # token required by the debugging endpoints (/rosboard/api/debug/...); if empty, they only accept localhost
+        self.debug_token = backend.get_param("~debug_token", "")
+
+        # depth image rendering (16UC1, 32FC1 and compressedDepth topics)
+        depth.set_settings(
+            depth_min = backend.get_param("~depth_min", 0.2),
+            depth_max = backend.get_param("~depth_max", 10.0),
+            colormap = backend.get_param("~depth_colormap", "turbo"),
+        )
+
+        # sampling intervals (seconds) of _system_stats; the slow one is for disk usage and temperatures
+        SystemStatsSampler.get_instance().configure(
+            interval = backend.get_param("~system_stats_interval", 3.0),
+            slow_interval = backend.get_param("~system_stats_slow_interval", 15.0),
+        )
 
         # desired subscriptions of all the websockets connecting to this instance.
         # these remote subs are updated directly by "friend" class ROSBoardSocketHandler.
@@ -56,44 +87,94 @@ class ROSBoardNode(object):
         # dict of topic_name -> float (time in seconds)
         self.last_data_times_by_topic = {}
 
-        # publishers cache: topic_name -> rospy.Publisher
+        # receive rate, bandwidth and header stamp age of the subscribed topics
+        # dict of topic_name -> TopicStats
+        self.topic_stats = {}
+
+        # publishers cache: topic_name -> publisher of the backend
         self.local_pubs = {}
 
-        if rospy.__name__ == "rospy2":
-            # ros2 hack: need to subscribe to at least 1 topic
-            # before dynamic subscribing will work later.
-            # ros2 docs don't explain why but we need this magic.
-            self.sub_rosout = rospy.Subscriber("/rosout", Log, lambda x:x)
+        # latest log messages of the subscribed log topics, filtered per socket before sending
+        # dict of topic_name -> LogBuffer
+        self.log_buffers = {}
+        self.log_lock = threading.Lock()
+        self.pending_logs = []
+        self.log_flush_scheduled = False
 
         tornado_settings = {
             'debug': True,
             'static_path': os.path.join(os.path.dirname(os.path.realpath(__file__)), 'html')
         }
 
+        # assets are scanned once at startup; with ~watch_assets (for frontend development), edits
+        # are picked up on page loads, rescanning at most every 2 seconds
+        asset_manifest = AssetManifest(tornado_settings.get("static_path"),
+            rescan_interval = 2.0 if backend.get_param("~watch_assets", False) else None)
+
+        # saved layouts and localization configs, served from memory
+        config_dir = os.path.join(os.path.dirname(os.path.realpath(__file__)), 'configs')
+        layout_store = ConfigStore(config_dir)
+        loc_config_store = ConfigStore(os.path.join(os.path.dirname(os.path.realpath(__file__)), 'loc_config'), defaults = {
+            "paths.json": {
+                "garage": {"x0": -3, "y0": 15, "x1": -3, "y1": 20},
+                "water": {"x0": -7, "y0": 7, "x1": -5, "y1": 7},
+            },
+        })
+
         tornado_handlers = [
                 (r"/rosboard/v1", ROSBoardSocketHandler, {
                     "node": self,
                 }),
+                (r"/rosboard/api/viewers", ViewersManifestHandler, {
+                    "manifest": asset_manifest,
+                }),
+                (r"/metrics", MetricsHandler),
+                (r"/rosboard/api/debug/profile", ProfileHandler, {
+                    "token": self.debug_token,
+                }),
+                (r"/rosboard/api/debug/memory", MemoryHandler, {
+                    "node": self,
+                    "token": self.debug_token,
+                }),
+                (r"/rosboard/api/debug/tracemalloc/(start|stop|snapshot)", TracemallocHandler, {
+                    "token": self.debug_token,
+                }),
+                (r"/rosboard/api/topic-stats", TopicStatsHandler, {
+                    "node": self,
+                }),
+                (r"/rosboard/stream/(.*)\.mjpg", MJPEGStreamHandler, {
+                    "node": self,
+                }),
                 (r"/rosboard/api/layouts", LayoutsListHandler, {
-                    "config_dir": os.path.join(os.path.dirname(os.path.realpath(__file__)), 'configs'),
+                    "config_dir": config_dir,
+                    "store": layout_store,
                 }),
                 (r"/rosboard/api/layouts/(.*)", LayoutHandler, {
-                    "config_dir": os.path.join(os.path.dirname(os.path.realpath(__file__)), 'configs'),
+                    "config_dir": config_dir,
+                    "store": layout_store,
                 }),
                 (r"/rosboard/api/remote-pcd-files", RemotePcdFilesHandler, {
-                    "config_dir": os.path.join(os.path.dirname(os.path.realpath(__file__)), 'configs'),
+                    "config_dir": config_dir,
+                }),
+                (r"/rosboard/api/remote-pcd-files/(.*\.pcd)/octree", RemotePcdOctreeHandler, {
+                    "path": REMOTE_PCD_DIR,
+                }),
+                (r"/rosboard/api/remote-pcd-files/(.*\.pcd)/octree/(r[0-7]*)", RemotePcdOctreeHandler, {
+                    "path": REMOTE_PCD_DIR,
                 }),
                 (r"/rosboard/api/remote-pcd-files/(.*)", RemotePcdFileHandler, {
-                    "config_dir": os.path.join(os.path.dirname(os.path.realpath(__file__)), 'configs'),
+                    "path": REMOTE_PCD_DIR,
                 }),
                 (r"/rosboard/api/loc-configs", LocConfigsListHandler, {
-                    "config_dir": os.path.join(os.path.dirname(os.path.realpath(__file__)), 'configs'),
+                    "config_dir": config_dir,
+                    "store": loc_config_store,
                 }),
                 (r"/rosboard/api/loc-configs/(.*)", LocConfigFileHandler, {
-                    "config_dir": os.path.join(os.path.dirname(os.path.realpath(__file__)), 'configs'),
+                    "config_dir": config_dir,
+                    "store": loc_config_store,
                 }),
-                (r"/(.*)", NoCacheStaticFileHandler, {
-                    "path": tornado_settings.get("static_path"),
+                (r"/(.*)", StaticAssetHandler, {
+                    "manifest": asset_manifest,
                     "default_filename": "index.html"
                 }),
         ]
@@ -105,26 +186,26 @@ class ROSBoardNode(object):
         self.tornado_application.listen(self.port)
 
         # allows tornado to log errors to ROS
-        self.logwarn = rospy.logwarn
-        self.logerr = rospy.logerr
+        self.logwarn = backend.logwarn
+        self.logerr = backend.logerr
 
         # tornado event loop. all the web server and web socket stuff happens here
-        threading.Thread(target = self.event_loop.start, daemon = True).start()
+        threading.Thread(target = self.event_loop.start, name = "rosboard-ioloop", daemon = True).start()
 
         # loop to sync remote (websocket) subs with local (ROS) subs
-        threading.Thread(target = self.sync_subs_loop, daemon = True).start()
+        threading.Thread(target = self.sync_subs_loop, name = "rosboard-sync-subs", daemon = True).start()
 
         # loop to keep track of latencies and clock differences for each socket
-        threading.Thread(target = self.pingpong_loop, daemon = True).start()
+        threading.Thread(target = self.pingpong_loop, name = "rosboard-pingpong", daemon = True).start()
 
         self.lock = threading.Lock()
 
-        rospy.loginfo("ROSboard listening on :%d" % self.port)
-        rospy.loginfo("Open ROSBoard in your browser: http://localhost:%d" % self.port)
+        backend.loginfo("ROSboard listening on :%d" % self.port)
+        backend.loginfo("Open ROSBoard in your browser: http://localhost:%d" % self.port)
         
 
     def start(self):
-        rospy.spin()
+        self.backend.spin()
 
     def get_msg_class(self, msg_type):
         """
@@ -136,46 +217,7 @@ class ROSBoardNode(object):
 
         Returns none if the type is invalid (e.g. if user hasn't bash-sourced the message package).
         """
-        try:
-            msg_module, dummy, msg_class_name = msg_type.replace("/", ".").rpartition(".")
-        except ValueError:
-            rospy.logerr("invalid type %s" % msg_type)
-            return None
-
-        try:
-            if not msg_module.endswith(".msg"):
-                msg_module = msg_module + ".msg"
-            return getattr(importlib.import_module(msg_module), msg_class_name)
-        except Exception as e:
-            rospy.logerr(str(e))
-            return None
-
-    if os.environ.get("ROS_VERSION") == "2":
-        def get_topic_qos(self, topic_name: str) -> QoSProfile:
-            """!
-            Given a topic name, get the QoS profile with which it is being published
-            @param topic_name (str) the topic name
-            @return QosProfile the qos profile with which the topic is published. If no publishers exist
-            for the given topic, it returns the sensor data QoS. returns None in case ROS1 is being used
-            """
-            if rospy.__name__ == "rospy2":
-                topic_info = rospy._node.get_publishers_info_by_topic(topic_name=topic_name)
-                if len(topic_info):
-                    if topic_info[0].qos_profile.history == HistoryPolicy.UNKNOWN:
-                        topic_info[0].qos_profile.history = HistoryPolicy.KEEP_LAST
-                    return topic_info[0].qos_profile
-                else:
-                    rospy.logwarn(f"No publishers available for topic {topic_name}. Returning sensor data QoS")
-                    return QoSProfile(
-                            depth=10,
-                            reliability=QoSReliabilityPolicy.BEST_EFFORT,
-                            # reliability=QoSReliabilityPolicy.RELIABLE,
-                            durability=QoSDurabilityPolicy.VOLATILE,
-                            # durability=QoSDurabilityPolicy.TRANSIENT_LOCAL,
-                        )
-            else:
-                rospy.logwarn("QoS profiles are only used in ROS2")
-                return None
+        return self.backend.get_msg_class(msg_type)
 
     def pingpong_loop(self):
         """
@@ -188,8 +230,13 @@ class ROSBoardNode(object):
                 continue
             try:
                 self.event_loop.add_callback(ROSBoardSocketHandler.send_pings)
+                # measures how long callbacks from other threads wait for the IOLoop
+                self.event_loop.add_callback(
+                    lambda t: metrics.IOLOOP_CALLBACK_DELAY_SECONDS.observe(time.perf_counter() - t),
+                    time.perf_counter(),
+                )
             except Exception as e:
-                rospy.logwarn(str(e))
+                self.backend.logwarn(str(e))
                 traceback.print_exc()
 
     def sync_subs_loop(self):
@@ -206,14 +253,17 @@ class ROSBoardNode(object):
         Also cleans up unused local subscribers for which there are no remote subs interested in them.
         """
 
+        backend = self.backend
+
         # Acquire lock since either sync_subs_loop or websocket may call this function (from different threads)
         self.lock.acquire()
+        sync_start = time.perf_counter()
 
         try:
             # all topics and their types as strings e.g. {"/foo": "std_msgs/String", "/bar": "std_msgs/Int32"}
             self.all_topics = {}
 
-            for topic_tuple in rospy.get_published_topics():
+            for topic_tuple in backend.get_published_topics():
                 topic_name = topic_tuple[0]
                 topic_type = topic_tuple[1]
                 if type(topic_type) is list:
@@ -233,25 +283,31 @@ class ROSBoardNode(object):
                 # handle it separately here
                 if topic_name == "_dmesg":
                     if topic_name not in self.local_subs:
-                        rospy.loginfo("Subscribing to dmesg [non-ros]")
-                        self.local_subs[topic_name] = DMesgSubscriber(self.on_dmesg)
+                        backend.loginfo("Subscribing to dmesg [non-ros]")
+                        self.local_subs[topic_name] = DMesgSubscriber(self.on_dmesg, self.event_loop)
                     continue
 
                 if topic_name == "_system_stats":
                     if topic_name not in self.local_subs:
-                        rospy.loginfo("Subscribing to _system_stats [non-ros]")
+                        backend.loginfo("Subscribing to _system_stats [non-ros]")
                         self.local_subs[topic_name] = SystemStatsSubscriber(self.on_system_stats)
                     continue
 
+                if topic_name == "_topic_stats":
+                    if topic_name not in self.local_subs:
+                        backend.loginfo("Subscribing to _topic_stats [non-ros]")
+                        self.local_subs[topic_name] = TopicStatsSubscriber(self.get_topic_stats, self.on_topic_stats)
+                    continue
+
                 if topic_name == "_top":
                     if topic_name not in self.local_subs:
-                        rospy.loginfo("Subscribing to _top [non-ros]")
+                        backend.loginfo("Subscribing to _top [non-ros]")
                         self.local_subs[topic_name] = ProcessesSubscriber(self.on_top)
                     continue
 
                 # check if remote sub request is not actually a ROS topic before proceeding
                 if topic_name not in self.all_topics:
-                    rospy.logwarn("warning: topic %s not found" % topic_name)
+                    backend.logwarn("warning: topic %s not found" % topic_name)
                     continue
 
                 # if the local subscriber doesn't exist for the remote sub, create it
@@ -279,34 +335,38 @@ class ROSBoardNode(object):
 
                     self.last_data_times_by_topic[topic_name] = 0.0
 
-                    rospy.loginfo("Subscribing to %s" % topic_name)
+                    backend.loginfo("Subscribing to %s" % topic_name)
 
-                    kwargs = {}
-                    if rospy.__name__ == "rospy2":
-                        # In ros2 we also can pass QoS parameters to the subscriber.
-                        # To avoid incompatibilities we subscribe using the same Qos
-                        # of the topic's publishers
-                        kwargs = {"qos": self.get_topic_qos(topic_name)}
-                    self.local_subs[topic_name] = rospy.Subscriber(
+                    self.local_subs[topic_name] = backend.subscribe(
                         topic_name,
-                        self.get_msg_class(topic_type),
+                        msg_class,
                         self.on_ros_msg,
                         callback_args = (topic_name, topic_type),
-                        **kwargs
+                        # log topics aren't throttled: every message is deserialized and kept
+                        raw = self.lazy_deserialization and topic_type not in LOG_TYPES,
+                        latest_only = self.latest_only and topic_type not in LOG_TYPES,
                     )
 
             # clean up local subscribers for which remote clients have lost interest
             for topic_name in list(self.local_subs.keys()):
                 if topic_name not in self.remote_subs or \
                     len(self.remote_subs[topic_name]) == 0:
-                        rospy.loginfo("Unsubscribing from %s" % topic_name)
+                        backend.loginfo("Unsubscribing from %s" % topic_name)
                         self.local_subs[topic_name].unregister()
                         del(self.local_subs[topic_name])
+                        self.topic_stats.pop(topic_name, None)
+
+            # drop the log buffers of topics we unsubscribed from, including ones recreated by
+            # messages that were in flight when unsubscribing
+            for topic_name in list(self.log_buffers.keys()):
+                if topic_name not in self.local_subs:
+                    del(self.log_buffers[topic_name])
 
         except Exception as e:
-            rospy.logwarn(str(e))
+            backend.logwarn(str(e))
             traceback.print_exc()
 
+        metrics.SYNC_SUBS_SECONDS.observe(time.perf_counter() - sync_start)
         self.lock.release()
 
     def on_system_stats(self, system_stats):
@@ -332,72 +392,191 @@ class ROSBoardNode(object):
             ]
         )
 
-    def on_top(self, processes):
+    def get_topic_stats(self):
         """
-        processes list received. send it off to the client as a "fake" ROS message (which could at some point be a real ROS message)
+        Returns the statistics of the subscribed ROS topics, as a dict of topic_name -> dict (see TopicStats.summary),
+        with the queueing settings of the topic's subscriber as "ingestion".
+        """
+        topic_stats = {}
+        for topic_name, stats in list(self.topic_stats.items()):
+            topic_stats[topic_name] = stats.summary()
+            topic_stats[topic_name]["ingestion"] = getattr(self.local_subs.get(topic_name), "ingestion", None)
+        return topic_stats
+
+    def on_topic_stats(self, topic_stats):
+        """
+        topic statistics sampled. send them off to the client as a "fake" ROS message
         """
         if self.event_loop is None:
             return
 
+        msg_dict = {
+            "_topic_name": "_topic_stats", # special non-ros topics start with _
+            "_topic_type": "rosboard_msgs/msg/TopicStats",
+        }
+
+        for key, value in topic_stats.items():
+            msg_dict[key] = value
+
         self.event_loop.add_callback(
             ROSBoardSocketHandler.broadcast,
             [
                 ROSBoardSocketHandler.MSG_MSG,
-                {
-                    "_topic_name": "_top", # special non-ros topics start with _
-                    "_topic_type": "rosboard_msgs/msg/ProcessList",
-                    "processes": processes,
-                },
+                msg_dict
             ]
         )
 
-    def on_dmesg(self, text):
+    def on_top(self, process_list):
         """
-        dmesg log received. make it look like a rcl_interfaces/msg/Log and send it off
+        processes list received (the processes that changed, see ProcessesSubscriber).
+        send it off to the client as a "fake" ROS message (which could at some point be a real ROS message)
         """
         if self.event_loop is None:
             return
 
+        msg_dict = {
+            "_topic_name": "_top", # special non-ros topics start with _
+            "_topic_type": "rosboard_msgs/msg/ProcessList",
+        }
+
+        for key, value in process_list.items():
+            msg_dict[key] = value
+
         self.event_loop.add_callback(
             ROSBoardSocketHandler.broadcast,
             [
                 ROSBoardSocketHandler.MSG_MSG,
-                {
-                    "_topic_name": "_dmesg", # special non-ros topics start with _
-                    "_topic_type": "rcl_interfaces/msg/Log",
-                    "msg": text,
-                },
+                msg_dict
             ]
         )
 
+    def on_dmesg(self, records):
+        """
+        batch of kernel log records (level, timestamp, text) received. make each run of records
+        of the same level look like a rcl_interfaces/msg/Log and send it off
+        """
+        if self.event_loop is None:
+            return
+
+        groups = []
+        for level, timestamp, text in records:
+            line = "[%12.6f] %s" % (timestamp, text)
+            if groups and groups[-1][0] == level:
+                groups[-1][1].append(line)
+            else:
+                groups.append((level, [line]))
+
+        for level, lines in groups:
+            self.push_log({
+                "_topic_name": "_dmesg", # special non-ros topics start with _
+                "_topic_type": "rcl_interfaces/msg/Log",
+                "_time": time.time() * 1000,
+                "level": level,
+                "msg": "\n".join(lines),
+            })
+
+    @metrics.timed("on_ros_msg")
     def on_ros_msg(self, msg, topic_info):
         """
-        ROS messaged received (any topic or type).
+        ROS messaged received (any topic or type), possibly still serialized (SerializedMessage).
         """
         topic_name, topic_type = topic_info
+
+        # statistics count every message, before throttling
+        if topic_name not in self.topic_stats:
+            self.topic_stats[topic_name] = TopicStats()
+        if isinstance(msg, SerializedMessage):
+            self.topic_stats[topic_name].record_serialized(msg.size, msg.stamp)
+        else:
+            self.topic_stats[topic_name].record_msg(msg)
+
+        # log topics are buffered and filtered per socket instead of throttled
+        if topic_type in LOG_TYPES:
+            self.on_log_msg(msg, topic_info)
+            return
+
         t = time.time()
         if t - self.last_data_times_by_topic.get(topic_name, 0) < self.update_intervals_by_topic[topic_name] - 1e-4:
+            metrics.THROTTLED_MESSAGES.inc(topic_name, "node")
             return
 
         if self.event_loop is None:
             return
 
-        # convert ROS message into a dict and get it ready for serialization
-        ros_msg_dict = ros2dict(msg)
+        # deserialize only the messages that made it through throttling
+        if isinstance(msg, SerializedMessage):
+            deserialize_start = time.perf_counter()
+            try:
+                msg = msg.deserialize()
+            except Exception as e:
+                self.backend.logwarn("Could not deserialize message on %s: %s" % (topic_name, str(e)))
+                return
+            metrics.DESERIALIZE_SECONDS.observe(time.perf_counter() - deserialize_start, topic_type)
 
-        # add metadata
-        ros_msg_dict["_topic_name"] = topic_name
-        ros_msg_dict["_topic_type"] = topic_type
-        ros_msg_dict["_time"] = time.time() * 1000
+        # image topics are rendered once per distinct region of interest requested by the clients
+        if topic_type.rpartition("/")[2] in ("Image", "CompressedImage"):
+            rois = ROSBoardSocketHandler.get_rois(self, topic_name) or {None}
+        else:
+            rois = None
 
         # log last time we received data on this topic
         self.last_data_times_by_topic[topic_name] = t
 
-        # broadcast it to the listeners that care
-        self.event_loop.add_callback(
-            ROSBoardSocketHandler.broadcast,
-            [ROSBoardSocketHandler.MSG_MSG, ros_msg_dict]
-        )
+        for roi in (rois or (None,)):
+            # convert ROS message into a dict and get it ready for serialization
+            serialize_start = time.perf_counter()
+            ros_msg_dict = ros2dict(msg, roi = roi)
+            metrics.SERIALIZE_SECONDS.observe(time.perf_counter() - serialize_start, topic_type)
+
+            # add metadata
+            ros_msg_dict["_topic_name"] = topic_name
+            ros_msg_dict["_topic_type"] = topic_type
+            ros_msg_dict["_time"] = time.time() * 1000
+            if rois is not None:
+                ros_msg_dict["_roi"] = list(roi) if roi else None
+
+            # broadcast it to the listeners that care
+            self.event_loop.add_callback(
+                ROSBoardSocketHandler.broadcast,
+                [ROSBoardSocketHandler.MSG_MSG, ros_msg_dict]
+            )
+
+    def on_log_msg(self, msg, topic_info):
+        """
+        Log message received. Buffer it, and send it off in batches to the sockets whose log filter it matches.
+        """
+        topic_name, topic_type = topic_info
+        if self.event_loop is None:
+            return
+
+        entry = ros2dict(msg)
+        entry["_topic_name"] = topic_name
+        entry["_topic_type"] = topic_type
+        entry["_time"] = time.time() * 1000
+        self.push_log(entry)
+
+    def push_log(self, entry):
+        """
+        Buffers a log entry (dict-ified Log message with _topic_name and _topic_type) and
+        schedules sending it off.
+        """
+        topic_name = entry["_topic_name"]
+        if topic_name not in self.log_buffers:
+            self.log_buffers[topic_name] = LogBuffer()
+        self.log_buffers[topic_name].append(entry)
+
+        with self.log_lock:
+            self.pending_logs.append(entry)
+            if self.log_flush_scheduled:
+                return
+            self.log_flush_scheduled = True
+        self.event_loop.add_callback(self.event_loop.call_later, 0.05, self.flush_logs)
+
+    def flush_logs(self):
+        with self.log_lock:
+            entries, self.pending_logs = self.pending_logs, []
+            self.log_flush_scheduled = False
+        ROSBoardSocketHandler.broadcast_logs(entries)
 
     # ---------- Client publish support ----------
     def _dict_to_ros_msg(self, msg_class, data):
@@ -476,7 +655,7 @@ class ROSBoardNode(object):
             pass
 
     def _dict_to_submsg(self, exemplar, data):
-        # Handle builtin_interfaces/Time or rospy.Time specially
+        # Handle builtin_interfaces/Time or ROS1 Time specially
         if self._is_time_field(exemplar):
             self._fill_time_field(exemplar, data if isinstance(data, dict) else {})
             return exemplar
@@ -528,34 +707,12 @@ class ROSBoardNode(object):
             # Ensure header.stamp is set to now to satisfy both ROS1 (secs/nsecs) and ROS2 (sec/nanosec)
             try:
                 if hasattr(msg, 'header') and msg.header is not None:
-                    if os.environ.get('ROS_VERSION') == '1':
-                        msg.header.stamp = rospy.Time.now()
-                    else:
-                        now = time.time()
-                        sec = int(now)
-                        nsec = int((now - sec) * 1e9)
-                        if hasattr(msg.header.stamp, 'sec'):
-                            msg.header.stamp.sec = sec
-                        if hasattr(msg.header.stamp, 'nanosec'):
-                            msg.header.stamp.nanosec = nsec
-                        if hasattr(msg.header.stamp, 'nanosecs'):
-                            msg.header.stamp.nanosecs = nsec
+                    self.backend.set_stamp(msg.header)
             except Exception as _e:
                 self.logwarn(f"Could not set header.stamp: {_e}")
             if topic_name not in self.local_pubs:
-                # Publish once without storing: disable latching in ROS1; use VOLATILE durability in ROS2
-                if rospy.__name__ != "rospy2":
-                    # ROS1: ensure latch=False so the message is not stored
-                    self.local_pubs[topic_name] = rospy.Publisher(topic_name, msg_class, queue_size=1, latch=False)
-                else:
-                    # ROS2: prefer VOLATILE durability to avoid transient storage on the topic
-                    qos_profile = self.get_topic_qos(topic_name)
-                    try:
-                        if qos_profile is not None and hasattr(qos_profile, 'durability'):
-                            qos_profile.durability = QoSDurabilityPolicy.VOLATILE
-                    except Exception:
-                        pass
-                    self.local_pubs[topic_name] = rospy.Publisher(topic_name, msg_class, qos=qos_profile)
+                # Publish once without storing (no latching in ROS1, VOLATILE durability in ROS2)
+                self.local_pubs[topic_name] = self.backend.advertise(topic_name, msg_class)
                 # allow some time for publisher to register
                 time.sleep(0.05)
             self.local_pubs[topic_name].publish(msg)
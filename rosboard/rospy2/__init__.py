@@ -10,6 +10,8 @@ import importlib
 import os
 import random
 import rclpy
+import rclpy.callback_groups
+import rclpy.executors
 import rclpy.logging
 import rclpy.qos
 import rclpy.qos_event
@@ -35,6 +37,7 @@ rclpy.init(args = sys.argv)
 # as per their ROS1 namesake.
 
 _node = None
+_executor = None
 _logger = None
 _clock = None
 _thread_spin = None
@@ -52,8 +55,12 @@ def get_param(param_name, default_value = None):
         _node.declare_parameter(param_name, default_value)
     return _node.get_parameter(param_name)._value
 
-def init_node(node_name, anonymous=False, log_level=INFO, disable_signals=False):
-    global _node, _logger, _clock, _thread_spin
+def init_node(node_name, anonymous=False, log_level=INFO, disable_signals=False, num_threads=None):
+    """
+    Unlike rospy, callbacks run in a pool of num_threads threads (by default, one per CPU).
+    Each Subscriber's callbacks run one at a time, in order, but in parallel with other topics'.
+    """
+    global _node, _executor, _logger, _clock, _thread_spin
     if anonymous:
         node_name += "_" + str(random.randint(10000,99999))
 
@@ -74,12 +81,15 @@ def init_node(node_name, anonymous=False, log_level=INFO, disable_signals=False)
     }.get(log_level, rclpy.logging.LoggingSeverity.UNSET)
     rclpy.logging.set_logger_level(_logger.name, ros2_log_level)
 
+    _executor = rclpy.executors.MultiThreadedExecutor(num_threads = num_threads)
+    _executor.add_node(_node)
+
     _thread_spin = threading.Thread(target=_thread_spin_target, daemon=True)
     _thread_spin.start()
 
 def _thread_spin_target():
-    global _on_shutdown, _node
-    rclpy.spin(_node)
+    global _on_shutdown, _executor
+    _executor.spin()
     if _on_shutdown:
         _on_shutdown()
 
@@ -181,7 +191,7 @@ def wait_for_service(service_name):
         time.sleep(0.5)
 
 class Publisher(object):
-    def __init__(self, topic_name, topic_type, queue_size = 1):
+    def __init__(self, topic_name, topic_type, queue_size = 1, qos = None):
         global _node
         self.reg_type = "pub"
         self.data_class = topic_type
@@ -191,7 +201,7 @@ class Publisher(object):
         self._pub = _node.create_publisher(
             topic_type,
             topic_name,
-            rclpy.qos.QoSProfile(depth = queue_size, history = rclpy.qos.HistoryPolicy.KEEP_LAST)
+            qos or rclpy.qos.QoSProfile(depth = queue_size, history = rclpy.qos.HistoryPolicy.KEEP_LAST)
         )
         self.get_num_connections = self._pub.get_subscription_count
 
@@ -212,8 +222,32 @@ class Publisher(object):
         global _node
         _node.destroy_publisher(self._pub)
 
+def _arrays_to_lists(msg):
+    global numpy, array
+    if numpy is None:
+        numpy = importlib.import_module("numpy")
+    if array is None:
+        array = importlib.import_module("array")
+    for field_name in msg.get_fields_and_field_types():
+        value = getattr(msg, field_name)
+        if type(value) in (array.array, numpy.ndarray):
+            setattr(msg, "_" + field_name, value.tolist())
+
+def deserialize_message(data, topic_type):
+    """
+    Deserializes a message received by a raw Subscriber, as a normal Subscriber would.
+    """
+    from rclpy.serialization import deserialize_message as _deserialize_message
+    msg = _deserialize_message(data, topic_type)
+    if ARRAY_TO_LIST:
+        _arrays_to_lists(msg)
+    return msg
+
 class Subscriber(object):
-    def __init__(self, topic_name, topic_type, callback, callback_args = None, qos=10):
+    def __init__(self, topic_name, topic_type, callback, callback_args = None, qos=10, raw=False):
+        """
+        With raw=True, callback gets the serialized messages (bytes) instead; see deserialize_message().
+        """
         global _node
         self.reg_type = "sub"
         self.data_class = topic_type
@@ -222,7 +256,10 @@ class Subscriber(object):
         self.type = _ros2_type_to_type_name(topic_type)
         self.callback = callback
         self.callback_args = callback_args
-        self._sub = _node.create_subscription(topic_type, topic_name, self._ros2_callback, qos, event_callbacks = rclpy.qos_event.SubscriptionEventCallbacks())
+        self.raw = raw
+        # a group per subscriber: its messages are handled in order, other topics' in parallel
+        self._callback_group = rclpy.callback_groups.MutuallyExclusiveCallbackGroup()
+        self._sub = _node.create_subscription(topic_type, topic_name, self._ros2_callback, qos, event_callbacks = rclpy.qos_event.SubscriptionEventCallbacks(), raw = raw, callback_group = self._callback_group)
         _node.guards
         self.get_num_connections = lambda: 1 # No good ROS2 equivalent
 
@@ -231,16 +268,8 @@ class Subscriber(object):
         _node.destroy_subscription(self._sub)
 
     def _ros2_callback(self, msg):
-        global numpy, array, ARRAY_TO_LIST
-        if ARRAY_TO_LIST:
-            if numpy is None:
-                numpy = importlib.import_module("numpy")
-            if array is None:
-                array = importlib.import_module("array")
-            for field_name in msg.get_fields_and_field_types():
-                value = getattr(msg, field_name)
-                if type(value) in (array.array, numpy.ndarray):
-                    setattr(msg, "_" + field_name, value.tolist())
+        if ARRAY_TO_LIST and not self.raw:
+            _arrays_to_lists(msg)
         if self.callback_args:
             self.callback(msg, self.callback_args)
         else:
@@ -264,9 +293,11 @@ class Service(object):
         _node.destroy_service(self._srv)
 
 class ServiceProxy(object):
-    def __init__(self, service_name, service_type):
+    def __init__(self, service_name, service_type, timeout = 10.0):
         global _node
         self._client = _node.create_client(service_type, service_name)
+        self.resolved_name = service_name
+        self.timeout = timeout # seconds to wait for a response; None waits forever
 
     def __del__(self):
         global _node
@@ -275,7 +306,14 @@ class ServiceProxy(object):
     def __call__(self, req):
         global _node
         resp = self._client.call_async(req)
-        rclpy.spin_until_future_complete(_node, resp)
+        # the node is spun by the executor's thread, so just wait for it to complete the call
+        done = threading.Event()
+        resp.add_done_callback(lambda future: done.set())
+        if not done.wait(self.timeout):
+            resp.cancel()
+            if hasattr(self._client, "remove_pending_request"):
+                self._client.remove_pending_request(resp)
+            raise ServiceException("service %s did not respond within %.1f seconds" % (self.resolved_name, self.timeout))
         return resp
 
 class Duration(object):
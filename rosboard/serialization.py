@@ -3,9 +3,12 @@ import base64
 import numpy as np
 import rosboard.compression
 
-def ros2dict(msg):
+def ros2dict(msg, roi = None):
     """
     Converts an arbitrary ROS1/ROS2 message into a JSON-serializable dict.
+
+    roi optionally specifies a normalized region of interest (x, y, width, height, max_size)
+    that Image and CompressedImage messages are cropped to before being compressed.
     """
     if type(msg) in (str, bool, int, float):
         return msg
@@ -31,14 +34,14 @@ def ros2dict(msg):
         if (msg.__module__ == "sensor_msgs.msg._CompressedImage" or \
             msg.__module__ == "sensor_msgs.msg._compressed_image") \
             and field == "data":
-            rosboard.compression.compress_compressed_image(msg, output)
+            rosboard.compression.compress_compressed_image(msg, output, roi = roi)
             continue
 
         # Image: compress to jpeg
         if (msg.__module__ == "sensor_msgs.msg._Image" or \
             msg.__module__ == "sensor_msgs.msg._image") \
             and field == "data":
-            rosboard.compression.compress_image(msg, output)
+            rosboard.compression.compress_image(msg, output, roi = roi)
             continue
 
         # OccupancyGrid: render and compress to jpeg
@@ -1,51 +1,185 @@
 #!/usr/bin/env python3
 
-import select
+import collections
+import errno
+import os
+import re
 import subprocess
-import time
-import threading
 import traceback
 
+import tornado.ioloop
+
+# kernel log priorities (0 emerg ... 7 debug) -> rcl_interfaces/msg/Log levels
+LEVELS = [50, 50, 50, 40, 30, 20, 20, 10]
+
+# "<6>[   12.345678] text", as printed by dmesg --raw
+_raw_line_re = re.compile(r"^<(\d+)>\s*(?:\[\s*(\d+\.\d+)\]\s?)?(.*)$")
+
 class DMesgSubscriber(object):
-    def __init__(self, callback):
+    """
+    Follows the kernel log on the given IOLoop: reads /dev/kmsg if permitted, otherwise the
+    output of `dmesg --follow --raw`, with the file descriptor registered with the IOLoop
+    instead of polled by a thread. The callback receives batches of records
+    (level, timestamp, text), at most every FLUSH_INTERVAL seconds and at most MAX_RATE
+    records per second; records beyond BACKLOG waiting to be sent are dropped, oldest
+    first, and reported with a warning, so a storm of kernel messages can't flood the clients.
+    Both sources start by replaying the kernel log since boot; of that only the last BACKLOG
+    records are sent, without a warning.
+    """
+
+    FLUSH_INTERVAL = 0.2
+    MAX_RATE = 200
+    BACKLOG = 500
+
+    def __init__(self, callback, io_loop = None):
         self.callback = callback
+        self.io_loop = io_loop or tornado.ioloop.IOLoop.current()
+        self.fd = None
         self.process = None
-        threading.Thread(target = self.start, daemon = True).start()
+        self.buffer = b""
+        self.pending = collections.deque(maxlen = self.BACKLOG)
+        self.dropped = 0
+        self.replaying = True # until the first read that would block
+        self.flush_timeout = None
+        self.stopped = False
+        self.io_loop.add_callback(self.start)
 
     def __del__(self):
         if self.process:
-            self.process.terminate()
+            self.end_process()
             self.process = None
 
     def unregister(self):
-        if self.process:
-            self.process.terminate()
-            self.process = None
+        self.stopped = True
+        self.io_loop.add_callback(self.stop)
 
     def start(self):
+        if self.stopped:
+            return
+        try:
+            self.fd = os.open("/dev/kmsg", os.O_RDONLY | os.O_NONBLOCK)
+            self.io_loop.add_handler(self.fd, self.on_kmsg_readable, tornado.ioloop.IOLoop.READ)
+            return
+        except OSError:
+            self.fd = None
+
         try:
-            self.process = subprocess.Popen(['dmesg', '--follow'], stdout = subprocess.PIPE)
-            p = select.poll()
-            p.register(self.process.stdout, select.POLLIN)
-    
-            while True:
-                time.sleep(0.1)
-
-                if self.process is None:
-                    break
-                
-                lines = []
-                while p.poll(1):
-                    lines.append(self.process.stdout.readline().decode('utf-8').strip())
-
-                text = "\n".join(lines)
-                if len(text) > 0:
-                    self.callback("\n".join(lines))
-        except:
+            self.process = subprocess.Popen(['dmesg', '--follow', '--raw'], stdout = subprocess.PIPE)
+            os.set_blocking(self.process.stdout.fileno(), False)
+            self.io_loop.add_handler(self.process.stdout.fileno(), self.on_pipe_readable, tornado.ioloop.IOLoop.READ)
+        except Exception:
             traceback.print_exc()
+            self.process = None
+
+    def stop(self):
+        if self.flush_timeout is not None:
+            self.io_loop.remove_timeout(self.flush_timeout)
+            self.flush_timeout = None
+        if self.fd is not None:
+            self.io_loop.remove_handler(self.fd)
+            os.close(self.fd)
+            self.fd = None
+        if self.process is not None:
+            self.io_loop.remove_handler(self.process.stdout.fileno())
+            self.end_process()
+            self.process.stdout.close()
+            self.process = None
+
+    def end_process(self):
+        # reap it, so that resubscribing doesn't leave zombies behind
+        self.process.terminate()
+        try:
+            self.process.wait(timeout = 1.0)
+        except subprocess.TimeoutExpired:
+            self.process.kill()
+            self.process.wait()
+
+    def on_kmsg_readable(self, fd, events):
+        # every read() of /dev/kmsg returns exactly one record:
+        # "priority,sequence,timestamp_us,flags[,...];text\n" followed by " KEY=value" lines.
+        # bounded so that a storm can't starve the IOLoop; the rest is read on the next call
+        for _ in range(1000):
+            if self.fd is None:
+                break
+            try:
+                record = os.read(self.fd, 8192)
+            except OSError as e:
+                if e.errno == errno.EPIPE:
+                    # records were overwritten in the ring buffer before we read them
+                    if not self.replaying:
+                        self.dropped += 1
+                    continue
+                if e.errno == errno.EAGAIN:
+                    self.replaying = False
+                else:
+                    traceback.print_exc()
+                    self.stop()
+                break
+            if not record:
+                break
+            try:
+                prefix, text = record.decode("utf-8", errors = "replace").split(";", 1)
+                fields = prefix.split(",")
+                self.push(int(fields[0]) & 7, int(fields[2]) / 1e6, text.split("\n")[0])
+            except (ValueError, IndexError):
+                continue
+
+    def on_pipe_readable(self, fd, events):
+        # read until the pipe would block, which ends the replay; bounded like on_kmsg_readable
+        chunks = []
+        for _ in range(16):
+            try:
+                data = os.read(fd, 65536)
+            except BlockingIOError:
+                self.replaying = False
+                break
+            if not data:
+                if not chunks:
+                    self.stop()
+                    return
+                break
+            chunks.append(data)
+        if not chunks:
+            return
+        lines = (self.buffer + b"".join(chunks)).split(b"\n")
+        self.buffer = lines.pop()
+        for line in lines:
+            match = _raw_line_re.match(line.decode("utf-8", errors = "replace"))
+            if match:
+                priority, timestamp, text = match.groups()
+                self.push(int(priority) & 7, float(timestamp or 0.0), text)
+            elif line.strip():
+                self.push(6, 0.0, line.decode("utf-8", errors = "replace"))
+
+    def push(self, priority, timestamp, text):
+        if len(self.pending) == self.pending.maxlen and not self.replaying:
+            self.dropped += 1
+        self.pending.append((LEVELS[priority], timestamp, text))
+        if self.flush_timeout is None:
+            self.flush_timeout = self.io_loop.call_later(self.FLUSH_INTERVAL, self.flush)
+
+    def flush(self):
+        self.flush_timeout = None
+        if self.stopped:
+            return
+
+        count = min(len(self.pending), int(self.MAX_RATE * self.FLUSH_INTERVAL))
+        records = [self.pending.popleft() for _ in range(count)]
+        if self.dropped:
+            records.append((30, records[-1][1] if records else 0.0, "rosboard: %d kernel log messages dropped" % self.dropped))
+            self.dropped = 0
+
+        if self.pending:
+            self.flush_timeout = self.io_loop.call_later(self.FLUSH_INTERVAL, self.flush)
+
+        if records:
+            try:
+                self.callback(records)
+            except Exception:
+                traceback.print_exc()
 
 
 if __name__ == "__main__":
     # Run test
-    DMesgSubscriber(lambda msg: print("Received msg: %s" % msg))
-    time.sleep(100)
+    DMesgSubscriber(lambda records: print("Received records: %s" % records))
+    tornado.ioloop.IOLoop.current().start()
@@ -1,17 +1,38 @@
 #!/usr/bin/env python3
 
-import re
-import select
+import os
 import subprocess
 import time
 import threading
 import traceback
 
+try:
+    import pwd
+except ImportError:
+    pwd = None
+
 class ProcessesSubscriber(object):
+    """
+    Samples the process list every 2 seconds, from /proc where available (no subprocesses),
+    falling back to `ps` elsewhere. %CPU is computed from the CPU ticks each process used
+    since the previous sample, like top does.
+
+    The callback receives {"processes": [...], "removed": [pids], "full": bool}. Only the
+    processes that are new or whose values changed are sent, along with the pids that exited;
+    every KEYFRAME_INTERVAL samples the full list is sent instead (full = True), so that
+    clients that joined late or missed a sample catch up.
+    """
+
+    KEYFRAME_INTERVAL = 10
+
     def __init__(self, callback):
         self.callback = callback
         self.stop_signal = None
-        threading.Thread(target = self.start, daemon = True).start()
+        self._prev_ticks = {} # pid -> (utime + stime, sample time)
+        self._users = {} # uid -> user name
+        self._sent = {} # pid -> process dict last sent
+        self._samples = 0
+        threading.Thread(target = self.start, name = "rosboard-processes", daemon = True).start()
 
     def __del__(self):
         self.stop_signal = True
@@ -19,68 +40,62 @@ class ProcessesSubscriber(object):
     def unregister(self):
         self.stop_signal = True
 
-    def _collect_via_top(self):
-        """Collect process list using `top -bn 1` and parse columns."""
-        # Support both variants: with USER and without USER in header.
-        re_field = re.compile("(^ *PID|USER +| *%CPU| *%MEM|COMMAND.*)")
-        lines = subprocess.check_output(['top', '-bn', '1']).decode('utf-8', errors='ignore').split("\n")
-        fields = None
+    def _user(self, uid):
+        if uid not in self._users:
+            try:
+                self._users[uid] = pwd.getpwuid(uid).pw_name
+            except (KeyError, AttributeError):
+                self._users[uid] = str(uid)
+        return self._users[uid]
+
+    def _collect_via_proc(self):
+        """Collect process list by reading /proc/[pid]/stat of every process."""
+        clock_ticks = os.sysconf("SC_CLK_TCK")
+        page_size = os.sysconf("SC_PAGE_SIZE")
+        with open("/proc/meminfo", "r") as f:
+            for line in f:
+                if line.startswith("MemTotal:"):
+                    mem_total = int(line.split()[1]) * 1024
+                    break
+
+        now = time.monotonic()
+        ticks = {}
         output = []
-        for line in lines:
-            if len(line.strip()) == 0:
-                continue
-            # header row can be either with or without USER column
-            if "PID" in line and "%CPU" in line and "%MEM" in line and "COMMAND" in line:
-                fields = {}
-                # First, try with USER
-                for m in re_field.finditer(line):
-                    fields[m.group().strip()] = (m.start(), m.end())
-                # If USER was not captured, fake USER span as zero-width to the left of PID
-                if "USER" not in fields:
-                    # create spans for PID/CPU/MEM/COMMAND by searching their plain positions
-                    def span(tok):
-                        i = line.find(tok)
-                        return (i, i+len(tok)) if i>=0 else None
-                    spans = {
-                        "PID": span("PID"),
-                        "%CPU": span("%CPU"),
-                        "%MEM": span("%MEM"),
-                        "COMMAND": span("COMMAND"),
-                    }
-                    for k,v in spans.items():
-                        if v and k not in fields:
-                            fields[k] = v
-                    # NOTE: USER missing; we will fill it later via ps lookup
-                continue
-            if fields is None:
+        for entry in os.scandir("/proc"):
+            if not entry.name.isdigit():
                 continue
+            pid = int(entry.name)
             try:
-                pid_str = line[fields["PID"][0] : fields["PID"][1]].strip()
-                if not pid_str or not pid_str[0].isdigit():
-                    continue
-                pid = int(pid_str)
-                user = None
-                if "USER" in fields:
-                    user = line[fields["USER"][0] : fields["USER"][1]].strip()
-                cpu = float(line[fields["%CPU"][0] : fields["%CPU"][1]].replace(',','.')) if "%CPU" in fields else 0.0
-                mem = float(line[fields["%MEM"][0] : fields["%MEM"][1]].replace(',','.')) if "%MEM" in fields else 0.0
-                command = line[fields["COMMAND"][0] : ].strip() if "COMMAND" in fields else ''
-                if user is None:
-                    # resolve USER via ps per-pid (best-effort)
-                    try:
-                        user = subprocess.check_output(['ps','-o','user=','-p',str(pid)]).decode('utf-8', errors='ignore').strip()
-                    except Exception:
-                        user = ''
-                output.append({
-                    "pid": pid,
-                    "user": user,
-                    "cpu": cpu,
-                    "mem": mem,
-                    "command": command,
-                })
-            except Exception:
-                # skip unparsable rows
+                with open("/proc/%d/stat" % pid, "rb") as f:
+                    stat = f.read().decode("utf-8", errors = "replace")
+                uid = entry.stat().st_uid
+            except OSError:
+                # exited since the scan
                 continue
+
+            # the command may contain spaces and parentheses, so split around the last ")"
+            command = stat[stat.find("(") + 1 : stat.rfind(")")]
+            fields = stat[stat.rfind(")") + 2 :].split()
+            # fields[0] is field 3 (state) of proc(5): utime is 14, stime 15, rss 24
+            total = int(fields[11]) + int(fields[12])
+            rss = int(fields[21]) * page_size
+            ticks[pid] = (total, now)
+
+            cpu = 0.0
+            if pid in self._prev_ticks:
+                prev_total, prev_time = self._prev_ticks[pid]
+                if now > prev_time:
+                    cpu = 100.0 * (total - prev_total) / clock_ticks / (now - prev_time)
+
+            output.append({
+                "pid": pid,
+                "user": self._user(uid),
+                "cpu": round(cpu, 1),
+                "mem": round(100.0 * rss / mem_total, 1),
+                "command": command,
+            })
+
+        self._prev_ticks = ticks
         return output
 
     def _collect_via_ps(self):
@@ -119,22 +134,42 @@ class ProcessesSubscriber(object):
                 continue
         return []
 
+    def _diff(self, processes):
+        """
+        Returns the message to send for the sampled processes: only what changed since the
+        previous sample, or everything on keyframes.
+        """
+        full = self._samples % self.KEYFRAME_INTERVAL == 0
+        self._samples += 1
+
+        current = {process["pid"]: process for process in processes}
+        removed = [pid for pid in self._sent if pid not in current]
+        if full:
+            changed = processes
+        else:
+            changed = [process for process in processes if self._sent.get(process["pid"]) != process]
+        self._sent = current
+
+        changed.sort(key = lambda process: -process["cpu"])
+        return {"processes": changed, "removed": [] if full else removed, "full": full}
+
     def start(self):
         self.stop_signal = None
+        use_proc = os.path.isdir("/proc/self")
         while not self.stop_signal:
             try:
                 processes = []
-                try:
-                    processes = self._collect_via_top()
-                except Exception:
-                    # fall back to ps if top is unavailable or parsing fails
-                    processes = self._collect_via_ps()
-                # if top returned no rows (e.g., header variant not matched), also fall back to ps
-                if not processes:
+                if use_proc:
+                    try:
+                        processes = self._collect_via_proc()
+                    except Exception:
+                        traceback.print_exc()
+                        use_proc = False
+                if not use_proc:
                     processes = self._collect_via_ps()
-                # deliver even if empty, to trigger UI update
+                # deliver even if nothing changed, to trigger UI update
                 try:
-                    self.callback(processes)
+                    self.callback(self._diff(processes))
                 except Exception:
                     traceback.print_exc()
                 time.sleep(2)
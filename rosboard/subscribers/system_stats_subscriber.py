@@ -5,6 +5,8 @@ try:
 except (ImportError, ModuleNotFoundError) as e:
     psutil = None
 
+import os
+import re
 import time
 import threading
 import traceback
@@ -12,58 +14,170 @@ import traceback
 def mean(list):
     return sum(list)/len(list)
 
-class SystemStatsSubscriber(object):
-    def __init__(self, callback):
-        self.callback = callback
-        self.stop = False
-        threading.Thread(target = self.start, daemon = True).start()
+def _key(name):
+    return re.sub(r"[^0-9a-zA-Z]+", "_", name).strip("_").lower()
 
-    def __del__(self):
-        self.stop = True
-        pass
+# block devices that aren't disks
+_ignored_disks_re = re.compile(r"^(loop|ram|zram)\d*")
 
-    def unregister(self):
-        self.stop = True
-        pass
+class SystemStatsSampler(object):
+    """
+    Samples system resource usage in one thread shared by all its listeners, and only while
+    there are any. Rates (network throughput, disk IO) are computed from the difference
+    between consecutive samples. Every sample is a flat dict of numbers:
+
+        cpu_percent                      list of per-core %
+        load_1, load_5, load_15          load averages
+        virtual_memory_percent, swap_memory_percent, memory_available_bytes
+        pressure_{cpu,memory,io}         % of time stalled over the last 10 s (Linux PSI)
+        net_sent_bps, net_recv_bps       total throughput in bytes/s, and per interface:
+        net_<interface>_{sent,recv}_bps
+        disk_<disk>_{read,write}_bps     per-disk IO in bytes/s
+        disk_usage_percent               usage of /
+        temp_<sensor>                    mean temperature (C) of each sensor, e.g. temp_coretemp
+
+    Disk usage and temperatures change slowly and are sampled every slow_interval seconds,
+    everything else every interval seconds.
+    """
+    instance = None
+
+    def __init__(self, interval = 3.0, slow_interval = 15.0):
+        self.interval = interval
+        self.slow_interval = slow_interval
+        self.listeners = []
+        self.lock = threading.Lock()
+        self.latest = None
+        self.thread = None
+
+    @classmethod
+    def get_instance(cls):
+        if cls.instance is None:
+            cls.instance = cls()
+        return cls.instance
+
+    def configure(self, interval = None, slow_interval = None):
+        if interval is not None and interval > 0:
+            self.interval = float(interval)
+        if slow_interval is not None and slow_interval > 0:
+            self.slow_interval = float(slow_interval)
+
+    def add_listener(self, callback):
+        with self.lock:
+            self.listeners.append(callback)
+            if self.thread is None:
+                self.thread = threading.Thread(target = self.start, name = "rosboard-system-stats", daemon = True)
+                self.thread.start()
+
+    def remove_listener(self, callback):
+        with self.lock:
+            if callback in self.listeners:
+                self.listeners.remove(callback)
 
     def start(self):
         if psutil is None:
-            self.callback({"_error": "Please install psutil (sudo pip3 install --upgrade psutil) to use this feature."})
+            with self.lock:
+                listeners, self.thread = list(self.listeners), None
+            for callback in listeners:
+                callback({"_error": "Please install psutil (sudo pip3 install --upgrade psutil) to use this feature."})
             return
 
-        while not self.stop:
-            try:
-                p = psutil.Process()
-
-                with p.oneshot():
-                    sensors_temperatures = psutil.sensors_temperatures()
-                    cpu_percent = psutil.cpu_percent(percpu = True)
-                    net_io_counters = psutil.net_io_counters()
-                    virtual_memory = psutil.virtual_memory()
-                    swap_memory = psutil.swap_memory()
-                    disk_usage = psutil.disk_usage('/')
-
-                status = {}
-
-                status["cpu_percent"] = cpu_percent
-
-                if "coretemp" in sensors_temperatures:
-                    status["temp_coretemp"] = mean(list(map(
-                        lambda x:x.current,
-                        sensors_temperatures["coretemp"]
-                    )))
-                
-                status["net_bytes_sent"] = net_io_counters.bytes_sent
-                status["net_bytes_recv"] = net_io_counters.bytes_recv
-                status["disk_usage_percent"] = disk_usage.percent
-                status["virtual_memory_percent"] = virtual_memory.percent
-                status["swap_memory_percent"] = swap_memory.percent
+        prev = None
+        slow_stats = {}
+        last_slow_time = 0.0
+        while True:
+            with self.lock:
+                if not self.listeners:
+                    self.thread = None
+                    return
+                listeners = list(self.listeners)
 
+            t = time.monotonic()
+            status = {}
+            try:
+                if t - last_slow_time >= self.slow_interval:
+                    slow_stats = self._sample_slow()
+                    last_slow_time = t
+                counters = (t, psutil.net_io_counters(pernic = True), psutil.disk_io_counters(perdisk = True) or {})
+                status = self._sample(prev, counters)
+                status.update(slow_stats)
+                prev = counters
             except Exception as e:
                 traceback.print_exc()
 
-            self.callback(status)
-            time.sleep(3)
+            self.latest = status
+            for callback in listeners:
+                try:
+                    callback(status)
+                except Exception:
+                    traceback.print_exc()
+            time.sleep(self.interval)
+
+    def _sample(self, prev, counters):
+        t, net_io, disk_io = counters
+        virtual_memory = psutil.virtual_memory()
+
+        status = {}
+        status["cpu_percent"] = psutil.cpu_percent(percpu = True)
+        status["load_1"], status["load_5"], status["load_15"] = [round(load, 2) for load in os.getloadavg()]
+        status["virtual_memory_percent"] = virtual_memory.percent
+        status["memory_available_bytes"] = virtual_memory.available
+        status["swap_memory_percent"] = psutil.swap_memory().percent
+
+        for resource in ("cpu", "memory", "io"):
+            try:
+                with open("/proc/pressure/" + resource, "r") as f:
+                    # "some avg10=0.12 avg60=0.05 avg300=0.01 total=123"
+                    status["pressure_" + resource] = float(f.readline().split()[1].split("=")[1])
+            except (OSError, IndexError, ValueError):
+                pass
+
+        if prev is None:
+            return status
+        dt = t - prev[0]
+        if dt <= 0:
+            return status
+
+        status["net_sent_bps"] = 0
+        status["net_recv_bps"] = 0
+        for interface, io in net_io.items():
+            if interface == "lo" or interface not in prev[1]:
+                continue
+            sent = max(0, int((io.bytes_sent - prev[1][interface].bytes_sent) / dt))
+            recv = max(0, int((io.bytes_recv - prev[1][interface].bytes_recv) / dt))
+            status["net_%s_sent_bps" % _key(interface)] = sent
+            status["net_%s_recv_bps" % _key(interface)] = recv
+            status["net_sent_bps"] += sent
+            status["net_recv_bps"] += recv
+
+        for disk, io in disk_io.items():
+            if _ignored_disks_re.match(disk) or disk not in prev[2]:
+                continue
+            status["disk_%s_read_bps" % _key(disk)] = max(0, int((io.read_bytes - prev[2][disk].read_bytes) / dt))
+            status["disk_%s_write_bps" % _key(disk)] = max(0, int((io.write_bytes - prev[2][disk].write_bytes) / dt))
+
+        return status
+
+    def _sample_slow(self):
+        status = {}
+        status["disk_usage_percent"] = psutil.disk_usage('/').percent
+
+        sensors_temperatures = psutil.sensors_temperatures() if hasattr(psutil, "sensors_temperatures") else {}
+        for sensor, temperatures in sensors_temperatures.items():
+            if temperatures:
+                status["temp_" + _key(sensor)] = round(mean([x.current for x in temperatures]), 1)
+
+        return status
+
+class SystemStatsSubscriber(object):
+    def __init__(self, callback):
+        self.callback = callback
+        SystemStatsSampler.get_instance().add_listener(self.callback)
+
+    def __del__(self):
+        self.unregister()
+
+    def unregister(self):
+        SystemStatsSampler.get_instance().remove_listener(self.callback)
 
 if __name__ == "__main__":
     # Run test
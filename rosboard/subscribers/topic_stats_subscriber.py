@@ -0,0 +1,32 @@
+#!/usr/bin/env python3
+
+import time
+import threading
+import traceback
+
+class TopicStatsSubscriber(object):
+    """
+    Periodically sends the statistics of the subscribed topics (see rosboard/topicstats.py),
+    as returned by get_stats(), to the callback.
+    """
+
+    def __init__(self, get_stats, callback, interval = 1.0):
+        self.get_stats = get_stats
+        self.callback = callback
+        self.interval = interval
+        self.stop = False
+        threading.Thread(target = self.start, name = "rosboard-topic-stats", daemon = True).start()
+
+    def __del__(self):
+        self.stop = True
+
+    def unregister(self):
+        self.stop = True
+
+    def start(self):
+        while not self.stop:
+            try:
+                self.callback(self.get_stats())
+            except Exception:
+                traceback.print_exc()
+            time.sleep(self.interval)
@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+
+"""
+Live statistics of the subscribed topics, like rostopic hz/bw/delay: receive rate, raw
+(serialized) and encoded (JSON sent to the clients) bandwidth, and age of header.stamp.
+Messages are counted as they arrive, before any throttling, so the rate is the publisher's.
+"""
+
+import io
+import threading
+import time
+
+# length (seconds) of the rolling window, kept as one bucket per second
+WINDOW = 10
+
+# serializing a message to measure its size costs a copy, so it's only done this often per
+# topic (seconds); the bandwidth is the rate times the mean measured size
+SIZE_SAMPLE_INTERVAL = 1.0
+
+def serialized_size(msg):
+    """
+    Returns the size in bytes of msg serialized, or None if it can't be serialized.
+    """
+    try:
+        if hasattr(msg, "get_fields_and_field_types"): # ROS2
+            from rclpy.serialization import serialize_message
+            return len(serialize_message(msg))
+        buff = io.BytesIO() # ROS1
+        msg.serialize(buff)
+        return buff.tell()
+    except Exception:
+        return None
+
+def stamp_age(msg, now):
+    """
+    Returns the age in seconds of msg.header.stamp, or None if msg has no (nonzero) stamp.
+    """
+    try:
+        stamp = msg.header.stamp
+    except AttributeError:
+        return None
+    if hasattr(stamp, "nanosec"): # ROS2
+        stamp = stamp.sec + stamp.nanosec * 1e-9
+    elif hasattr(stamp, "secs"): # ROS1
+        stamp = stamp.secs + stamp.nsecs * 1e-9
+    else:
+        return None
+    return now - stamp if stamp > 0 else None
+
+class TopicStats(object):
+    """
+    Rolling window statistics of one topic. Recording is O(1): every second of the window
+    is a bucket of sums, reused once it falls out of the window.
+    """
+
+    # indexes into a bucket
+    SECOND, COUNT, SIZE_SUM, SIZE_COUNT, ENCODED, SENT, AGE_SUM, AGE_COUNT, AGE_MAX = range(9)
+
+    def __init__(self):
+        self.buckets = [[-1, 0, 0, 0, 0, 0, 0.0, 0, None] for _ in range(WINDOW)]
+        self.first_time = None
+        self.last_time = None
+        self.last_size_time = 0.0
+        self.lock = threading.Lock()
+
+    def _bucket(self, t):
+        second = int(t)
+        bucket = self.buckets[second % WINDOW]
+        if bucket[self.SECOND] != second:
+            bucket[:] = [second, 0, 0, 0, 0, 0, 0.0, 0, None]
+        return bucket
+
+    def record_msg(self, msg, t = None):
+        """
+        Records a received message.
+        """
+        t = time.time() if t is None else t
+        age = stamp_age(msg, t)
+        size = None
+        if t - self.last_size_time >= SIZE_SAMPLE_INTERVAL:
+            self.last_size_time = t
+            size = serialized_size(msg)
+        self._record(t, size, age)
+
+    def record_serialized(self, size, stamp, t = None):
+        """
+        Records a received message that is still serialized: its size is known exactly, and
+        stamp is its header.stamp in seconds (or None).
+        """
+        t = time.time() if t is None else t
+        self._record(t, size, t - stamp if stamp else None)
+
+    def _record(self, t, size, age):
+        with self.lock:
+            if self.first_time is None:
+                self.first_time = t
+            self.last_time = t
+            bucket = self._bucket(t)
+            bucket[self.COUNT] += 1
+            if size is not None:
+                bucket[self.SIZE_SUM] += size
+                bucket[self.SIZE_COUNT] += 1
+            if age is not None:
+                bucket[self.AGE_SUM] += age
+                bucket[self.AGE_COUNT] += 1
+                if bucket[self.AGE_MAX] is None or age > bucket[self.AGE_MAX]:
+                    bucket[self.AGE_MAX] = age
+
+    def record_encoded(self, size, sockets, t = None):
+        """
+        Records a message encoded to size bytes of JSON and sent to sockets sockets.
+        """
+        t = time.time() if t is None else t
+        with self.lock:
+            bucket = self._bucket(t)
+            bucket[self.ENCODED] += size
+            bucket[self.SENT] += size * sockets
+
+    def summary(self, t = None):
+        """
+        Returns the statistics over the last WINDOW seconds:
+            rate: messages/s received
+            raw_bps: bytes/s received (serialized), from the sizes of messages received serialized,
+                else estimated from sampled message sizes
+            encoded_bps: bytes/s of JSON encoded for the clients (after throttling)
+            sent_bps: bytes/s sent to all the clients together
+            age_mean, age_max: age (s) of header.stamp on arrival, if the messages have one
+            last: seconds since the last message
+        """
+        t = time.time() if t is None else t
+        second = int(t)
+        with self.lock:
+            if self.first_time is None:
+                return {"rate": 0.0, "raw_bps": 0, "encoded_bps": 0, "sent_bps": 0, "last": None}
+            count = size_sum = size_count = encoded = sent = age_count = 0
+            age_sum = 0.0
+            age_max = None
+            for bucket in self.buckets:
+                if second - WINDOW < bucket[self.SECOND] <= second:
+                    count += bucket[self.COUNT]
+                    size_sum += bucket[self.SIZE_SUM]
+                    size_count += bucket[self.SIZE_COUNT]
+                    encoded += bucket[self.ENCODED]
+                    sent += bucket[self.SENT]
+                    age_sum += bucket[self.AGE_SUM]
+                    age_count += bucket[self.AGE_COUNT]
+                    if bucket[self.AGE_MAX] is not None and (age_max is None or bucket[self.AGE_MAX] > age_max):
+                        age_max = bucket[self.AGE_MAX]
+            # the window is the current (partial) second and the WINDOW - 1 before it
+            span = max(min(t - self.first_time, WINDOW - 1 + t - second), 1e-3)
+            last = t - self.last_time
+
+        rate = count / span
+        stats = {
+            "rate": round(rate, 2),
+            "raw_bps": int(rate * size_sum / size_count) if size_count else 0,
+            "encoded_bps": int(encoded / span),
+            "sent_bps": int(sent / span),
+            "last": round(last, 3),
+        }
+        if age_count:
+            stats["age_mean"] = round(age_sum / age_count, 4)
+            stats["age_max"] = round(age_max, 4)
+        return stats
@@ -0,0 +1,42 @@
+import json
+
+from rosboard.handlers import ROSBoardSocketHandler
+from rosboard.logbuffer import LogBuffer
+
+class FakeConnection(object):
+    def is_closing(self):
+        return False
+
+class FakeNode(object):
+    def __init__(self, remote_subs):
+        self.remote_subs = remote_subs
+
+class FakeSocket(object):
+    def __init__(self, socket_id, node):
+        self.id = socket_id
+        self.node = node
+        self.ws_connection = FakeConnection()
+        self.log_filters_by_topic = {}
+        self.sent = []
+
+    def write_message(self, message, binary=False):
+        self.sent.append(json.loads(message)[1])
+
+def test_flush_of_two_log_topics(monkeypatch):
+    # each topic has its own LogBuffer, so their first entries have the same _seq
+    buffers = {"/rosout": LogBuffer(), "_dmesg": LogBuffer()}
+    entries = []
+    for topic_name, text in (("/rosout", "from rosout"), ("_dmesg", "from kernel")):
+        entry = {"_topic_name": topic_name, "level": 20, "msg": text}
+        buffers[topic_name].append(entry)
+        entries.append(entry)
+    assert entries[0]["_seq"] == entries[1]["_seq"]
+
+    node = FakeNode({"/rosout": {"both", "rosout"}, "_dmesg": {"both"}})
+    both, rosout_only = FakeSocket("both", node), FakeSocket("rosout", node)
+    monkeypatch.setattr(ROSBoardSocketHandler, "sockets", {both, rosout_only})
+
+    ROSBoardSocketHandler.broadcast_logs(entries)
+
+    assert [entry["msg"] for entry in both.sent] == ["from rosout", "from kernel"]
+    assert [entry["msg"] for entry in rosout_only.sent] == ["from rosout"]
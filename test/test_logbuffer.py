@@ -0,0 +1,72 @@
+from rosboard.logbuffer import LogBuffer, LogFilter, normalize_level
+
+def make_buffer(entries, capacity = 5000):
+    log_buffer = LogBuffer(capacity = capacity)
+    for name, level, msg in entries:
+        log_buffer.append({"name": name, "level": level, "msg": msg})
+    return log_buffer
+
+def test_normalize_level():
+    assert normalize_level(4) == 30 # ROS1 WARN
+    assert normalize_level(40) == 40
+    assert normalize_level("warn") == 30
+    assert normalize_level("nonsense") == 0
+    assert normalize_level(None) == 0
+
+def test_append_sets_level_and_seq():
+    log_buffer = make_buffer([("/a", 2, "one"), ("/b", 40, "two")])
+    assert [(entry["_level"], entry["_seq"]) for entry in log_buffer.entries] == [(20, 1), (40, 2)]
+    assert log_buffer.nodes() == ["/a", "/b"]
+
+def test_append_evicts_oldest_from_indexes():
+    log_buffer = make_buffer([("/a", 20, "one"), ("/b", 40, "two"), ("/a", 20, "three")], capacity = 2)
+    assert [entry["msg"] for entry in log_buffer.entries] == ["two", "three"]
+    assert [entry["msg"] for entry in log_buffer.by_node["/a"]] == ["three"]
+    assert [entry["msg"] for entry in log_buffer.by_level[20]] == ["three"]
+
+    log_buffer.append({"name": "/c", "level": 20, "msg": "four"})
+    assert log_buffer.nodes() == ["/a", "/c"]
+
+def test_filter_defaults_match_everything():
+    log_filter = LogFilter()
+    assert log_filter.backfill == LogFilter.DEFAULT_BACKFILL
+    assert log_filter.matches({"_level": 10, "name": "/a", "msg": "x"})
+
+def test_filter_criteria():
+    log_filter = LogFilter({"minLevel": "WARN", "nodes": ["/camera"], "text": "Timeout"})
+    assert log_filter.matches({"_level": 40, "name": "/camera", "msg": "read timeout"})
+    assert not log_filter.matches({"_level": 20, "name": "/camera", "msg": "read timeout"})
+    assert not log_filter.matches({"_level": 40, "name": "/lidar", "msg": "read timeout"})
+    assert not log_filter.matches({"_level": 40, "name": "/camera", "msg": "ok"})
+
+def test_filter_regex_and_invalid_spec():
+    log_filter = LogFilter({"text": "^fr(ame|ee)", "regex": True})
+    assert log_filter.matches({"_level": 20, "name": "/a", "msg": "Frame dropped"})
+    assert not log_filter.matches({"_level": 20, "name": "/a", "msg": "a frame"})
+
+    # an invalid regex is matched as plain text rather than failing the subscription
+    log_filter = LogFilter({"text": "f(", "regex": True})
+    assert log_filter.matches({"_level": 20, "name": "/a", "msg": "call F(x)"})
+    assert not log_filter.matches({"_level": 20, "name": "/a", "msg": "x"})
+    assert LogFilter({"backfill": "lots"}).backfill == LogFilter.DEFAULT_BACKFILL
+    assert LogFilter({"backfill": 10 ** 6}).backfill == LogFilter.MAX_BACKFILL
+    assert LogFilter("not a dict").min_level == 0
+
+def test_query_returns_latest_matches_oldest_first():
+    log_buffer = make_buffer([("/a", 20, "m%d" % i) for i in range(10)] + [("/b", 40, "error")])
+    result = log_buffer.query(LogFilter({"backfill": 3}))
+    assert [entry["msg"] for entry in result] == ["m8", "m9", "error"]
+    assert log_buffer.query(LogFilter({"backfill": 0})) == []
+
+def test_query_by_level_and_nodes():
+    log_buffer = make_buffer([
+        ("/a", 20, "info a"), ("/b", 30, "warn b"), ("/a", 40, "error a"), ("/c", 50, "fatal c"),
+    ])
+    result = log_buffer.query(LogFilter({"minLevel": 30}))
+    assert [entry["msg"] for entry in result] == ["warn b", "error a", "fatal c"]
+
+    result = log_buffer.query(LogFilter({"nodes": ["/a", "/c"], "minLevel": 40}))
+    assert [entry["msg"] for entry in result] == ["error a", "fatal c"]
+
+    result = log_buffer.query(LogFilter({"nodes": ["/a"]}), limit = 1)
+    assert [entry["msg"] for entry in result] == ["error a"]